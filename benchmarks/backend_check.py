@@ -0,0 +1,105 @@
+"""Accuracy and latency of the planner's model backends against eager PyTorch.
+
+Usage (from the repo root):
+    python -m benchmarks.backend_check sessions/aisle1
+    python -m benchmarks.backend_check sessions/aisle1 --backends onnx int8-dynamic int8-static --threads 4
+    python -m benchmarks.backend_check --synthetic 50   # timing only, no recording
+
+Builds every backend from the same weights (exports are cached in --cache,
+int8-static is calibrated on the session), runs each over frames of the
+recorded session, and compares its masks with the float eager model's:
+mask IoU (mean, and the 5th percentile since one bad frame is a wrong turn)
+and agreement of the steering command PathAnalyzer derives from the mask.
+Latency is per inference, model input to mask. The last line names the
+fastest backend that keeps mean IoU and command agreement above the floors.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from model_backends import BACKENDS, load_backend, recorded_inputs
+from path_analysis import PathAnalyzer
+
+SIZE = (256, 256)
+
+
+def synthetic_inputs(count: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    return [rng.normal(0, 1, (1, 3, SIZE[1], SIZE[0])).astype(np.float32) for _ in range(count)]
+
+
+def iou(a: np.ndarray, b: np.ndarray) -> float:
+    a, b = a > 0.5, b > 0.5
+    union = np.count_nonzero(a | b)
+    return np.count_nonzero(a & b) / union if union else 1.0
+
+
+def run(backend, inputs) -> tuple:
+    """(masks, per-inference milliseconds) after one warm-up call."""
+    backend(inputs[0])
+    masks, times = [], []
+    for tensor in inputs:
+        start = time.perf_counter()
+        masks.append(backend(tensor).copy())
+        times.append(1000.0 * (time.perf_counter() - start))
+    return masks, np.asarray(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("session", nargs="?", help="recorded session to compare on")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS[1:], default=list(BACKENDS[1:]))
+    parser.add_argument("--weights", default="unet_resnet34Final.pth")
+    parser.add_argument("--threads", type=int, default=None, help="intra-op threads for every backend")
+    parser.add_argument("--frames", type=int, default=200, help="frames taken evenly from the session")
+    parser.add_argument("--cache", default="models", help="exported model directory")
+    parser.add_argument("--synthetic", type=int, default=0, metavar="FRAMES",
+                        help="random inputs instead of a session (latency only; IoU is meaningless)")
+    parser.add_argument("--min-iou", type=float, default=0.95)
+    parser.add_argument("--min-agreement", type=float, default=0.98)
+    args = parser.parse_args()
+    if not args.session and not args.synthetic:
+        parser.error("give a recorded session or --synthetic FRAMES")
+
+    inputs = recorded_inputs(args.session, SIZE, args.frames) if args.session else synthetic_inputs(args.synthetic)
+    analyzer = PathAnalyzer(roi_start=0.5, horizons=(0.25, 0.5, 0.75), tolerance=30)
+    options = dict(weights=args.weights, threads=args.threads, size=SIZE, cache_dir=args.cache,
+                   calibration=args.session)
+
+    reference, reference_ms = run(load_backend("torch", **options), inputs)
+    reference_commands = [analyzer.command(analyzer.analyze(mask)) for mask in reference]
+    print(f"[Backends] {len(inputs)} frames {SIZE[0]}x{SIZE[1]}"
+          + (f" from {args.session}" if args.session else " (synthetic)")
+          + f", threads {args.threads or 'default'}")
+    print(f"  {'backend':<13} {'build s':>7} {'p50 ms':>7} {'p95 ms':>7} {'speed-up':>8} "
+          f"{'IoU mean':>8} {'IoU p5':>7} {'commands':>8}")
+    print(f"  {'torch':<13} {'':>7} {np.median(reference_ms):7.1f} {np.percentile(reference_ms, 95):7.1f} "
+          f"{1:8.2f} {1:8.3f} {1:7.3f} {1:8.1%}")
+
+    best, best_ms = "torch", np.median(reference_ms)
+    for name in args.backends:
+        start = time.perf_counter()
+        try:
+            backend = load_backend(name, **options)
+        except (ImportError, ValueError) as e:
+            print(f"  {name:<13} skipped: {e}")
+            continue
+        build_s = time.perf_counter() - start
+        masks, ms = run(backend, inputs)
+        ious = np.array([iou(mask, ref) for mask, ref in zip(masks, reference)])
+        agreement = np.mean([analyzer.command(analyzer.analyze(mask)) == command
+                             for mask, command in zip(masks, reference_commands)])
+        p50 = np.median(ms)
+        print(f"  {name:<13} {build_s:7.1f} {p50:7.1f} {np.percentile(ms, 95):7.1f} "
+              f"{np.median(reference_ms) / p50:8.2f} {ious.mean():8.3f} {np.percentile(ious, 5):7.3f} "
+              f"{agreement:8.1%}")
+        if ious.mean() >= args.min_iou and agreement >= args.min_agreement and p50 < best_ms:
+            best, best_ms = name, p50
+
+    print(f"[Backends] fastest within IoU >= {args.min_iou} and command agreement >= {args.min_agreement:.0%}: "
+          f"--backend {best}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Control-loop cost of BlackBox.record() against a bare frame copy, and what the clips hold.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_blackbox [--seconds 8] [--fps 30] [--size 1280x720]
+    python -m benchmarks.bench_blackbox --session-video /tmp/session.mp4   # also encode everything
+
+Feeds synthetic camera frames at --fps into a BlackBox (writing to a temp
+directory unless --out), fires an event partway through and a second one
+inside its window, and times every record() call next to a plain
+np.copyto() of the same frame into a preallocated buffer. Encoding happens
+in the black box's own process meanwhile, so a record() slower than the
+copy is the cost the loop actually sees. Afterwards each clip is read back
+to count its frames.
+"""
+import argparse
+import glob
+import json
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from blackbox import BlackBox
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=8.0, help="length of the run")
+    parser.add_argument("--fps", type=float, default=30.0, help="camera frame rate")
+    parser.add_argument("--size", default="1280x720", help="frame WxH")
+    parser.add_argument("--keep", type=float, default=4.0, help="seconds the black box keeps")
+    parser.add_argument("--keep-fps", type=float, default=15.0, help="frames per second the black box keeps")
+    parser.add_argument("--out", help="clip directory (default: a temporary one)")
+    parser.add_argument("--session-video", metavar="FILE", help="also encode every kept frame to FILE")
+    args = parser.parse_args()
+
+    w, h = (int(v) for v in args.size.split("x"))
+    directory = args.out or tempfile.mkdtemp(prefix="blackbox-")
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 256, (h, w, 3), np.uint8)
+    scratch = np.empty_like(base)
+    count = int(args.seconds * args.fps)
+    events = {count // 2: "manual", count // 2 + int(args.fps) // 2: "backoff"}  # half a post window apart
+
+    record_ms, skip_ms, copy_ms = [], [], []
+    with BlackBox(directory, (w, h), args.keep, post=1.0, fps=args.keep_fps,
+                  session_video=args.session_video) as blackbox:
+        start = time.monotonic()
+        for i in range(count):
+            frame = np.roll(base, 4 * i, axis=1)  # moving picture, made outside the timed calls
+            cv2.putText(frame, str(i), (40, 120), cv2.FONT_HERSHEY_SIMPLEX, 3, (255, 255, 255), 6)
+            recorded = blackbox.recorded
+            t0 = time.perf_counter()
+            np.copyto(scratch, frame)
+            t1 = time.perf_counter()
+            blackbox.record(frame, time.monotonic())
+            t2 = time.perf_counter()
+            copy_ms.append(1000.0 * (t1 - t0))
+            (record_ms if blackbox.recorded > recorded else skip_ms).append(1000.0 * (t2 - t1))
+            if i in events:
+                blackbox.trigger(events[i])
+            time.sleep(max(0.0, start + (i + 1) / args.fps - time.monotonic()))
+        blackbox.report()
+
+    record_ms, skip_ms, copy_ms = np.asarray(record_ms), np.asarray(skip_ms), np.asarray(copy_ms)
+    print(f"[Bench] {count} frames {w}x{h} at {args.fps:g} fps, keeping {args.keep:g} s at {args.keep_fps:g} fps")
+    print(f"  frame copy       p50 {np.median(copy_ms):6.3f} ms  p99 {np.percentile(copy_ms, 99):6.3f} ms")
+    print(f"  record(), kept p50 {np.median(record_ms):6.3f} ms  p99 {np.percentile(record_ms, 99):6.3f} ms  "
+          f"max {record_ms.max():6.3f} ms  ({len(record_ms)} frames)")
+    if len(skip_ms):
+        print(f"  record(), over fps p50 {np.median(skip_ms):6.3f} ms  ({len(skip_ms)} frames)")
+    for path in sorted(glob.glob(os.path.join(directory, "*.mp4"))):
+        capture = cv2.VideoCapture(path)
+        frames = 0
+        while capture.read()[0]:
+            frames += 1
+        with open(os.path.splitext(path)[0] + ".json") as f:
+            meta = json.load(f)
+        print(f"  {os.path.basename(path)}: {frames} frames over {meta['t'][-1]:.1f} s, events "
+              + ", ".join(f"{e['event']} at {e['t']:.1f} s" for e in meta["events"]) + f", lost {meta['lost']}")
+
+
+if __name__ == "__main__":
+    main()
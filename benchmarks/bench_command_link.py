@@ -0,0 +1,117 @@
+"""Round trip and throughput of CommandLink's legacy and framed protocols against MockController.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_command_link [--rate 30] [--seconds 5] [--burst 5000]
+    python -m benchmarks.bench_command_link --apply-delay 0.002   # controller takes 2 ms to apply
+
+Starts mock_controller.MockController on a free localhost port and, for each
+protocol, first sends commands at the control loop's --rate (steering
+alternating each frame, so nothing is collapsed) and then a --burst of
+commands as fast as the link takes them. The paced run gives the round trip
+of framed commands - send to ack, timed on the sender's clock from the
+echoed timestamp - and the burst gives commands per second delivered to the
+controller. Legacy commands are never acknowledged, so they have no round
+trip.
+
+Before any of that, a link is left connected but idle for --idle seconds,
+first before its first command and then between keepalives; the process
+should use next to no CPU time in either, as the link thread sleeps.
+"""
+import argparse
+import time
+
+from command_link import CommandLink
+from mock_controller import MockController
+
+COMMANDS = ("w", "a", "w", "d")
+
+
+def delivered(controller: MockController, protocol: str) -> int:
+    return controller.framed if protocol == "framed" else controller.legacy
+
+
+def wait_for(controller: MockController, protocol: str, count: int, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while delivered(controller, protocol) < count:
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.0005)
+    return True
+
+
+def idle(controller: MockController, seconds: float) -> tuple:
+    """Process CPU seconds used by an idle link: before its first command, then after one."""
+    link = CommandLink(*controller.address, name="Bench-idle", log_commands=False)
+    with link:
+        link.wait_connected(2.0)
+        used = []
+        for _ in range(2):
+            start = time.process_time()
+            time.sleep(seconds)
+            used.append(time.process_time() - start)
+            link.send("x")
+    return tuple(used)
+
+
+def paced(controller: MockController, protocol: str, rate: float, seconds: float) -> dict:
+    link = CommandLink(*controller.address, name=f"Bench-{protocol}", log_commands=False, protocol=protocol)
+    with link:
+        link.wait_connected(2.0)
+        period = 1.0 / rate
+        start = time.perf_counter()
+        for i in range(int(rate * seconds)):
+            command = COMMANDS[i % len(COMMANDS)]
+            link.send(command, (0.5, 0.5 if command == "a" else -0.5 if command == "d" else 0.0))
+            time.sleep(max(0.0, start + (i + 1) * period - time.perf_counter()))
+        time.sleep(0.05)  # let the last acks arrive
+        stats = link.stats()
+    return stats
+
+
+def burst(controller: MockController, protocol: str, count: int) -> tuple:
+    link = CommandLink(*controller.address, name=f"Bench-{protocol}", log_commands=False, protocol=protocol,
+                       queue_size=count + 1)
+    with link:
+        link.wait_connected(2.0)
+        before = delivered(controller, protocol)
+        start = time.perf_counter()
+        for i in range(count):
+            link.send(COMMANDS[i % len(COMMANDS)])
+        complete = wait_for(controller, protocol, before + count)
+        elapsed = time.perf_counter() - start
+        got = delivered(controller, protocol) - before
+    return got / elapsed, complete
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=30.0, help="paced commands per second")
+    parser.add_argument("--seconds", type=float, default=5.0, help="length of the paced run")
+    parser.add_argument("--idle", type=float, default=1.0, help="seconds an idle link is timed for")
+    parser.add_argument("--burst", type=int, default=5000, help="commands sent back to back")
+    parser.add_argument("--apply-delay", type=float, default=0.0, metavar="SECONDS",
+                        help="mock controller's time from receiving a framed command to acking it")
+    args = parser.parse_args()
+
+    with MockController("127.0.0.1", 0, args.apply_delay) as controller:
+        print(f"[Bench] mock controller on {controller.address[0]}:{controller.address[1]}, "
+              f"{args.rate:g} Hz for {args.seconds:g} s, burst of {args.burst}, apply delay "
+              f"{1000.0 * args.apply_delay:g} ms")
+        before, after = idle(controller, args.idle)
+        print(f"[Bench] idle link CPU over {args.idle:g} s: {before:.3f} s before the first command, "
+              f"{after:.3f} s after it")
+        print(f"  {'protocol':<8} {'sent':>6} {'acked':>6} {'rtt avg':>8} {'rtt p95':>8} {'rtt max':>8} "
+              f"{'send avg':>8} {'burst cmd/s':>11}")
+        for protocol in ("legacy", "framed"):
+            s = paced(controller, protocol, args.rate, args.seconds)
+            rate, complete = burst(controller, protocol, args.burst)
+            rtt = (f"{s['avg_rtt_ms']:6.2f}ms {s['p95_rtt_ms']:6.2f}ms {s['max_rtt_ms']:6.2f}ms"
+                   if protocol == "framed" else f"{'n/a':>8} {'n/a':>8} {'n/a':>8}")
+            print(f"  {protocol:<8} {s['sent']:6d} {s['acked'] if protocol == 'framed' else '-':>6} {rtt} "
+                  f"{s['avg_latency_ms']:6.3f}ms {rate:11.0f}" + ("" if complete else " (incomplete)"))
+        print(f"[Bench] controller received {controller.legacy} legacy and {controller.framed} framed "
+              f"commands, {controller.errors} errors")
+
+
+if __name__ == "__main__":
+    main()
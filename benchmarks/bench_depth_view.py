@@ -0,0 +1,71 @@
+"""Compare depth.py / depth2.py's old visualization path with DepthVisualizer.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_depth_view [--width 1280 --height 720 --max-disparity 760]
+
+Uses a synthetic subpixel disparity frame and mono pair. Exits non-zero if
+any output differs from the reference path.
+"""
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from depth_view import DepthVisualizer
+
+
+def reference_colorize(disparity, multiplier):
+    return cv2.applyColorMap((disparity * multiplier).astype(np.uint8), cv2.COLORMAP_JET)
+
+
+def synthetic_pair(width: int, height: int, max_disparity: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    disparity = ((x / width) * max_disparity).astype(np.uint16)
+    disparity[rng.random((height, width)) < 0.1] = 0  # invalid pixels
+    left = rng.integers(0, 256, (height, width), dtype=np.uint8)
+    right = np.roll(left, 8, axis=1)
+    return disparity, left, right
+
+
+def time_it(fn, repeat: int) -> float:
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return 1000.0 * (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--max-disparity", type=int, default=760, help="StereoDepth.getMaxDisparity()")
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    disparity, left, right = synthetic_pair(args.width, args.height, args.max_disparity)
+    multiplier = 255 / args.max_disparity
+    view = DepthVisualizer(args.max_disparity)
+
+    checks = {
+        # colorize() returns BGRA; compare its BGR channels
+        "colorize": (lambda: reference_colorize(disparity, multiplier), lambda: view.colorize(disparity)[..., :3]),
+        "side_by_side": (lambda: np.hstack((left, right)), lambda: view.side_by_side(left, right)),
+        "overlay": (lambda: cv2.addWeighted(left, 0.5, right, 0.5, 0), lambda: view.overlay(left, right)),
+    }
+    failed = False
+    print(f"{args.width}x{args.height}, max disparity {args.max_disparity}")
+    for name, (old, new) in checks.items():
+        same = np.array_equal(old(), new())
+        failed |= not same
+        t_old, t_new = time_it(old, args.repeat), time_it(new, args.repeat)
+        print(f"  {name:<13} old {t_old:6.2f} ms  new {t_new:6.2f} ms  ({t_old / t_new:.1f}x)  "
+              f"{'identical' if same else 'MISMATCH'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
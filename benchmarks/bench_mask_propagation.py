@@ -0,0 +1,118 @@
+"""Benchmark MaskPropagator: mask quality and cost between UNet keyframes.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_mask_propagation [--frames 300] [--interval 1,2,4,8] [--unet]
+
+Renders a textured ground plane sliding and turning under a camera with a
+known path mask, then runs the propagator at each keyframe interval with a
+"segmenter" that returns the ground-truth mask. Reports the IoU of the
+masks handed to the planner against ground truth, how often the network
+ran, and the per-frame cost of a propagated frame. With --unet the real
+UNet (segmentation_models_pytorch) is timed on CPU as well, giving the
+command-rate gain at each interval; otherwise pass --segment-ms.
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from frame_context import FrameContext
+from mask_propagation import MaskPropagator
+
+FRAME_SIZE = (640, 480)
+MASK_SIZE = (256, 256)
+
+
+def make_scene(frames: int, seed: int = 0):
+    """(frames, path masks at model size) for a camera drifting over a textured floor.
+
+    A cut to an unrelated scene (other texture, other path) halfway through exercises the scene-change check.
+    """
+    rng = np.random.default_rng(seed)
+    w, h = FRAME_SIZE
+    scenes = []
+    for path_x in (w, w * 0.6):
+        texture = cv2.GaussianBlur(rng.integers(0, 255, (h * 2, w * 2, 3), dtype=np.uint8), (0, 0), 2)
+        texture = cv2.normalize(texture, None, 0, 255, cv2.NORM_MINMAX)
+        path = np.zeros((h * 2, w * 2), np.uint8)
+        corners = [[path_x - 160, 2 * h - 1], [path_x + 160, 2 * h - 1], [path_x + 60, 0], [path_x - 60, 0]]
+        cv2.fillPoly(path, [np.array(corners, np.int32)], 1)
+        texture[path > 0] = (texture[path > 0] * 0.5 + (40, 110, 60)).astype(np.uint8)
+        scenes.append((texture, path))
+
+    images, masks = [], []
+    for i in range(frames):
+        t = i / 30.0
+        texture, path = scenes[0] if i < frames // 2 else scenes[1]
+        dx, dy = 80 * np.sin(0.7 * t), 60 * np.cos(0.5 * t) - 60
+        angle = 6 * np.sin(0.4 * t)
+        warp = cv2.getRotationMatrix2D((w, h), angle, 1.0)
+        warp[:, 2] += (dx - w / 2, dy - h / 2)
+        images.append(cv2.warpAffine(texture, warp, (w, h), borderMode=cv2.BORDER_REFLECT))
+        mask = cv2.warpAffine(path, warp, (w, h), flags=cv2.INTER_NEAREST)
+        masks.append(cv2.resize(mask, MASK_SIZE, interpolation=cv2.INTER_NEAREST).astype(np.float32))
+    return images, masks
+
+
+def iou(a: np.ndarray, b: np.ndarray) -> float:
+    a, b = a > 0.5, b > 0.5
+    union = np.count_nonzero(a | b)
+    return np.count_nonzero(a & b) / union if union else 1.0
+
+
+def unet_ms(repeat: int) -> float:
+    """CPU milliseconds of planner.py's UNet forward pass on a 256x256 input."""
+    import segmentation_models_pytorch as smp
+    import torch
+
+    model = smp.Unet(encoder_name="resnet34", encoder_weights=None, in_channels=3, classes=1).eval()
+    x = torch.zeros(1, 3, *MASK_SIZE)
+    with torch.no_grad():
+        model(x)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            torch.sigmoid(model(x)) > 0.5
+    return 1000.0 * (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--interval", default="1,2,4,8", help="keyframe intervals to compare")
+    parser.add_argument("--scene-change", type=float, default=12.0)
+    parser.add_argument("--unet", action="store_true", help="time the real UNet on CPU")
+    parser.add_argument("--segment-ms", type=float, default=None,
+                        help="network cost to assume per keyframe when not using --unet")
+    args = parser.parse_args()
+
+    images, masks = make_scene(args.frames)
+    segment_ms = unet_ms(10) if args.unet else args.segment_ms
+    if segment_ms is not None:
+        print(f"Segmentation cost per keyframe: {segment_ms:.1f} ms")
+
+    print(f"{'interval':>8} {'keyframes':>10} {'cuts':>5} {'IoU mean':>9} {'IoU min':>8} "
+          f"{'propagate ms':>13} {'frame ms':>9} {'gain':>6}")
+    for interval in (int(v) for v in args.interval.split(",")):
+        propagator = MaskPropagator(FrameContext(), interval, args.scene_change)
+        scores, propagate = [], []
+        for image, truth in zip(images, masks):
+            keyframes = propagator.keyframes
+            start = time.perf_counter()
+            mask = propagator(image, lambda frame: truth.copy())
+            elapsed = time.perf_counter() - start
+            if propagator.keyframes == keyframes:
+                propagate.append(elapsed)
+            scores.append(iou(mask, truth))
+        propagate_ms = 1000.0 * np.mean(propagate) if propagate else 0.0
+        row = (f"{interval:8d} {propagator.keyframes:10d} {propagator.scene_changes:5d} "
+               f"{np.mean(scores):9.3f} {np.min(scores):8.3f} {propagate_ms:13.2f}")
+        if segment_ms is not None:
+            # Upper bound: every frame is charged the flow, though forced keyframes skip it
+            frame_ms = (propagator.keyframes * segment_ms + len(images) * propagate_ms) / len(images)
+            row += f" {frame_ms:9.1f} {segment_ms / frame_ms:5.1f}x"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
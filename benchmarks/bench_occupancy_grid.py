@@ -0,0 +1,90 @@
+"""Time OccupancyGrid updates and check them on a synthetic scene.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_occupancy_grid [--width 1280 --height 720 --step 2]
+
+Renders the disparity of a flat floor with a box standing `--box-distance`
+meters ahead of the camera, feeds it to the grid and checks that the box
+(and not the floor) blocks the corridor at the right distance, that a
+corridor to the side stays free and that the ignore rectangle removes the
+box. Exits non-zero if a check fails or an update is slower than the
+camera frame period.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from occupancy_grid import DEFAULT_BASELINE_M, DEFAULT_FOCAL_PX, OccupancyGrid
+
+
+def synthetic_scene(width: int, height: int, focal: float, baseline: float, camera_height: float,
+                    box_distance: float, box_width: float = 0.6, box_height: float = 1.2):
+    """Raw subpixel disparity of a floor plus a box centered ahead, and the box's pixel rect."""
+    v, u = np.mgrid[0:height, 0:width].astype(np.float32)
+    rx = (u - (width - 1) / 2) / focal
+    ry = (v - (height - 1) / 2) / focal
+    with np.errstate(divide="ignore"):
+        z = np.where(ry > 0, camera_height / ry, np.inf)
+    above = camera_height - ry * box_distance
+    box = (np.abs(rx * box_distance) < box_width / 2) & (above >= 0) & (above <= box_height)
+    z = np.where(box, np.minimum(z, box_distance), z)
+    with np.errstate(divide="ignore"):
+        disparity = np.where(np.isfinite(z), np.round(focal * baseline * 8 / z), 0)
+    ys, xs = np.nonzero(box)
+    rect = (xs.min(), ys.min(), xs.max() - xs.min() + 1, ys.max() - ys.min() + 1)
+    return disparity.clip(0, 95 * 8).astype(np.uint16), rect
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--step", type=int, default=2, help="disparity subsampling")
+    parser.add_argument("--camera-height", type=float, default=0.6)
+    parser.add_argument("--box-distance", type=float, default=2.0)
+    parser.add_argument("--fps", type=float, default=30.0, help="camera rate the update has to keep up with")
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    disparity, rect = synthetic_scene(args.width, args.height, DEFAULT_FOCAL_PX, DEFAULT_BASELINE_M,
+                                      args.camera_height, args.box_distance)
+
+    def settled(ignore=None):
+        grid = OccupancyGrid(camera_height_m=args.camera_height, step=args.step)
+        for _ in range(5):
+            grid.update(disparity, ignore)
+        return grid
+
+    grid = settled()
+    ahead = grid.free_distance(0.7)
+    checks = {
+        f"box at {args.box_distance:.1f} m": abs(ahead - args.box_distance) <= 2 * grid.cell_m,
+        "blocked past the box": not grid.corridor_free(0.7, args.box_distance + 0.5),
+        "free before the box": grid.corridor_free(0.7, args.box_distance - 0.3),
+        "free to the side": grid.corridor_free(0.7, grid.depth_m, offset_m=1.2),
+        "ignore rect clears it": settled(rect).free_distance(0.7) == grid.depth_m,
+    }
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        grid.update(disparity)
+    update_ms = 1000.0 * (time.perf_counter() - start) / args.repeat
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        grid.corridor_free(0.7, 0.6)
+    query_us = 1e6 * (time.perf_counter() - start) / args.repeat
+    budget_ms = 1000.0 / args.fps
+    checks[f"update within {budget_ms:.0f} ms"] = update_ms < budget_ms
+
+    print(f"{args.width}x{args.height}, step {args.step}, grid {grid.rows}x{grid.cols} cells, "
+          f"free ahead {ahead:.2f} m")
+    print(f"  update {update_ms:.2f} ms  corridor query {query_us:.1f} us")
+    for name, ok in checks.items():
+        print(f"  {name:<24} {'ok' if ok else 'FAILED'}")
+    sys.exit(0 if all(checks.values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Micro-benchmark PathAnalyzer against the old determine_command_from_mask.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_path_analysis [--repeat 200]
+
+Runs on synthetic path masks at model (256x256) and camera resolutions and
+checks both implementations pick the same command on every mask.
+"""
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from path_analysis import PathAnalyzer
+
+SIZES = [(256, 256), (480, 640), (720, 1280)]
+
+
+def legacy_command(mask: np.ndarray) -> str:
+    """planner.py's original determine_command_from_mask."""
+    h, w = mask.shape
+    roi = mask[h//2:, :]
+    coords = np.column_stack(np.where(roi > 0.5))
+
+    if coords.size == 0:
+        return "x"
+
+    avg_x = np.mean(coords[:, 1])
+    center_x = w / 2
+    offset = avg_x - center_x
+
+    tolerance = 30
+    if abs(offset) < tolerance:
+        return "w"
+    elif offset < 0:
+        return "a"
+    else:
+        return "d"
+
+
+def synthetic_mask(h: int, w: int, rng) -> np.ndarray:
+    """A trapezoid path receding towards a random vanishing point."""
+    mask = np.zeros((h, w), np.float32)
+    if rng.random() < 0.1:
+        return mask  # no path visible
+    bottom = w * rng.uniform(0.2, 0.8)
+    top = w * rng.uniform(0.1, 0.9)
+    half_bottom = w * rng.uniform(0.1, 0.4)
+    half_top = half_bottom * rng.uniform(0.1, 0.5)
+    y_top = int(h * rng.uniform(0.1, 0.6))
+    pts = np.array([[bottom - half_bottom, h - 1], [bottom + half_bottom, h - 1],
+                    [top + half_top, y_top], [top - half_top, y_top]], np.int32)
+    cv2.fillPoly(mask, [pts], 1.0)
+    return mask
+
+
+def time_it(fn, masks, repeat: int) -> float:
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(masks[i % len(masks)])
+    return 1e6 * (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--masks", type=int, default=50, help="random masks per size")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    ok = True
+    for h, w in SIZES:
+        masks = [synthetic_mask(h, w, rng) for _ in range(args.masks)]
+        analyzer = PathAnalyzer()
+
+        mismatches = sum(legacy_command(m) != analyzer.command(analyzer.analyze(m)) for m in masks)
+        ok &= mismatches == 0
+
+        legacy_us = time_it(legacy_command, masks, args.repeat)
+        analyze_us = time_it(analyzer.analyze, masks, args.repeat)
+        print(f"[Bench] {w}x{h}: legacy {legacy_us:8.1f} us | PathAnalyzer {analyze_us:8.1f} us "
+              f"({legacy_us / analyze_us:.1f}x) | command mismatches {mismatches}/{len(masks)}")
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Compare planner.py's old preprocessing path with PlannerPreprocessor.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_preprocess sessions/aisle1 [--frames 200]
+    python -m benchmarks.bench_preprocess --images img1.png img2.png ...
+    python -m benchmarks.bench_preprocess   # synthetic frame
+
+The fused path enhances the frame after shrinking it to model resolution,
+so CLAHE's tiles and the sharpening kernel see a 256x256 image instead of
+the full preview; its input tensor is not meant to match the reference
+path's value for value, and their difference is printed for information
+only. What has to match is what the planner does with it: both tensors go
+through the UNet (--weights, eager PyTorch) and the benchmark compares the
+masks (IoU) and the steering command PathAnalyzer derives from each, and
+exits non-zero if mean IoU or command agreement fall below --min-iou /
+--min-agreement - or with status 2 if the model can't be loaded, since
+then nothing was checked.
+"""
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+from torchvision import transforms
+
+from benchmarks.backend_check import iou
+from frame_source import ReplaySource
+from path_analysis import PathAnalyzer
+from preprocess import PlannerPreprocessor, enhance_input_image
+
+# The transform planner.py used before PlannerPreprocessor
+reference_transform = transforms.Compose([
+    transforms.Resize((256, 256)),
+    transforms.ToTensor(),
+    transforms.Normalize(mean=[0.485, 0.456, 0.406],
+                         std=[0.229, 0.224, 0.225]),
+])
+
+
+def reference_preprocess(frame: np.ndarray) -> np.ndarray:
+    enhanced = enhance_input_image(frame)
+    input_pil = Image.fromarray(cv2.cvtColor(enhanced, cv2.COLOR_BGR2RGB))
+    return reference_transform(input_pil).unsqueeze(0).numpy()
+
+
+def synthetic_frame(seed: int = 0) -> np.ndarray:
+    """Smooth field-like gradients with sensor noise, 640x480 BGR."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:480, 0:640]
+    frame = np.dstack([x / 640 * 200 + 30, y / 480 * 180 + 40, (x + y) % 256]).astype(np.uint8)
+    frame = cv2.GaussianBlur(frame, (0, 0), 3)
+    return cv2.add(frame, rng.integers(0, 20, frame.shape, dtype=np.uint8))
+
+
+def session_frames(session: str, limit: int) -> list:
+    """Up to `limit` video frames spread evenly over a recorded session."""
+    frames = []
+    with ReplaySource(session, realtime=False) as source:
+        stride = max(1, len(source) // limit)
+        for i in range(len(source)):
+            try:
+                frame = source.get("video")
+            except EOFError:
+                break
+            if i % stride == 0 and len(frames) < limit:
+                frames.append(frame.image.copy())
+    return frames
+
+
+def time_it(fn, frame, repeat: int) -> float:
+    fn(frame)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(frame)
+    return 1000.0 * (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("session", nargs="?", help="recorded session to compare on")
+    parser.add_argument("--images", nargs="*", help="BGR images to compare on instead of a session")
+    parser.add_argument("--frames", type=int, default=200, help="frames taken evenly from the session")
+    parser.add_argument("--weights", default="unet_resnet34Final.pth")
+    parser.add_argument("--repeat", type=int, default=100, help="timed calls per path")
+    parser.add_argument("--min-iou", type=float, default=0.95, help="lowest acceptable mean mask IoU")
+    parser.add_argument("--min-agreement", type=float, default=0.98,
+                        help="lowest acceptable share of frames steering the same way")
+    args = parser.parse_args()
+
+    if args.session:
+        frames, source = session_frames(args.session, args.frames), args.session
+    elif args.images:
+        frames, source = [cv2.imread(path) for path in args.images], f"{len(args.images)} images"
+    else:
+        frames, source = [synthetic_frame()], "synthetic frame"
+    preprocessor = PlannerPreprocessor()
+
+    ref_ms = time_it(reference_preprocess, frames[0], args.repeat)
+    fused_ms = time_it(preprocessor, frames[0], args.repeat)
+    print(f"[Bench] {len(frames)} frames {frames[0].shape[1]}x{frames[0].shape[0]} from {source}")
+    print(f"  reference (enhance_input_image + transform): {ref_ms:7.2f} ms")
+    print(f"  fused (PlannerPreprocessor):                 {fused_ms:7.2f} ms  ({ref_ms / fused_ms:.1f}x)")
+
+    pairs = [(reference_preprocess(frame), preprocessor(frame).copy()) for frame in frames]
+    diff = np.concatenate([np.abs(ref - fused).ravel() for ref, fused in pairs])
+    print(f"  input |diff| mean {diff.mean():.4f}  p99 {np.percentile(diff, 99):.4f}  max {diff.max():.4f}"
+          f"  (normalized units, expected: enhancement runs at a different resolution)")
+
+    try:
+        from model_backends import load_backend
+
+        backend = load_backend("torch", weights=args.weights)
+    except (ImportError, OSError) as e:
+        print(f"[Bench] can't load the model ({e}); masks and commands not compared")
+        sys.exit(2)
+
+    analyzer = PathAnalyzer(roi_start=0.5, horizons=(0.25, 0.5, 0.75), tolerance=30)
+    ious, same = [], []
+    for ref, fused in pairs:
+        ref_mask, fused_mask = backend(ref).copy(), backend(fused).copy()
+        ious.append(iou(ref_mask, fused_mask))
+        same.append(analyzer.command(analyzer.analyze(ref_mask)) == analyzer.command(analyzer.analyze(fused_mask)))
+    ious, agreement = np.asarray(ious), float(np.mean(same))
+    passed = ious.mean() >= args.min_iou and agreement >= args.min_agreement
+    print(f"  mask IoU mean {ious.mean():.3f}  p5 {np.percentile(ious, 5):.3f}  min {ious.min():.3f}")
+    print(f"  same command on {agreement:.1%} of frames  -> {'PASS' if passed else 'FAIL'} "
+          f"(IoU >= {args.min_iou}, agreement >= {args.min_agreement:.0%})")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
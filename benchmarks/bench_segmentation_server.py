@@ -0,0 +1,129 @@
+"""Planner throughput with the UNet in-process vs. in a SegmentationServer process.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_segmentation_server [--frames 200] [--threads 2]
+    python -m benchmarks.bench_segmentation_server --model lraspp   # without segmentation_models_pytorch
+
+Runs the planner's per-frame work - fused preprocessing, segmentation, path
+analysis and the overlay render - over synthetic 640x480 frames three ways:
+the current single-thread loop, the server used synchronously (the cost of
+the process hop) and the server double-buffered (enhancement of frame t+1
+overlapping inference on frame t, as `planner.py --segment-process` runs).
+--model unet is planner.py's architecture (random weights unless --weights);
+--model lraspp is torchvision's LR-ASPP MobileNetV3, a lighter stand-in.
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+import torch
+
+from path_analysis import PathAnalyzer
+from preprocess import PlannerPreprocessor
+from model_backends import TorchBackend, load_unet
+from segmentation_server import SegmentationServer
+
+SIZE = (256, 256)
+
+
+class _LRASPP(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        from torchvision.models.segmentation import lraspp_mobilenet_v3_large
+        self.net = lraspp_mobilenet_v3_large(weights=None, weights_backbone=None, num_classes=1)
+
+    def forward(self, x):
+        return self.net(x)["out"]
+
+
+def load_model(name: str, weights: str = None, threads: int = None, device: str = "cpu") -> TorchBackend:
+    """The benchmarked model; random weights are seeded so both processes build the same one."""
+    if threads:
+        torch.set_num_threads(threads)
+    torch.manual_seed(0)
+    if name == "lraspp":
+        return TorchBackend(_LRASPP().to(torch.device(device)).eval(), device)
+    return TorchBackend(load_unet(weights, device), device)
+
+
+def synthetic_frames(count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:480, 0:640]
+    base = np.dstack([x / 640 * 200 + 30, y / 480 * 180 + 40, (x + y) % 256]).astype(np.uint8)
+    return [cv2.add(base, rng.integers(0, 40, base.shape, dtype=np.uint8)) for _ in range(count)]
+
+
+def overlay(frame: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """planner.render_overlay."""
+    color_mask = cv2.resize((mask * 255).astype(np.uint8), (frame.shape[1], frame.shape[0]))
+    return cv2.addWeighted(frame, 0.7, cv2.cvtColor(color_mask, cv2.COLOR_GRAY2BGR), 0.3, 0)
+
+
+def act(analyzer: PathAnalyzer, frame: np.ndarray, mask: np.ndarray) -> str:
+    command = analyzer.command(analyzer.analyze(mask))
+    overlay(frame, mask)
+    return command
+
+
+def run_in_process(backend, frames, analyzer) -> list:
+    preprocessor = PlannerPreprocessor(SIZE)
+    return [act(analyzer, frame, backend(preprocessor(frame))) for frame in frames]
+
+
+def run_sync(server, frames, analyzer) -> list:
+    preprocessor = PlannerPreprocessor(SIZE)
+    return [act(analyzer, frame, server.segment(lambda tensor: preprocessor(frame, out=tensor)))
+            for frame in frames]
+
+
+def run_pipelined(server, frames, analyzer) -> list:
+    preprocessor = PlannerPreprocessor(SIZE)
+    commands = []
+    for i, frame in enumerate(frames):
+        server.submit(lambda tensor: preprocessor(frame, out=tensor))
+        if server.pending == server.slots:
+            commands.append(act(analyzer, frames[i - server.slots + 1], server.result()))
+    while server.pending:
+        commands.append(act(analyzer, frames[len(commands)], server.result()))
+    return commands
+
+
+def timed(name: str, fn, target, frames, analyzer):
+    fn(target, frames[:5], analyzer)  # warm-up
+    start = time.perf_counter()
+    commands = fn(target, frames, analyzer)
+    elapsed = time.perf_counter() - start
+    print(f"  {name:<28} {len(commands) / elapsed:7.1f} fps  {1000.0 * elapsed / len(commands):7.1f} ms/frame")
+    return commands, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--model", choices=["unet", "lraspp"], default="unet")
+    parser.add_argument("--weights", default=None, help="UNet weights (unet_resnet34Final.pth)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="torch threads, for the planner process and the server alike (default: torch's)")
+    args = parser.parse_args()
+
+    loader_args = (args.model, args.weights, args.threads)
+    frames = synthetic_frames(args.frames)
+    analyzer = PathAnalyzer(roi_start=0.5, horizons=(0.25, 0.5, 0.75), tolerance=30)
+    backend = load_model(*loader_args)
+    print(f"[Bench] {args.model}, {args.frames} frames 640x480 -> {SIZE[0]}x{SIZE[1]}, "
+          f"torch threads {torch.get_num_threads()}")
+    reference, base = timed("single thread (current)", run_in_process, backend, frames, analyzer)
+    del backend
+
+    with SegmentationServer(load_model, loader_args, device="cpu", size=SIZE) as server:
+        sync, sync_s = timed("server, synchronous", run_sync, server, frames, analyzer)
+        piped, piped_s = timed("server, double-buffered", run_pipelined, server, frames, analyzer)
+        server.report()
+
+    print(f"  speed-up {base / piped_s:.2f}x double-buffered, {base / sync_s:.2f}x synchronous | "
+          f"commands identical: {sync == reference and piped == reference}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Decision agreement of reduced-cost detection vs full-resolution detection.
+
+Usage (from the repo root):
+    python -m benchmarks.decision_agreement sessions/aisle1 --inference-scale 0.5
+    python -m benchmarks.decision_agreement sessions/aisle1 --track-interval 5 --pipelines full_follow
+
+Each follower is loaded twice with independent detectors: a baseline that
+runs pose and hand detection on the full frame every frame, and a variant
+configured with the given --inference-scale / --track-interval /
+--hand-interval. Both see the same replayed frames; the report gives the
+share of frames where they send the same command, a confusion table, and
+the detect() time of each.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import time
+from collections import Counter
+
+import numpy as np
+
+from follower_runtime import FramePacket
+from frame_source import ReplaySource
+
+from benchmarks.stage_latency import FOLLOWERS
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_fresh(name: str, tag: str):
+    """Import a follower script as a new module with its own detectors and state."""
+    spec = importlib.util.spec_from_file_location(f"{name}_{tag}", os.path.join(REPO_ROOT, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def bbox_iou(a, b) -> float:
+    if a is None or b is None:
+        return float(a is None and b is None)
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    ih = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = iw * ih
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+def run(name: str, session: str, variant_args, limit: int) -> dict:
+    baseline = load_fresh(name, "baseline")
+    baseline.configure(argparse.Namespace(inference_scale=1.0, track_interval=0,
+                                          hand_interval=1, full_frame_hands=True, headless=False,
+                                          stereo_distance=False, obstacles=False))
+    variant = load_fresh(name, "variant")
+    variant.configure(variant_args)
+
+    source = ReplaySource(session, realtime=False)
+    pairs = Counter()
+    ious = []
+    times = {"baseline": [], "variant": []}
+    frames = 0
+    while frames < limit:
+        try:
+            frame = source.get("video")
+        except EOFError:
+            break
+        packets = {}
+        for tag, module in (("baseline", baseline), ("variant", variant)):
+            # Separate copies: the detectors draw on the frame in place
+            packet = FramePacket(frame.sequence, frame.image.copy(), frame.timestamp)
+            start = time.perf_counter()
+            module.detect(packet)
+            times[tag].append(1000.0 * (time.perf_counter() - start))
+            module.decide(packet)
+            packets[tag] = packet
+        pairs[(packets["baseline"].command, packets["variant"].command)] += 1
+        ious.append(bbox_iou(packets["baseline"].bbox, packets["variant"].bbox))
+        frames += 1
+
+    agree = sum(count for (a, b), count in pairs.items() if a == b)
+    return {
+        "frames": frames,
+        "agreement": agree / frames if frames else 0.0,
+        "bbox_iou_mean": float(np.mean(ious)) if ious else 0.0,
+        "confusion": {f"{a}->{b}": count for (a, b), count in sorted(pairs.items())},
+        "detect_ms_baseline": float(np.mean(times["baseline"])) if frames else 0.0,
+        "detect_ms_variant": float(np.mean(times["variant"])) if frames else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("session", help="recorded session directory")
+    parser.add_argument("--pipelines", nargs="+", default=FOLLOWERS, choices=FOLLOWERS)
+    parser.add_argument("--inference-scale", type=float, default=0.5)
+    parser.add_argument("--track-interval", type=int, default=0)
+    parser.add_argument("--hand-interval", type=int, default=3)
+    parser.add_argument("--full-frame-hands", action="store_true")
+    parser.add_argument("--limit", type=int, default=1_000_000, help="max frames per follower")
+    parser.add_argument("--out", help="write the JSON report here")
+    args = parser.parse_args()
+
+    variant_args = argparse.Namespace(inference_scale=args.inference_scale, track_interval=args.track_interval,
+                                      hand_interval=args.hand_interval, full_frame_hands=args.full_frame_hands,
+                                      headless=False, stereo_distance=False, obstacles=False)
+    report = {"session": os.path.abspath(args.session), "variant": vars(variant_args), "pipelines": {}}
+    for name in args.pipelines:
+        result = run(name, args.session, variant_args, args.limit)
+        report["pipelines"][name] = result
+        print(f"[Agreement] {name}: {100 * result['agreement']:.1f}% of {result['frames']} frames agree, "
+              f"bbox IoU {result['bbox_iou_mean']:.2f}, detect {result['detect_ms_baseline']:.1f} -> "
+              f"{result['detect_ms_variant']:.1f} ms")
+        disagreements = {k: v for k, v in result["confusion"].items() if k[0] != k[-1]}
+        if disagreements:
+            print(f"            disagreements (baseline->variant): {disagreements}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
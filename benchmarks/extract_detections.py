@@ -0,0 +1,66 @@
+"""Batch pose/hand extraction of recorded sessions into a detection cache.
+
+Usage (from the repo root):
+    python -m benchmarks.extract_detections sessions/aisle1 sessions/aisle2 --cache cache/detections
+    python -m benchmarks.extract_detections sessions/*/ --cache cache/detections --workers 4 --chunk 128
+
+Runs the followers' full-frame PoseDetector/HandDetector over every video
+frame of the sessions that the cache doesn't hold yet, split into
+contiguous runs across a process pool, and appends the results as one
+columnar part (see detection_cache.py). Then it reads every frame back
+through the cache, as `threshold_sweep extract --cache` does, and compares
+the cost per frame: detection on a cold cache against hashing and lookup on
+a warm one. Run it again on the same sessions and nothing is detected.
+"""
+import argparse
+import time
+
+from detection_cache import CHUNK_FRAMES, CachedHandDetector, CachedPoseDetector, DetectionCache, extract
+from frame_context import FrameContext
+from frame_source import ReplaySource
+
+
+def read_back(sessions, cache: DetectionCache) -> tuple:
+    """(frames, seconds) to look every frame of `sessions` up the way a follower's detect() would."""
+    context = FrameContext()
+    pose_detector, hand_detector = CachedPoseDetector(cache, context), CachedHandDetector(cache, context)
+    frames, start = 0, time.perf_counter()
+    for session in sessions:
+        source = ReplaySource(session, realtime=False)
+        while True:
+            try:
+                image = source.get("video").image
+            except EOFError:
+                break
+            context.reset(image)
+            pose_detector.findPose(image)
+            pose_detector.findPosition(image, bboxWithHands=True)
+            hand_detector.findHands(image)
+            frames += 1
+    return frames, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("sessions", nargs="+", help="recorded session directories")
+    parser.add_argument("--cache", default="cache/detections", help="detection cache directory")
+    parser.add_argument("--workers", type=int, default=None, help="detection processes (default: one per CPU)")
+    parser.add_argument("--chunk", type=int, default=CHUNK_FRAMES, help="frames per job")
+    args = parser.parse_args()
+
+    cache = DetectionCache(args.cache)
+    print(f"[Extract] cache {cache.path}: {len(cache)} frames")
+    result = extract(args.sessions, cache, args.workers, args.chunk)
+    detect_s = result["total_s"] - result["hash_s"]
+    print(f"[Extract] {result['frames']} frames: {result['cached']} cached, {result['detected']} detected "
+          f"in {result['jobs']} jobs | hashing {result['hash_s']:.1f} s, detection {detect_s:.1f} s"
+          + (f" ({1000.0 * detect_s / result['detected']:.1f} ms/frame)" if result["detected"] else ""))
+
+    frames, lookup_s = read_back(args.sessions, cache)
+    print(f"[Extract] read back {frames} frames from the cache in {lookup_s:.2f} s "
+          f"({1000.0 * lookup_s / max(1, frames):.2f} ms/frame, replay and hashing included)")
+    cache.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""Per-stage latency benchmark over a recorded session.
+
+Usage (from the repo root):
+    python -m benchmarks.stage_latency sessions/aisle1 --out run.json
+    python -m benchmarks.stage_latency sessions/aisle1 --pipelines full_follow planner
+    python -m benchmarks.stage_latency --compare base.json run.json [--threshold 0.1 --fps-floor 10]
+
+Every pipeline runs headless in its own process over the replayed "video"
+stream (max speed). The JSON report holds p50/p95/p99/mean milliseconds per
+stage, end-to-end FPS and peak RSS. --compare flags stages whose p95 grew by
+more than --threshold, FPS drops, and FPS below --fps-floor; it exits with
+status 1 when anything regressed.
+"""
+import argparse
+import importlib
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+
+import numpy as np
+
+from command_link import CommandLink
+from follower_runtime import FramePacket
+from frame_source import ReplaySource
+
+FOLLOWERS = ["follow", "height_follow", "center_follow", "backtrack_follow",
+             "full_follow", "fist_follow", "tight_spaces"]
+PIPELINES = FOLLOWERS + ["planner"]
+
+# Detector methods timed inside detect(), by the name they get in the report
+DETECTOR_METHODS = {"findPose": "findPose", "findPosition": "findPosition",
+                    "findHands": "findHands", "process": "hands.process"}
+
+
+class StageTimes:
+    """Collects per-call durations (ms) for named stages."""
+
+    def __init__(self):
+        self.samples = {}
+
+    def add(self, name: str, ms: float):
+        self.samples.setdefault(name, []).append(ms)
+
+    def wrap(self, fn, name: str):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(name, 1000.0 * (time.perf_counter() - start))
+        return timed
+
+    def call(self, name: str, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        self.add(name, 1000.0 * (time.perf_counter() - start))
+        return result
+
+    def summary(self) -> dict:
+        out = {}
+        for name, values in self.samples.items():
+            values = np.asarray(values)
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            out[name] = {"count": int(values.size), "mean": float(values.mean()),
+                         "p50": float(p50), "p95": float(p95), "p99": float(p99)}
+        return out
+
+
+def start_sink() -> int:
+    """Local TCP server that swallows commands, so sends cost what they do live."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+
+    def drain():
+        while True:
+            conn, _ = server.accept()
+            while conn.recv(4096):
+                pass
+
+    threading.Thread(target=drain, daemon=True).start()
+    return server.getsockname()[1]
+
+
+def instrument_detectors(module, times: StageTimes):
+    """Time the MediaPipe / cvzone calls made by a follower's detect()."""
+    for value in list(vars(module).values()):
+        for method, name in DETECTOR_METHODS.items():
+            fn = getattr(value, method, None)
+            if callable(fn) and not isinstance(value, (type, types.ModuleType)):
+                setattr(value, method, times.wrap(fn, name))
+
+
+def run_follower(name: str, source: ReplaySource, link: CommandLink, times: StageTimes, limit: int,
+                 options: argparse.Namespace) -> int:
+    module = importlib.import_module(name)
+    module.configure(options)
+    instrument_detectors(module, times)
+    frames = 0
+    while frames < limit:
+        try:
+            frame = source.get("video")
+        except EOFError:
+            break
+        start = time.perf_counter()
+        packet = FramePacket(frame.sequence, frame.image, frame.timestamp)
+        times.call("detect", module.detect, packet)
+        times.call("decide", module.decide, packet)
+        times.call("render", module.draw, packet)
+        times.call("send", link.send, packet.command)
+        times.add("total", 1000.0 * (time.perf_counter() - start))
+        frames += 1
+    return frames
+
+
+def run_planner(source: ReplaySource, link: CommandLink, times: StageTimes, limit: int) -> int:
+    planner = importlib.import_module("planner")
+    planner.load_model()
+    planner.preprocessor = times.wrap(planner.preprocessor, "preprocess")
+    planner.backend = times.wrap(planner.backend, "unet")
+    frames = 0
+    while frames < limit:
+        try:
+            frame = source.get("video").image
+        except EOFError:
+            break
+        start = time.perf_counter()
+        mask_np = times.call("segment", planner.segment, frame)
+        geometry = times.call("analyze", planner.path_analyzer.analyze, mask_np)
+        times.call("send", link.send, planner.path_analyzer.command(geometry))
+        times.call("render", planner.render_overlay, frame, mask_np)
+        times.add("total", 1000.0 * (time.perf_counter() - start))
+        frames += 1
+    return frames
+
+
+def run_one(pipeline: str, session: str, limit: int, options: argparse.Namespace) -> dict:
+    source = ReplaySource(session, realtime=False)
+    times = StageTimes()
+    link = CommandLink("127.0.0.1", start_sink(), name="Bench").start()
+    start = time.perf_counter()
+    try:
+        if pipeline == "planner":
+            frames = run_planner(source, link, times, limit)
+        else:
+            frames = run_follower(pipeline, source, link, times, limit, options)
+    finally:
+        link.close()
+    elapsed = time.perf_counter() - start
+    return {
+        "frames": frames,
+        "fps": frames / elapsed if elapsed > 0 else 0.0,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+        "stages": times.summary(),
+        "link": link.stats(),
+    }
+
+
+def run_all(session: str, pipelines, limit: int, options: argparse.Namespace) -> dict:
+    report = {"session": os.path.abspath(session), "created": time.time(),
+              "options": vars(options), "pipelines": {}}
+    for pipeline in pipelines:
+        print(f"[Bench] {pipeline} ...", flush=True)
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+            out = tmp.name
+        # One process per pipeline so peak RSS and model state don't leak between runs
+        cmd = [sys.executable, "-m", "benchmarks.stage_latency", session,
+               "--single", pipeline, "--limit", str(limit), "--out", out,
+               "--inference-scale", str(options.inference_scale),
+               "--track-interval", str(options.track_interval),
+               "--hand-interval", str(options.hand_interval)]
+        if options.full_frame_hands:
+            cmd.append("--full-frame-hands")
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL)
+        if result.returncode != 0:
+            report["pipelines"][pipeline] = {"error": f"exit status {result.returncode}"}
+        else:
+            with open(out) as f:
+                report["pipelines"][pipeline] = json.load(f)
+        os.unlink(out)
+    return report
+
+
+def print_report(report: dict):
+    for pipeline, result in report["pipelines"].items():
+        if "error" in result:
+            print(f"{pipeline}: FAILED ({result['error']})")
+            continue
+        print(f"{pipeline}: {result['frames']} frames, {result['fps']:.1f} fps, "
+              f"peak RSS {result['peak_rss_mb']:.0f} MB")
+        for stage, s in result["stages"].items():
+            print(f"  {stage:<14} p50 {s['p50']:8.2f}  p95 {s['p95']:8.2f}  p99 {s['p99']:8.2f} ms")
+
+
+def compare(base: dict, new: dict, threshold: float, fps_floor: float) -> list:
+    """Return human-readable regressions of `new` against `base`."""
+    problems = []
+    for pipeline, result in new["pipelines"].items():
+        if "error" in result:
+            problems.append(f"{pipeline}: run failed ({result['error']})")
+            continue
+        if fps_floor and result["fps"] < fps_floor:
+            problems.append(f"{pipeline}: {result['fps']:.1f} fps is below the {fps_floor:.1f} fps floor")
+        old = base["pipelines"].get(pipeline)
+        if not old or "error" in old:
+            continue
+        if result["fps"] < old["fps"] * (1 - threshold):
+            problems.append(f"{pipeline}: fps {old['fps']:.1f} -> {result['fps']:.1f}")
+        for stage, s in result["stages"].items():
+            before = old["stages"].get(stage)
+            if before and s["p95"] > before["p95"] * (1 + threshold) and s["p95"] - before["p95"] > 0.05:
+                problems.append(f"{pipeline}/{stage}: p95 {before['p95']:.2f} -> {s['p95']:.2f} ms")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("session", nargs="?", help="recorded session directory")
+    parser.add_argument("--pipelines", nargs="+", default=PIPELINES, choices=PIPELINES)
+    parser.add_argument("--limit", type=int, default=1_000_000, help="max frames per pipeline")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--inference-scale", type=float, default=1.0, help="follower detector scale")
+    parser.add_argument("--track-interval", type=int, default=0, help="follower detect-then-track interval")
+    parser.add_argument("--hand-interval", type=int, default=3, help="follower wrist-ROI fist check interval")
+    parser.add_argument("--full-frame-hands", action="store_true", help="follower full-frame hand detection")
+    parser.add_argument("--single", choices=PIPELINES, help=argparse.SUPPRESS)
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="compare two JSON reports")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative slowdown")
+    parser.add_argument("--fps-floor", type=float, default=0.0, help="minimum acceptable fps")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            base = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        problems = compare(base, new, args.threshold, args.fps_floor)
+        for problem in problems:
+            print(f"[Bench] REGRESSION {problem}")
+        if not problems:
+            print("[Bench] No regressions.")
+        sys.exit(1 if problems else 0)
+
+    if not args.session:
+        parser.error("a session directory is required unless --compare is used")
+
+    options = argparse.Namespace(inference_scale=args.inference_scale, track_interval=args.track_interval,
+                                 hand_interval=args.hand_interval, full_frame_hands=args.full_frame_hands,
+                                 headless=False, stereo_distance=False, obstacles=False)
+    if args.single:
+        report = run_one(args.single, args.session, args.limit, options)
+    else:
+        report = run_all(args.session, args.pipelines, args.limit, options)
+        print_report(report)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    elif not args.single:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Threshold sweep of the follower decision policies over recorded detections.
+
+Usage (from the repo root):
+    python -m benchmarks.threshold_sweep extract sessions/aisle1 --out logs/aisle1.npz
+    python -m benchmarks.threshold_sweep extract sessions/aisle1 --out logs/aisle1.npz --cache cache/detections
+    python -m benchmarks.threshold_sweep sweep logs/aisle1.npz logs/aisle2.npz --policy backtrack_follow
+    python -m benchmarks.threshold_sweep sweep logs/*.npz --policy center_follow \\
+        --set lower_height=400:800:20 --set upper_height=700:1100:20 --set tolerance=64,128,192
+    python -m benchmarks.threshold_sweep sweep --synthetic 20000   # timing without a recording
+
+`extract` replays a session through one follower's detect() once and saves
+the per-frame bbox, fist-stop state and stereo distance; with --cache the
+pose and hand detections come from a DetectionCache instead, and only frames
+it lacks are detected (across --workers processes). `sweep` evaluates
+every combination of the given parameter values over those logs with the
+array policies in decision_policy.py - the same functions the followers'
+decide() call - and reports, per setting, the share of each command, the
+command churn (share of consecutive frames where the command changes) and
+the agreement with the follower's current thresholds. Parameters without
+--set use the follower's values; with no --set at all a default grid of a
+few thousand settings is swept.
+"""
+import argparse
+import importlib
+import json
+import os
+import time
+
+import numpy as np
+
+from decision_policy import COMMANDS, POLICIES, DetectionLog, command_stats, parameter_grid, sweep
+from detection_cache import CachedHandDetector, CachedPoseDetector, DetectionCache, extract as extract_detections
+from follower_runtime import FramePacket
+from frame_source import ReplaySource
+
+# Grid swept when no --set is given, per policy
+DEFAULT_RANGES = {
+    "height_follow": {"stop_height": "500:1000:10", "tolerance": "32:320:16"},
+    "backtrack_follow": {"lower_height": "300:800:10", "tolerance": "32:320:16",
+                         "close_height_ratio": "0.7:1.0:0.05"},
+    "center_follow": {"lower_height": "400:800:20", "upper_height": "600:1000:20", "tolerance": "32:320:32"},
+    "full_follow": {"near_m": "0.5:1.5:0.1", "stop_m": "1.5:3.0:0.1", "tolerance": "32:320:32"},
+}
+
+
+def extract(session: str, pipeline: str, limit: int, stereo_distance: bool, cache_dir: str = None,
+            workers: int = None) -> DetectionLog:
+    """Run `pipeline`'s detect() over a recorded session and collect its detections."""
+    module = importlib.import_module(pipeline)
+    module.configure(argparse.Namespace(inference_scale=1.0, track_interval=0, hand_interval=1,
+                                        full_frame_hands=True, headless=True,
+                                        stereo_distance=stereo_distance, obstacles=False))
+    if cache_dir:
+        # The cache holds exactly these full-frame detections; fill in what it lacks first
+        cache = DetectionCache(cache_dir)
+        result = extract_detections([session], cache, workers)
+        print(f"[Sweep] {result['cached']} of {result['frames']} frames cached, detected {result['detected']} "
+              f"in {result['total_s']:.1f} s")
+        module.pose_detector = CachedPoseDetector(cache, module.context, fallback=module.pose_detector)
+        if getattr(module, "hand_detector", None) is not None:
+            module.hand_detector = CachedHandDetector(cache, module.context, fallback=module.hand_detector)
+    source = ReplaySource(session, realtime=False)
+    if stereo_distance:
+        module.stereo.calibrate_from_source(source)
+    rows = []
+    while len(rows) < limit:
+        try:
+            if hasattr(module, "capture"):
+                packet = module.capture(source)
+            else:
+                frame = source.get("video")
+                packet = FramePacket(frame.sequence, frame.image, frame.timestamp)
+        except EOFError:
+            break
+        module.detect(packet)
+        present = packet.bbox is not None and not packet.stopped
+        rows.append((packet.timestamp, packet.bbox if packet.bbox is not None else (0, 0, 0, 0), present,
+                     packet.distance if packet.distance is not None else np.nan))
+    start = np.zeros(len(rows), bool)
+    start[:1] = True
+    return DetectionLog(np.array([r[0] for r in rows], np.float64), np.array([r[1] for r in rows], np.int32),
+                        np.array([r[2] for r in rows], bool), np.array([r[3] for r in rows], np.float64), start)
+
+
+def synthetic_log(frames: int, seed: int = 0) -> DetectionLog:
+    """Random-walk person track (approach, back off, drift sideways, drop-outs) for timing runs."""
+    rng = np.random.default_rng(seed)
+    h = np.clip(600 + np.cumsum(rng.normal(0, 8, frames)), 150, 1100)
+    w = (0.45 * h).clip(30, 1280)
+    cx = np.clip(640 + np.cumsum(rng.normal(0, 6, frames)), 0, 1280)
+    bbox = np.stack([cx - w / 2, np.zeros(frames), w, h], axis=1).astype(np.int32)
+    present = rng.random(frames) > 0.05
+    distance = np.where(rng.random(frames) < 0.7, 1000.0 / h + rng.normal(0, 0.05, frames), np.nan)
+    start = np.zeros(frames, bool)
+    start[0] = True
+    return DetectionLog(np.arange(frames) / 30.0, bbox, present, distance, start)
+
+
+def parse_values(spec: str) -> np.ndarray:
+    """'a:b:step' (b inclusive) or 'v1,v2,...'."""
+    if ":" in spec:
+        start, stop, step = (float(v) for v in spec.split(":"))
+        return np.arange(start, stop + step / 2, step)
+    return np.array([float(v) for v in spec.split(",")])
+
+
+def run_sweep(args):
+    policy = POLICIES[args.policy]
+    log = DetectionLog.load(*args.logs) if args.logs else synthetic_log(args.synthetic)
+    ranges = dict(item.split("=", 1) for item in args.set) if args.set else DEFAULT_RANGES[args.policy]
+    params = parameter_grid({name: parse_values(spec) for name, spec in ranges.items()})
+    settings = len(next(iter(params.values())))
+
+    # The follower's own thresholds are the policy's defaults
+    x, w, h = log.bbox[:, 0], log.bbox[:, 2], log.bbox[:, 3]
+    extra = {"distance": log.distance} if args.policy == "full_follow" else {}
+    current, _ = policy(x, w, h, log.present, **extra)
+    current_counts, current_changes = command_stats(current[None], log.start)
+
+    start = time.perf_counter()
+    result = sweep(policy, log, params, reference=current)
+    elapsed = time.perf_counter() - start
+
+    frames = max(1, result["frames"])
+    shares = result["counts"] / frames
+    order = np.argsort(result["churn"], kind="stable")
+    print(f"[Sweep] {args.policy}: {settings} settings x {result['frames']} frames in {elapsed:.2f} s "
+          f"({settings * result['frames'] / elapsed / 1e6:.0f} M decisions/s)")
+    header = "  ".join(f"{name:>12}" for name in params) + "  " + "  ".join(f"{c:>5}" for c in COMMANDS)
+    print(f"  {header}  {'churn':>6}  {'agree':>6}")
+    print("  " + "  ".join(f"{'(current)':>12}" for _ in params) + "  "
+          + "  ".join(f"{s:5.1%}" for s in current_counts[0] / frames)
+          + f"  {current_changes[0] / max(1, result['transitions']):6.1%}  {1:6.1%}")
+    for i in order[:args.top]:
+        values = "  ".join(f"{params[name][i, 0]:12g}" for name in params)
+        print(f"  {values}  " + "  ".join(f"{s:5.1%}" for s in shares[i])
+              + f"  {result['churn'][i]:6.1%}  {result['agree'][i]:6.1%}")
+
+    if args.out:
+        report = {"policy": args.policy, "logs": [os.path.abspath(p) for p in args.logs],
+                  "frames": result["frames"], "elapsed_s": elapsed,
+                  "settings": [{**{name: float(params[name][i, 0]) for name in params},
+                                **{c: float(shares[i, j]) for j, c in enumerate(COMMANDS)},
+                                "churn": float(result["churn"][i]), "agree": float(result["agree"][i])}
+                               for i in order]}
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("extract", help="replay a session through detect() and save its detections")
+    p.add_argument("session", help="recorded session directory")
+    p.add_argument("--out", required=True, help="detection log to write (.npz)")
+    p.add_argument("--pipeline", default="full_follow",
+                   choices=["height_follow", "backtrack_follow", "center_follow", "full_follow"],
+                   help="follower whose detect() produces the log")
+    p.add_argument("--stereo-distance", action="store_true",
+                   help="also log stereo distance (full_follow, sessions recorded with disparity)")
+    p.add_argument("--limit", type=int, default=1_000_000, help="max frames")
+    p.add_argument("--cache", metavar="DIR", help="detection cache to read pose/hand detections from")
+    p.add_argument("--workers", type=int, default=None,
+                   help="processes detecting the frames missing from --cache (default: one per CPU)")
+
+    p = commands.add_parser("sweep", help="evaluate a grid of thresholds over detection logs")
+    p.add_argument("logs", nargs="*", help="detection logs from `extract`, concatenated")
+    p.add_argument("--policy", default="backtrack_follow", choices=list(POLICIES))
+    p.add_argument("--set", action="append", metavar="NAME=VALUES",
+                   help="parameter values, 'start:stop:step' or 'v1,v2,...' (repeatable)")
+    p.add_argument("--synthetic", type=int, default=20000, metavar="FRAMES",
+                   help="frames of a synthetic track, used when no logs are given")
+    p.add_argument("--top", type=int, default=15, help="settings to print, lowest churn first")
+    p.add_argument("--out", help="write every setting to this JSON report")
+    args = parser.parse_args()
+
+    if args.command == "extract":
+        log = extract(args.session, args.pipeline, args.limit, args.stereo_distance, args.cache, args.workers)
+        log.save(args.out)
+        print(f"[Sweep] {len(log)} frames, person present in {log.present.mean():.0%} -> {args.out}")
+    else:
+        run_sweep(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+import json
+import multiprocessing as mp
+import os
+import shutil
+import signal
+import subprocess
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+
+def _ring_views(buf, slots: int, shape):
+    """(frames, sequences, timestamps, written) views of the ring's shared block."""
+    frame_bytes = slots * int(np.prod(shape))
+    frames = np.ndarray((slots,) + tuple(shape), np.uint8, buf)
+    sequences = np.ndarray((slots,), np.int64, buf, frame_bytes)
+    timestamps = np.ndarray((slots,), np.float64, buf, frame_bytes + 8 * slots)
+    written = np.ndarray((1,), np.int64, buf, frame_bytes + 16 * slots)
+    return frames, sequences, timestamps, written
+
+
+class VideoSink:
+    """H.264 through an ffmpeg child process reading raw BGR frames on stdin, or OpenCV's
+    mp4v writer where ffmpeg isn't installed."""
+
+    def __init__(self, path: str, fps: float, size):
+        w, h = size
+        self.path = path
+        self._proc = self._writer = None
+        if shutil.which("ffmpeg"):
+            self._proc = subprocess.Popen(
+                ["ffmpeg", "-loglevel", "error", "-y", "-f", "rawvideo", "-pix_fmt", "bgr24",
+                 "-s", f"{w}x{h}", "-r", f"{fps:g}", "-i", "-", "-c:v", "libx264", "-preset", "veryfast",
+                 "-pix_fmt", "yuv420p", path], stdin=subprocess.PIPE)
+        else:
+            self._writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+
+    def write(self, frame: np.ndarray):
+        if self._proc is not None:
+            self._proc.stdin.write(memoryview(frame).cast("B"))
+        else:
+            self._writer.write(frame)
+
+    def close(self):
+        if self._proc is not None:
+            self._proc.stdin.close()
+            self._proc.wait()
+        else:
+            self._writer.release()
+
+
+def _read(frames, sequences, timestamps, sequence: int):
+    """(copy of frame `sequence`, its timestamp) from the ring, or None if it was overwritten meanwhile."""
+    slot = sequence % len(frames)
+    if sequences[slot] != sequence:
+        return None
+    frame, timestamp = frames[slot].copy(), float(timestamps[slot])
+    return (frame, timestamp) if sequences[slot] == sequence else None
+
+
+def _write_clip(path: str, fps: float, size, clip: dict):
+    sink = VideoSink(path, fps, size)
+    for frame in clip["frames"]:
+        sink.write(frame)
+    sink.close()
+    t0 = clip["timestamps"][0] if clip["timestamps"] else 0.0
+    with open(os.path.splitext(path)[0] + ".json", "w") as f:
+        json.dump({"events": [{"event": event, "t": at - t0} for event, at in clip["events"]],
+                   "frames": len(clip["frames"]), "lost": clip["lost"],
+                   "t": [stamp - t0 for stamp in clip["timestamps"]]}, f, indent=2)
+    print(f"[BlackBox] Saved {len(clip['frames'])} frames around {clip['events'][0][0]} to {path}")
+
+
+def _encode(shm_name: str, slots: int, shape, fps: float, directory: str, post: float, session_video: str,
+            conn):
+    """Encoder process: drains the ring into the session video and writes a clip per event."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    frames, sequences, timestamps, written = _ring_views(shm.buf, slots, shape)
+    size = (shape[1], shape[0])
+    session = VideoSink(session_video, fps, size) if session_video else None
+    next_sequence, session_lost = 0, 0
+    pending = []  # clips waiting for their post-event frames: {"events": [...], "until": t}
+    writers = []
+    closing = False
+    try:
+        while True:
+            if not closing and conn.poll(0.5 / fps):
+                message = conn.recv()
+                if message is None:
+                    closing = True
+                else:
+                    event, at = message
+                    # An event inside a clip that is still being collected joins that clip, which
+                    # then also waits for this event's aftermath
+                    if pending and at <= pending[-1]["until"]:
+                        pending[-1]["events"].append((event, at))
+                        pending[-1]["until"] = max(pending[-1]["until"], at + post)
+                    else:
+                        pending.append({"events": [(event, at)], "until": at + post})
+
+            if session is not None:
+                newest = int(written[0])
+                if newest - next_sequence > slots - 1:
+                    # Fell a whole ring behind: those frames are gone
+                    session_lost += newest - (slots - 1) - next_sequence
+                    next_sequence = newest - (slots - 1)
+                while next_sequence < newest:
+                    read = _read(frames, sequences, timestamps, next_sequence)
+                    if read is None:
+                        session_lost += 1
+                    else:
+                        session.write(read[0])
+                    next_sequence += 1
+
+            while pending and (closing or time.monotonic() >= pending[0]["until"]):
+                clip = pending.pop(0)
+                # Copy the whole ring out first (oldest first), then encode at leisure
+                clip.update(frames=[], timestamps=[], lost=0)
+                newest = int(written[0])
+                for sequence in range(max(0, newest - slots), newest):
+                    read = _read(frames, sequences, timestamps, sequence)
+                    if read is None:
+                        clip["lost"] += 1
+                        continue
+                    clip["frames"].append(read[0])
+                    clip["timestamps"].append(read[1])
+                if not clip["frames"]:
+                    continue
+                stamp = time.strftime("%Y%m%d-%H%M%S")
+                path = os.path.join(directory, f"{stamp}-{clip['events'][0][0]}.mp4")
+                writer = threading.Thread(target=_write_clip, args=(path, fps, size, clip))
+                writer.start()
+                writers.append(writer)
+
+            if closing and not pending:
+                break
+    finally:
+        for writer in writers:
+            writer.join()
+        if session is not None:
+            session.close()
+            print(f"[BlackBox] Session video {session_video}" + (f", {session_lost} frames lost" if session_lost
+                                                                  else ""))
+        del frames, sequences, timestamps, written
+        shm.close()
+
+
+class BlackBox:
+    """Keeps the last `seconds` of camera frames and saves them as a video clip on events.
+
+    record() copies each frame into a fixed ring of `seconds * fps` slots in
+    shared memory - one memcpy, nothing else on the caller's thread - and
+    skips frames arriving faster than `fps`. trigger(event) asks the encoder
+    process to save the ring `post` seconds later, so the clip shows the
+    lead-up and the aftermath; events within a clip's window join it and
+    push the save out to their own `post` seconds. Clips
+    go to `directory` as <time>-<event>.mp4 with a .json of the events and
+    frame times. An event repeating within `seconds` of its last clip is
+    ignored, e.g. the link's reconnect attempts while the controller is
+    down. With `session_video` the encoder also writes every recorded frame
+    to that file as it goes. Encoding (ffmpeg, or OpenCV without it) never
+    runs in the recording process.
+    """
+
+    def __init__(self, directory: str, size, seconds: float = 10.0, post: float = 2.0, fps: float = 15.0,
+                 session_video: str = None):
+        w, h = size
+        self.shape = (h, w, 3)
+        self.slots = max(2, int(round(seconds * fps)))
+        self.seconds = seconds
+        self.interval = 1.0 / fps
+        self.recorded = 0
+        self.skipped = 0
+        self.mismatched = 0
+        self.triggered = []
+        self.suppressed = 0
+        self._due = None  # when the next frame is wanted
+        self._last_event = {}  # event -> time.monotonic() it last triggered a clip
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        frame_bytes = self.slots * int(np.prod(self.shape))
+        self._shm = shared_memory.SharedMemory(create=True, size=frame_bytes + 16 * self.slots + 8)
+        self.frames, self.sequences, self.timestamps, self.written = _ring_views(self._shm.buf, self.slots,
+                                                                                 self.shape)
+        # Touch every page now, so record() never takes a page fault on a fresh slot
+        self.frames.fill(0)
+        self.sequences[:] = -1
+        self.written[0] = 0
+
+        # spawn: forking a process with camera and detector threads running is unsafe
+        context = mp.get_context("spawn")
+        self._conn, child = context.Pipe()
+        self._process = context.Process(
+            target=_encode, name="blackbox", daemon=True,
+            args=(self._shm.name, self.slots, self.shape, fps, directory, post, session_video, child))
+        self._process.start()
+        child.close()
+        print(f"[BlackBox] Keeping the last {self.slots / fps:.0f} s at {fps:g} fps "
+              f"({frame_bytes / 2 ** 20:.0f} MB), clips to {directory}")
+
+    def record(self, frame: np.ndarray, timestamp: float = None):
+        """Copy `frame` into the ring, unless the ring already has one for this 1/fps slot."""
+        now = time.monotonic() if timestamp is None else timestamp
+        # A quarter interval of slack, so camera jitter doesn't skip every other due frame
+        if self._due is not None and now < self._due - 0.25 * self.interval:
+            self.skipped += 1
+            return
+        if frame.shape != self.shape:
+            self.mismatched += 1
+            return
+        self._due = now + self.interval if self._due is None else max(self._due + self.interval,
+                                                                     now + 0.5 * self.interval)
+        sequence = self.recorded
+        slot = sequence % self.slots
+        # The encoder checks the slot's sequence before and after copying it out
+        self.sequences[slot] = -1
+        np.copyto(self.frames[slot], frame)
+        self.timestamps[slot] = now
+        self.sequences[slot] = sequence
+        self.recorded = sequence + 1
+        self.written[0] = self.recorded
+
+    def trigger(self, event: str):
+        """Save the ring shortly; safe to call from any thread."""
+        now = time.monotonic()
+        with self._lock:
+            if self._conn is None:
+                return
+            if now - self._last_event.get(event, float("-inf")) < self.seconds:
+                self.suppressed += 1
+                return
+            self._last_event[event] = now
+            self.triggered.append(event)
+            try:
+                self._conn.send((event, now))
+            except OSError:
+                pass
+
+    def report(self):
+        mismatched = f" | {self.mismatched} frames of another size" if self.mismatched else ""
+        print(f"[BlackBox] recorded {self.recorded} | skipped {self.skipped} (over fps) | "
+              f"events {len(self.triggered)} (+{self.suppressed} repeats){mismatched}")
+
+    def close(self, timeout: float = 60.0):
+        """Save clips still waiting for their post-event frames, finish the session video and stop."""
+        with self._lock:
+            conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            conn.send(None)
+        except OSError:
+            pass
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join()
+        conn.close()
+        self.frames = self.sequences = self.timestamps = self.written = None
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def add_blackbox_args(parser):
+    """Add --blackbox / --blackbox-seconds / --blackbox-post / --blackbox-fps / --session-video."""
+    group = parser.add_argument_group("black box")
+    group.add_argument("--blackbox", metavar="DIR",
+                       help="keep the last seconds of video in memory and save them to DIR on fist stop, "
+                            "backoff, controller TCP errors, 'b' in the window or SIGUSR1")
+    group.add_argument("--blackbox-seconds", type=float, default=10.0, help="seconds of video kept")
+    group.add_argument("--blackbox-post", type=float, default=2.0,
+                       help="seconds recorded after an event before its clip is saved")
+    group.add_argument("--blackbox-fps", type=float, default=15.0, help="frames per second kept")
+    group.add_argument("--session-video", metavar="FILE",
+                       help="also encode every kept frame to FILE (needs --blackbox)")
+    return parser
+
+
+def open_blackbox(args, size, link=None):
+    """BlackBox for --blackbox, or None. TCP errors of `link` and SIGUSR1 trigger clips."""
+    if not args.blackbox:
+        return None
+    blackbox = BlackBox(args.blackbox, size, args.blackbox_seconds, args.blackbox_post, args.blackbox_fps,
+                        args.session_video)
+    if link is not None:
+        link.on_error = lambda error: blackbox.trigger("tcp-error")
+    if hasattr(signal, "SIGUSR1"):
+        # From a thread: the handler may interrupt the main thread inside trigger()
+        signal.signal(signal.SIGUSR1, lambda *_: threading.Thread(target=blackbox.trigger, args=("manual",),
+                                                                  daemon=True).start())
+    return blackbox
@@ -0,0 +1,309 @@
+import socket
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from command_protocol import ACK_FRAME, PROTOCOLS, decode_ack, encode_command
+
+
+class CommandLink:
+    """Persistent TCP link to controller.py that never blocks the caller.
+
+    send() only queues the command; a background thread owns the socket,
+    writes the single-character commands, and reconnects with exponential
+    backoff whenever the controller drops. Repeats of the last command are
+    collapsed and only re-sent every `resend_interval` seconds as a
+    keepalive, instead of once per frame. Command changes are printed
+    unless `log_commands` is off (e.g. when telemetry records them).
+
+    With protocol="framed" every command goes out as a COMMAND_FRAME
+    (sequence number, send timestamp, twist) and a second thread reads the
+    controller's acks, timing each round trip against the echoed timestamp.
+    "legacy" writes the bare characters and drops the twist.
+    """
+
+    def __init__(self, host: str, port: int, name: str = "Follower",
+                 resend_interval: float = 0.5, queue_size: int = 8,
+                 connect_timeout: float = 2.0, send_timeout: float = 0.5,
+                 min_backoff: float = 0.1, max_backoff: float = 5.0, log_commands: bool = True,
+                 protocol: str = "legacy"):
+        if protocol not in PROTOCOLS:
+            raise ValueError(f"unknown protocol '{protocol}' (choose from {', '.join(PROTOCOLS)})")
+        self.host = host
+        self.port = port
+        self.name = name
+        self.resend_interval = resend_interval
+        self.connect_timeout = connect_timeout
+        self.send_timeout = send_timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.log_commands = log_commands
+        self.protocol = protocol
+
+        self._queue = deque(maxlen=queue_size)
+        self._cond = threading.Condition()
+        self._closing = threading.Event()
+        self._thread = None
+        self._sock = None
+        self._last_queued = None
+        self._last_sent = None
+        self._last_sent_at = 0.0
+        self._ever_connected = False
+        self._connected = threading.Event()  # set once the first connection is up
+        self._sequence = 0
+        self.on_error = None  # called with the OSError on every TCP error, from the link thread
+
+        # Counters
+        self.sent = 0
+        self.collapsed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.reconnects = 0
+        self.max_queue_depth = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self._total_latency = 0.0
+        # Framed protocol: acknowledged frames and their round trips (seconds) and apply delays
+        self.acked = 0
+        self.last_rtt = 0.0
+        self._rtts = deque(maxlen=1000)
+        self._apply_delays = deque(maxlen=1000)
+
+    def start(self):
+        if self._thread is None:  # already started links can still be used in a with block
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-link", daemon=True)
+            self._thread.start()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def connected(self) -> bool:
+        return self._sock is not None
+
+    def wait_connected(self, timeout: float = None) -> bool:
+        """Block until the controller has been connected once (True), or `timeout` runs out."""
+        return self._connected.wait(timeout)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def send(self, command: str, twist=None):
+        """Queue a command, with an optional (linear m/s, angular rad/s) twist for the framed
+        protocol (default: the command's entry in TWISTS); identical consecutive commands
+        are collapsed."""
+        item = (command, twist if self.protocol == "framed" else None)
+        with self._cond:
+            if item == self._last_queued:
+                self.collapsed += 1
+                return
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append(item)
+            self._last_queued = item
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            self._cond.notify()
+
+    def close(self, final: str = 'x', timeout: float = 1.0):
+        """Flush queued commands, send `final` and shut the link down."""
+        if final is not None:
+            with self._cond:
+                self._queue.append((final, None))
+                self._last_queued = (final, None)
+                self._cond.notify()
+        self._closing.set()
+        with self._cond:
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._disconnect()
+
+    def stats(self) -> dict:
+        rtts = np.asarray(self._rtts) * 1000.0
+        delays = np.asarray(self._apply_delays) * 1000.0
+        return {
+            "connected": self.connected,
+            "sent": self.sent,
+            "collapsed": self.collapsed,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "reconnects": self.reconnects,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "last_latency_ms": 1000.0 * self.last_latency,
+            "avg_latency_ms": 1000.0 * self._total_latency / self.sent if self.sent else 0.0,
+            "max_latency_ms": 1000.0 * self.max_latency,
+            "acked": self.acked,
+            "last_rtt_ms": 1000.0 * self.last_rtt,
+            "avg_rtt_ms": float(rtts.mean()) if len(rtts) else 0.0,
+            "p95_rtt_ms": float(np.percentile(rtts, 95)) if len(rtts) else 0.0,
+            "max_rtt_ms": float(rtts.max()) if len(rtts) else 0.0,
+            "avg_apply_ms": float(delays.mean()) if len(delays) else 0.0,
+        }
+
+    def report(self):
+        s = self.stats()
+        print(f"[{self.name}] link {'up' if s['connected'] else 'down'} | sent {s['sent']} "
+              f"collapsed {s['collapsed']} dropped {s['dropped']} | queue {s['queue_depth']} "
+              f"(max {s['max_queue_depth']}) | send {s['avg_latency_ms']:.2f} ms avg "
+              f"{s['max_latency_ms']:.2f} ms max | reconnects {s['reconnects']}"
+              + (f" | acked {s['acked']} rtt {s['avg_rtt_ms']:.2f} ms avg {s['p95_rtt_ms']:.2f} ms p95 "
+                 f"{s['max_rtt_ms']:.2f} ms max, applied after {s['avg_apply_ms']:.2f} ms"
+                 if self.protocol == "framed" else ""))
+
+    def _connect(self) -> bool:
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+        except OSError as e:
+            print(f"[{self.name}][TCP ERROR]: {e}")
+            self._error(e)
+            return False
+        # A stalled or half-open connection times out instead of hanging the sender
+        sock.settimeout(self.send_timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock = sock
+        if self.protocol == "framed":
+            threading.Thread(target=self._read_acks, args=(sock,), name=f"{self.name}-acks",
+                             daemon=True).start()
+        print(f"[{self.name}] Connected to controller at {self.host}:{self.port} ({self.protocol})")
+        return True
+
+    def _error(self, error: OSError):
+        if self.on_error is not None:
+            self.on_error(error)
+
+    def _disconnect(self):
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def _read_acks(self, sock):
+        """Time acknowledged frames until `sock` is closed or replaced."""
+        buffer = b""
+        while sock is self._sock:
+            try:
+                data = sock.recv(4096)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            if not data:
+                break
+            buffer += data
+            now = time.monotonic()
+            while len(buffer) >= ACK_FRAME.size:
+                frame, buffer = buffer[:ACK_FRAME.size], buffer[ACK_FRAME.size:]
+                try:
+                    _, sent_at, apply_delay = decode_ack(frame)
+                except ValueError as e:
+                    print(f"[{self.name}][TCP ERROR]: {e}")
+                    return
+                self.acked += 1
+                self.last_rtt = now - sent_at
+                self._rtts.append(self.last_rtt)
+                self._apply_delays.append(apply_delay)
+
+    def _encode(self, item) -> bytes:
+        command, twist = item
+        if self.protocol == "legacy":
+            return command.encode()
+        self._sequence += 1
+        return encode_command(self._sequence, time.monotonic(), command, twist)
+
+    def _next_command(self):
+        """Wait for a queued command, or return the keepalive repeat."""
+        with self._cond:
+            if not self._queue and not self._closing.is_set():
+                if self._last_sent is None:
+                    # Nothing to keep alive yet: sleep until send() or close()
+                    self._cond.wait()
+                else:
+                    wait = self.resend_interval - (time.monotonic() - self._last_sent_at)
+                    if wait > 0:
+                        self._cond.wait(wait)
+            if self._queue:
+                return self._queue.popleft()
+        if self._closing.is_set():
+            return None
+        if self._last_sent is not None and time.monotonic() - self._last_sent_at >= self.resend_interval:
+            return self._last_sent
+        return None
+
+    def _run(self):
+        backoff = self.min_backoff
+        pending = None
+        while True:
+            if self._sock is None:
+                if self._closing.is_set() and pending is None and not self._queue:
+                    break
+                if not self._connect():
+                    if self._closing.is_set():
+                        break
+                    self._closing.wait(backoff)
+                    backoff = min(backoff * 2, self.max_backoff)
+                    continue
+                if self._ever_connected:
+                    self.reconnects += 1
+                self._ever_connected = True
+                self._connected.set()
+                backoff = self.min_backoff
+                # Re-assert the last state after a reconnect
+                if pending is None:
+                    pending = self._last_sent
+
+            if pending is None:
+                pending = self._next_command()
+                if pending is None:
+                    if self._closing.is_set() and not self._queue:
+                        break
+                    continue
+
+            start = time.perf_counter()
+            try:
+                self._sock.sendall(self._encode(pending))
+            except OSError as e:
+                self.errors += 1
+                print(f"[{self.name}][TCP ERROR]: {e}")
+                self._error(e)
+                self._disconnect()
+                continue
+            elapsed = time.perf_counter() - start
+
+            self.sent += 1
+            self.last_latency = elapsed
+            self._total_latency += elapsed
+            self.max_latency = max(self.max_latency, elapsed)
+            if self.log_commands and (self._last_sent is None or pending[0] != self._last_sent[0]):
+                print(f"[{self.name}] Sent command: {pending[0]}")
+            self._last_sent = pending
+            self._last_sent_at = time.monotonic()
+            pending = None
+
+
+def add_link_args(parser):
+    """Add --protocol / --controller to a script's parser."""
+    group = parser.add_argument_group("controller link")
+    group.add_argument("--protocol", choices=PROTOCOLS, default="legacy",
+                       help="bare command characters, or framed commands with sequence numbers, "
+                            "timestamps and twists that the controller acknowledges")
+    group.add_argument("--controller", metavar="HOST[:PORT]",
+                       help="controller address instead of the robot's (e.g. 127.0.0.1 for mock_controller.py)")
+    return parser
+
+
+def open_link(args, host: str, port: int, **kwargs) -> CommandLink:
+    """A started CommandLink to --controller (default `host`:`port`) speaking --protocol."""
+    if args.controller:
+        host, _, override = args.controller.partition(":")
+        port = int(override) if override else port
+    return CommandLink(host, port, protocol=args.protocol, **kwargs).start()
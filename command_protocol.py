@@ -0,0 +1,55 @@
+import struct
+
+# Framed protocol: every frame starts with a two-byte magic whose first byte can
+# never be a legacy command character, so one controller can serve both protocols.
+COMMAND_MAGIC = b"\xfa\x01"
+ACK_MAGIC = b"\xfa\x81"
+
+# magic, sequence, sender's time.monotonic() at send, linear m/s, angular rad/s, command
+COMMAND_FRAME = struct.Struct("<2sIdffc")
+# magic, sequence, the sender timestamp echoed back, seconds from receipt to applied
+ACK_FRAME = struct.Struct("<2sIdf")
+
+PROTOCOLS = ("legacy", "framed")
+
+# Twist (linear m/s, angular rad/s, positive = left) sent for each discrete command
+# when the caller has no continuous one; keep in step with the robot-side controller.py
+TWISTS = {
+    "w": (0.5, 0.0),
+    "a": (0.0, 0.5),
+    "d": (0.0, -0.5),
+    "s": (-0.3, 0.0),
+    "x": (0.0, 0.0),
+}
+
+
+def encode_command(sequence: int, timestamp: float, command: str, twist=None) -> bytes:
+    linear, angular = twist if twist is not None else TWISTS.get(command, (0.0, 0.0))
+    return COMMAND_FRAME.pack(COMMAND_MAGIC, sequence & 0xFFFFFFFF, timestamp, linear, angular,
+                              command.encode())
+
+
+def decode_command(frame: bytes):
+    """(sequence, timestamp, command, (linear, angular)) of a COMMAND_FRAME."""
+    magic, sequence, timestamp, linear, angular, command = COMMAND_FRAME.unpack(frame)
+    if magic != COMMAND_MAGIC:
+        raise ValueError(f"bad command frame magic {magic!r}")
+    return sequence, timestamp, command.decode(), (linear, angular)
+
+
+def encode_ack(sequence: int, timestamp: float, apply_delay: float) -> bytes:
+    return ACK_FRAME.pack(ACK_MAGIC, sequence, timestamp, apply_delay)
+
+
+def decode_ack(frame: bytes):
+    """(sequence, echoed timestamp, apply delay in seconds) of an ACK_FRAME."""
+    magic, sequence, timestamp, apply_delay = ACK_FRAME.unpack(frame)
+    if magic != ACK_MAGIC:
+        raise ValueError(f"bad ack frame magic {magic!r}")
+    return sequence, timestamp, apply_delay
+
+
+def read_exact(stream, size: int) -> bytes:
+    """`size` bytes from a binary file-like object (e.g. socket.makefile('rb')), b"" at EOF."""
+    data = stream.read(size)
+    return data if data is not None and len(data) == size else b""
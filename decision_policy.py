@@ -0,0 +1,162 @@
+import itertools
+from typing import Dict, NamedTuple
+
+import numpy as np
+
+# Follower decision rules as array functions. Each policy maps bbox columns
+# (x, w, h) plus a `present` flag (person detected and not fist-stopped) to a
+# command code and a distance zone. The stop zone (between the heights) and
+# the in-between case of the original if/elif chains both mean stop, so only
+# "too close" and "far" need their own masks. The same function serves a follower's
+# decide() with scalars and the threshold sweep with arrays: parameters
+# shaped (P, 1) against frames shaped (N,) give (P, N) results for P
+# settings at once.
+
+# Commands as uint8 (the ASCII byte sent to the robot) so array results stay one byte per frame
+FORWARD, LEFT, RIGHT, BACK, STOP = (np.uint8(ord(c)) for c in "wadsx")
+COMMANDS = "wadsx"
+
+# Distance zones, followers pick the bbox color from these
+ZONE_NONE, ZONE_FAR, ZONE_STOP, ZONE_CLOSE = (np.uint8(z) for z in range(4))
+
+
+def steer(offset, tolerance, centered):
+    """`centered` while |offset| < tolerance, otherwise turn towards the person."""
+    return np.where(np.abs(offset) < tolerance, centered, np.where(offset < 0, LEFT, RIGHT))
+
+
+def _zones(present, too_close, far):
+    # The stop zone and the gap above it (taller than upper_height) share a color
+    return np.where(present, np.where(too_close, ZONE_CLOSE, np.where(far, ZONE_FAR, ZONE_STOP)), ZONE_NONE)
+
+
+def height_policy(x, w, h, present, stop_height=900, tolerance=128, frame_width=1280):
+    """height_follow.py: follow and steer, stop once the bbox is taller than stop_height."""
+    offset = x + w // 2 - frame_width // 2
+    far = np.logical_and(present, h <= stop_height)
+    return np.where(far, steer(offset, tolerance, FORWARD), STOP), _zones(present, False, far)
+
+
+def backtrack_policy(x, w, h, present, lower_height=500, upper_height=1000, close_width_ratio=0.9,
+                     close_height_ratio=0.9, tolerance=128, frame_width=1280, frame_height=720):
+    """backtrack_follow.py: back away when too close, follow when shorter than lower_height, stop otherwise.
+
+    upper_height only separates the stop zone from "taller than the zone",
+    which stops as well, so it does not change the command.
+    """
+    offset = x + w // 2 - frame_width // 2
+    too_close = np.logical_and(present, (w >= close_width_ratio * frame_width)
+                               | (h >= close_height_ratio * frame_height))
+    far = np.logical_and(present, h < lower_height) & ~too_close
+    command = np.where(too_close, BACK, np.where(far, steer(offset, tolerance, FORWARD), STOP))
+    return command, _zones(present, too_close, far)
+
+
+def center_policy(x, w, h, present, lower_height=600, upper_height=800, close_width_ratio=0.9,
+                  close_height_ratio=0.9, tolerance=128, frame_width=1280, frame_height=720):
+    """center_follow.py: like backtrack, but keeps turning to face the person in every zone."""
+    offset = x + w // 2 - frame_width // 2
+    too_close = np.logical_and(present, (w >= close_width_ratio * frame_width)
+                               | (h >= close_height_ratio * frame_height))
+    far = np.logical_and(present, h < lower_height) & ~too_close
+    in_zone = np.logical_and(present, (lower_height <= h) & (h <= upper_height)) & ~too_close
+    # Turning direction when off center, otherwise back / stay / forward by zone
+    centered = np.where(too_close, BACK, np.where(far, FORWARD, STOP))
+    command = np.where(too_close | far | in_zone, steer(offset, tolerance, centered), STOP)
+    return command, _zones(present, too_close, far)
+
+
+def full_policy(x, w, h, present, distance=np.nan, lower_height=500, upper_height=900,
+                close_width_ratio=0.9, close_height_ratio=0.9, near_m=1.0, stop_m=2.0,
+                tolerance=128, frame_width=1280, frame_height=720):
+    """full_follow.py: backtrack zones from stereo distance when measured (not NaN), bbox height otherwise.
+
+    As in backtrack_policy, upper_height does not change the command.
+    """
+    offset = x + w // 2 - frame_width // 2
+    measured = ~np.isnan(distance)
+    too_close = np.logical_and(present, (w >= close_width_ratio * frame_width)
+                               | (h >= close_height_ratio * frame_height) | (measured & (distance < near_m)))
+    far = np.logical_and(present, np.where(measured, distance > stop_m, h < lower_height)) & ~too_close
+    command = np.where(too_close, BACK, np.where(far, steer(offset, tolerance, FORWARD), STOP))
+    return command, _zones(present, too_close, far)
+
+
+POLICIES = {
+    "height_follow": height_policy,
+    "backtrack_follow": backtrack_policy,
+    "center_follow": center_policy,
+    "full_follow": full_policy,
+}
+
+
+class DetectionLog(NamedTuple):
+    """Per-frame detections of a replayed session, the input of a sweep."""
+    timestamp: np.ndarray   # seconds, float64
+    bbox: np.ndarray        # (N, 4) int32 x, y, w, h; zeros where no person
+    present: np.ndarray     # person detected and not fist-stopped
+    distance: np.ndarray    # stereo distance in meters, NaN when not measured
+    start: np.ndarray       # True on the first frame of each recording
+
+    def save(self, path: str):
+        np.savez_compressed(path, **self._asdict())
+
+    @classmethod
+    def load(cls, *paths: str) -> "DetectionLog":
+        """Load one or more logs back to back; `start` marks where each begins."""
+        parts = []
+        for path in paths:
+            with np.load(path) as data:
+                parts.append(cls(**{name: data[name] for name in cls._fields}))
+        return cls(*(np.concatenate(columns) for columns in zip(*parts)))
+
+    def __len__(self):
+        return len(self.timestamp)
+
+
+def parameter_grid(ranges: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Every combination of the given values, one (P, 1) column per parameter."""
+    names = list(ranges)
+    combos = np.array(list(itertools.product(*(ranges[n] for n in names))), dtype=np.float64)
+    return {name: combos[:, i:i + 1] for i, name in enumerate(names)}
+
+
+def command_stats(commands: np.ndarray, start: np.ndarray):
+    """Per-row command counts (P, 5) in COMMANDS order and command changes (P,) of (P, N) commands.
+
+    Changes across a recording boundary (`start`) are not counted.
+    """
+    codes = np.frombuffer(COMMANDS.encode(), np.uint8)
+    counts = np.stack([(commands == c).sum(axis=1) for c in codes], axis=1)
+    changes = ((commands[:, 1:] != commands[:, :-1]) & ~start[1:]).sum(axis=1)
+    return counts, changes
+
+
+def sweep(policy, log: DetectionLog, params: Dict[str, np.ndarray], reference=None,
+          chunk_cells: int = 1 << 24) -> dict:
+    """Evaluate `policy` for every parameter row over all frames of `log`.
+
+    Parameters not in `params` keep the policy's defaults (the followers'
+    current thresholds). Settings are processed in chunks of about
+    `chunk_cells` (setting, frame) pairs to bound memory. Returns per-setting
+    command counts (P, 5) in COMMANDS order, churn (share of consecutive
+    frames whose command changes, recording boundaries excluded) and, given
+    `reference` commands (N,), the share of frames agreeing with them.
+    """
+    x, w, h = log.bbox[:, 0], log.bbox[:, 2], log.bbox[:, 3]
+    extra = {"distance": log.distance} if policy is full_policy else {}
+    total = len(next(iter(params.values())))
+    step = max(1, chunk_cells // max(1, len(log)))
+    counts = np.empty((total, len(COMMANDS)), np.int64)
+    changes = np.empty(total, np.int64)
+    agree = np.zeros(total)
+    for begin in range(0, total, step):
+        chunk = {name: values[begin:begin + step] for name, values in params.items()}
+        command, _ = policy(x, w, h, log.present, **extra, **chunk)
+        command = np.broadcast_to(command, (min(step, total - begin), len(log)))
+        counts[begin:begin + step], changes[begin:begin + step] = command_stats(command, log.start)
+        if reference is not None:
+            agree[begin:begin + step] = (command == reference).mean(axis=1)
+    transitions = int((~log.start[1:]).sum())
+    return {"counts": counts, "churn": changes / max(1, transitions), "agree": agree,
+            "frames": len(log), "transitions": transitions}
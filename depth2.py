@@ -1,11 +1,12 @@
+import argparse
 import cv2
 import depthai as dai
-import numpy as np
+from depth_view import DepthVisualizer
+from frame_source import add_source_args, open_frame_source
 
-def getFrame(queue):
-    # Get frame from queue and convert to OpenCV format
-    frame = queue.get()
-    return frame.getCvFrame()
+def getFrame(source, stream):
+    # Get frame from the camera (or a recording) in OpenCV format
+    return source.get(stream).image
 
 def getMonoCamera(pipeline, isLeft):
     # Configure mono camera
@@ -33,6 +34,10 @@ def getStereoPair(pipeline, monoLeft, monoRight):
     return stereo
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stereo disparity viewer")
+    add_source_args(parser)
+    args = parser.parse_args()
+
     # Create pipeline
     pipeline = dai.Pipeline()
 
@@ -56,15 +61,11 @@ if __name__ == "__main__":
     xoutRight.setStreamName("right")
     stereo.rectifiedRight.link(xoutRight.input)
 
-    # Start device
-    with dai.Device(pipeline) as device:
-        # Output queues
-        qDepth = device.getOutputQueue(name="depth", maxSize=4, blocking=False)
-        qLeft = device.getOutputQueue(name="left", maxSize=4, blocking=False)
-        qRight = device.getOutputQueue(name="right", maxSize=4, blocking=False)
+    # Start device (or replay a recording)
+    with open_frame_source(args, lambda: pipeline) as source:
 
-        # Disparity range 0-95 -> map to 0-255 for visualization
-        disparityMultiplier = 255 / stereo.getMaxDisparity()
+        # Raw subpixel disparity -> color through one lookup table; views reuse their buffers
+        visualizer = DepthVisualizer(stereo.getMaxDisparity())
 
         sideBySide = True  # toggle key
 
@@ -72,23 +73,20 @@ if __name__ == "__main__":
 
         while True:
             # Get frames
-            disparity = getFrame(qDepth)
-            left = getFrame(qLeft)
-            right = getFrame(qRight)
-
-            # Normalize disparity for display
-            disparity_visual = (disparity * disparityMultiplier).astype(np.uint8)
-            disparity_colored = cv2.applyColorMap(disparity_visual, cv2.COLORMAP_JET)
+            try:
+                disparity = getFrame(source, "depth")
+                left = getFrame(source, "left")
+                right = getFrame(source, "right")
+            except EOFError:
+                break  # End of a replayed recording
 
             # Show stereo view and disparity
             if sideBySide:
-                stereo_view = np.hstack((left, right))
-                cv2.imshow("Stereo View", stereo_view)
+                cv2.imshow("Stereo View", visualizer.side_by_side(left, right))
             else:
-                overlay = cv2.addWeighted(left, 0.5, right, 0.5, 0)
-                cv2.imshow("Stereo View", overlay)
+                cv2.imshow("Stereo View", visualizer.overlay(left, right))
 
-            cv2.imshow("Disparity", disparity_colored)
+            cv2.imshow("Disparity", visualizer.colorize(disparity))
 
             key = cv2.waitKey(1) & 0xFF
             if key == ord('q'):
@@ -0,0 +1,52 @@
+import cv2
+import numpy as np
+
+
+class DepthVisualizer:
+    """Disparity colorizing and stereo-pair views without per-frame allocations.
+
+    Raw disparity (subpixel values 0..max_disparity, as returned by
+    StereoDepth.getMaxDisparity()) is mapped straight to color through one
+    lookup table of max_disparity + 1 entries, built from the same
+    scale-truncate-colormap steps the viewers used to do per frame. Each
+    entry is a BGRA pixel packed into one uint32, so colorizing is a single
+    gather per pixel; the result is a BGRA image (alpha 255) that imshow
+    takes as is. Every output is written into a buffer that is allocated on
+    first use and reused afterwards, so returned images are overwritten by
+    the next call.
+    """
+
+    def __init__(self, max_disparity: int, colormap: int = cv2.COLORMAP_JET):
+        max_disparity = int(max_disparity)
+        ramp = (np.arange(max_disparity + 1) * (255 / max_disparity)).astype(np.uint8)
+        bgr = cv2.applyColorMap(ramp.reshape(-1, 1), colormap).reshape(-1, 3)
+        bgra = np.concatenate([bgr, np.full((len(bgr), 1), 255, np.uint8)], axis=1)
+        self.lut = np.ascontiguousarray(bgra).view(np.uint32).ravel()
+        self._buffers = {}
+
+    def _buffer(self, name, shape, dtype=np.uint8):
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = np.empty(shape, dtype)
+            self._buffers[name] = buf
+        return buf
+
+    def colorize(self, disparity: np.ndarray) -> np.ndarray:
+        """BGRA image of a raw disparity frame."""
+        packed = self._buffer("color", disparity.shape, np.uint32)
+        # Values past the table (should not happen) get the last color
+        np.take(self.lut, disparity, out=packed, mode="clip")
+        return packed.view(np.uint8).reshape(disparity.shape + (4,))
+
+    def side_by_side(self, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        """Left and right images next to each other."""
+        h, w = left.shape[:2]
+        out = self._buffer("pair", (h, 2 * w) + left.shape[2:], left.dtype)
+        out[:, :w] = left
+        out[:, w:] = right
+        return out
+
+    def overlay(self, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        """50/50 blend of the left and right images."""
+        out = self._buffer("blend", left.shape, left.dtype)
+        return cv2.addWeighted(left, 0.5, right, 0.5, 0, dst=out)
@@ -0,0 +1,297 @@
+import glob
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import PackageNotFoundError, version
+
+import numpy as np
+
+from frame_context import FrameContext, frame_digest
+from frame_source import ReplaySource
+
+# cvzone settings every follower's configure() builds its detectors with; poses are
+# located with findPosition(bboxWithHands=True)
+POSE_OPTIONS = {}
+HAND_OPTIONS = {"detectionCon": 0.8, "maxHands": 1}
+
+POSE_LANDMARKS = 33
+HAND_LANDMARKS = 21
+TIP_IDS = (4, 8, 12, 16, 20)  # thumb to pinky fingertip landmarks
+
+# Frames per extraction job: a contiguous run, so MediaPipe's tracking sees the frames in order
+CHUNK_FRAMES = 256
+
+
+def _version(package: str) -> str:
+    try:
+        return version(package)
+    except PackageNotFoundError:
+        return "missing"
+
+
+def detector_config(scale: float = 1.0) -> dict:
+    """The followers' full-frame detector setup at inference `scale`, with the library versions
+    that produced the landmarks; any change to it starts a separate cache."""
+    return {"pose": POSE_OPTIONS, "hands": HAND_OPTIONS, "bbox_with_hands": True, "scale": scale,
+            "cvzone": _version("cvzone"), "mediapipe": _version("mediapipe")}
+
+
+def empty_columns(rows: int, max_hands: int) -> dict:
+    """Zeroed cache columns for `rows` frames."""
+    return {
+        "digest": np.zeros((rows, 16), np.uint8),
+        "pose_present": np.zeros(rows, bool),
+        "pose_landmarks": np.zeros((rows, POSE_LANDMARKS, 3), np.int32),
+        "pose_bbox": np.zeros((rows, 4), np.int32),
+        "hand_count": np.zeros(rows, np.uint8),
+        "hand_landmarks": np.zeros((rows, max_hands, HAND_LANDMARKS, 3), np.int32),
+        "hand_bbox": np.zeros((rows, max_hands, 4), np.int32),
+        "hand_right": np.zeros((rows, max_hands), bool),
+    }
+
+
+class DetectionCache:
+    """Pose and hand detections of recorded frames, stored by column and keyed by frame content.
+
+    Each detector config (see detector_config()) gets its own directory
+    under `root`, named by a hash of the config, holding config.json and
+    one part-*.npz per extraction run. Every part is a set of equal-length
+    columns: the frame digest, pose landmarks and bbox, and up to maxHands
+    hands' landmarks, bboxes and handedness. Loading concatenates the parts
+    and indexes the digests, so a frame is found in any session it appears
+    in, and new frames only ever append a part.
+    """
+
+    def __init__(self, root: str, config: dict = None):
+        self.config = config if config is not None else detector_config()
+        self.key = hashlib.sha1(json.dumps(self.config, sort_keys=True).encode()).hexdigest()[:16]
+        self.path = os.path.join(root, self.key)
+        self.max_hands = self.config["hands"].get("maxHands", 2)
+        self.columns = empty_columns(0, self.max_hands)
+        self.lookups = 0
+        self.hits = 0
+        self._rows = {}
+        self._load()
+
+    def _load(self):
+        parts = []
+        for path in sorted(glob.glob(os.path.join(self.path, "part-*.npz"))):
+            with np.load(path) as data:
+                parts.append({name: data[name] for name in self.columns})
+        if parts:
+            self.columns = {name: np.concatenate([part[name] for part in parts]) for name in self.columns}
+        self._rows = {digest.tobytes(): i for i, digest in enumerate(self.columns["digest"])}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, digest: bytes) -> bool:
+        return digest in self._rows
+
+    def row(self, digest: bytes):
+        """Row of the frame with `digest`, or None if it was never extracted."""
+        self.lookups += 1
+        row = self._rows.get(digest)
+        if row is not None:
+            self.hits += 1
+        return row
+
+    def add(self, columns: dict) -> int:
+        """Write the rows whose digests are not cached yet as a new part; returns how many."""
+        keep, seen = [], set()
+        for i, digest in enumerate(columns["digest"]):
+            key = digest.tobytes()
+            if key not in self._rows and key not in seen:
+                seen.add(key)
+                keep.append(i)
+        if not keep:
+            return 0
+        columns = {name: columns[name][keep] for name in self.columns}
+
+        os.makedirs(self.path, exist_ok=True)
+        config_path = os.path.join(self.path, "config.json")
+        if not os.path.exists(config_path):
+            with open(config_path, "w") as f:
+                json.dump(self.config, f, indent=2)
+        # Written under a temporary name, so a reader never loads half a part
+        path = os.path.join(self.path, f"part-{time.time_ns()}-{os.getpid()}.npz")
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, **columns)
+        os.replace(path + ".tmp", path)
+
+        start = len(self.columns["digest"])
+        self.columns = {name: np.concatenate([self.columns[name], columns[name]]) for name in self.columns}
+        for i, digest in enumerate(columns["digest"]):
+            self._rows[digest.tobytes()] = start + i
+        return len(keep)
+
+    def pose(self, row: int):
+        """cvzone findPosition() results (lmList, bboxInfo) of a cached row."""
+        c = self.columns
+        if not c["pose_present"][row]:
+            return [], {}
+        x, y, w, h = (int(v) for v in c["pose_bbox"][row])
+        return c["pose_landmarks"][row].tolist(), {"bbox": (x, y, w, h), "center": (x + w // 2, y + h // 2)}
+
+    def hands(self, row: int, flipType: bool = True) -> list:
+        """cvzone findHands() hand dicts of a cached row (stored with flipType=True)."""
+        c = self.columns
+        hands = []
+        for i in range(c["hand_count"][row]):
+            x, y, w, h = (int(v) for v in c["hand_bbox"][row, i])
+            right = bool(c["hand_right"][row, i]) == flipType
+            hands.append({"lmList": c["hand_landmarks"][row, i].tolist(), "bbox": (x, y, w, h),
+                          "center": (x + w // 2, y + h // 2), "type": "Right" if right else "Left"})
+        return hands
+
+    def report(self):
+        share = 100.0 * self.hits / self.lookups if self.lookups else 0.0
+        print(f"[DetectionCache] {len(self)} frames in {self.path} | lookups {self.lookups} "
+              f"hit {self.hits} ({share:.0f}%)")
+
+
+def store(columns: dict, row: int, lmList, bboxInfo, hands):
+    """Put one frame's findPosition() and findHands() results into `columns`."""
+    if bboxInfo and "bbox" in bboxInfo:
+        columns["pose_present"][row] = True
+        columns["pose_landmarks"][row] = np.asarray(lmList, np.int32).reshape(-1, 3)[:POSE_LANDMARKS]
+        columns["pose_bbox"][row] = bboxInfo["bbox"]
+    hands = hands[:columns["hand_landmarks"].shape[1]]
+    columns["hand_count"][row] = len(hands)
+    for i, hand in enumerate(hands):
+        columns["hand_landmarks"][row, i] = hand["lmList"]
+        columns["hand_bbox"][row, i] = hand["bbox"]
+        columns["hand_right"][row, i] = hand["type"] == "Right"
+
+
+def follower_detectors(config: dict, context: FrameContext):
+    """(pose, hand) detectors as the followers run them at full frame, drawing nothing."""
+    from cvzone.HandTrackingModule import HandDetector
+    from cvzone.PoseModule import PoseDetector
+    from scaled_detection import ScaledHandDetector, ScaledPoseDetector
+
+    return (ScaledPoseDetector(PoseDetector(**config["pose"]), context, config["scale"], draw=False),
+            ScaledHandDetector(HandDetector(**config["hands"]), context, config["scale"], draw=False))
+
+
+def detect_frames(session: str, indices, config: dict, detectors=follower_detectors) -> dict:
+    """Cache columns for the video frames `indices` of `session`, with fresh detectors.
+
+    Runs in a pool worker: the frames are read from the session's memory map
+    here, so only indices and results cross between processes.
+    """
+    context = FrameContext()
+    pose_detector, hand_detector = detectors(config, context)
+    frames = ReplaySource(session, realtime=False).frames["video"]
+    columns = empty_columns(len(indices), config["hands"].get("maxHands", 2))
+    for row, i in enumerate(indices):
+        image = np.array(frames[i])
+        context.reset(image)
+        columns["digest"][row] = np.frombuffer(context.digest(), np.uint8)
+        pose_detector.findPose(image, draw=False)
+        lmList, bboxInfo = pose_detector.findPosition(image, draw=False, bboxWithHands=config["bbox_with_hands"])
+        hands, _ = hand_detector.findHands(image, draw=False)
+        store(columns, row, lmList, bboxInfo, hands)
+    return columns
+
+
+def extract(sessions, cache: DetectionCache, workers: int = None, chunk: int = CHUNK_FRAMES,
+            detectors=follower_detectors) -> dict:
+    """Detect every video frame of `sessions` that `cache` lacks, across `workers` processes.
+
+    Frames are hashed here first; only new digests are detected, in
+    contiguous runs of up to `chunk` frames per job. MediaPipe tracks the
+    pose from frame to frame, so each run starts with a fresh detection, as
+    after a tracking loss. The new rows are added to the cache as one part.
+    """
+    start = time.perf_counter()
+    jobs, seen, total = [], set(), 0
+    for session in sessions:
+        frames = ReplaySource(session, realtime=False).frames["video"]
+        missing = []
+        for i in range(len(frames)):
+            digest = frame_digest(frames[i])
+            if digest not in cache and digest not in seen:
+                seen.add(digest)
+                missing.append(i)
+        total += len(frames)
+        run = []
+        for i in missing:
+            if run and (i != run[-1] + 1 or len(run) == chunk):
+                jobs.append((session, run))
+                run = []
+            run.append(i)
+        if run:
+            jobs.append((session, run))
+    hashed = time.perf_counter() - start
+
+    added = 0
+    if jobs:
+        # spawn: MediaPipe's threads don't survive a fork
+        with ProcessPoolExecutor(workers, mp_context=mp.get_context("spawn")) as pool:
+            results = list(pool.map(detect_frames, *zip(*jobs), [cache.config] * len(jobs),
+                                    [detectors] * len(jobs)))
+        added = cache.add({name: np.concatenate([r[name] for r in results]) for name in results[0]})
+    return {"frames": total, "detected": len(seen), "cached": total - len(seen), "added": added,
+            "jobs": len(jobs), "hash_s": hashed, "total_s": time.perf_counter() - start}
+
+
+class CachedPoseDetector:
+    """cvzone PoseDetector stand-in that answers from a DetectionCache.
+
+    Frames are looked up by the FrameContext digest, so the context must
+    be reset with the frame before findPose() (every follower's detect()
+    does). A frame missing from the cache goes to the live `fallback`
+    detector if there is one, and otherwise has no person. Nothing is drawn.
+    """
+
+    def __init__(self, cache: DetectionCache, context: FrameContext, fallback=None):
+        self.cache = cache
+        self.context = context
+        self.fallback = fallback
+        self.lmList = []
+        self.bboxInfo = {}
+        self._row = None
+
+    def findPose(self, img, draw=True):
+        self._row = self.cache.row(self.context.digest())
+        if self._row is None and self.fallback is not None:
+            return self.fallback.findPose(img, draw)
+        return img
+
+    def findPosition(self, img, draw=True, bboxWithHands=False):
+        if self._row is not None:
+            self.lmList, self.bboxInfo = self.cache.pose(self._row)
+        elif self.fallback is not None:
+            self.lmList, self.bboxInfo = self.fallback.findPosition(img, draw, bboxWithHands)
+        else:
+            self.lmList, self.bboxInfo = [], {}
+        return self.lmList, self.bboxInfo
+
+
+class CachedHandDetector:
+    """cvzone HandDetector stand-in that answers from a DetectionCache, like CachedPoseDetector."""
+
+    def __init__(self, cache: DetectionCache, context: FrameContext, fallback=None):
+        self.cache = cache
+        self.context = context
+        self.fallback = fallback
+
+    def findHands(self, img, draw=True, flipType=True):
+        row = self.cache.row(self.context.digest())
+        if row is None:
+            if self.fallback is not None:
+                return self.fallback.findHands(img, draw, flipType)
+            return [], img
+        return self.cache.hands(row, flipType), img
+
+    def fingersUp(self, myHand):
+        """cvzone's rule: thumb by x against its joint (mirrored per hand), fingers by y."""
+        lmList = myHand["lmList"]
+        thumb, ip = lmList[TIP_IDS[0]][0], lmList[TIP_IDS[0] - 1][0]
+        fingers = [int(thumb > ip if myHand["type"] == "Right" else thumb < ip)]
+        fingers += [int(lmList[tip][1] < lmList[tip - 2][1]) for tip in TIP_IDS[1:]]
+        return fingers
@@ -0,0 +1,149 @@
+import http.server
+import socketserver
+import threading
+import time
+
+import cv2
+
+BOUNDARY = b"frame"
+
+
+class MjpegServer:
+    """Serves the latest published JPEG as a local MJPEG stream.
+
+    Open http://<host>:<port>/ in a browser. Frames are only encoded while
+    at least one client is connected (see `clients`), so an idle preview
+    costs nothing.
+    """
+
+    def __init__(self, port: int, host: str = "127.0.0.1", quality: int = 70):
+        self.quality = quality
+        self.clients = 0
+        self._jpeg = None
+        self._cond = threading.Condition()
+        self._closed = False
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=" + BOUNDARY.decode())
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                with server._cond:
+                    server.clients += 1
+                try:
+                    last = None
+                    while True:
+                        with server._cond:
+                            server._cond.wait_for(lambda: server._closed or server._jpeg is not last, timeout=1.0)
+                            if server._closed:
+                                return
+                            jpeg = last = server._jpeg
+                        if jpeg is None:
+                            continue
+                        self.wfile.write(b"--" + BOUNDARY + b"\r\nContent-Type: image/jpeg\r\n"
+                                         + f"Content-Length: {len(jpeg)}\r\n\r\n".encode() + jpeg + b"\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with server._cond:
+                        server.clients -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = socketserver.ThreadingTCPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        threading.Thread(target=self._httpd.serve_forever, name="mjpeg-preview", daemon=True).start()
+        print(f"[Display] MJPEG preview on http://{host}:{self.port}/")
+
+    def publish(self, img):
+        ok, jpeg = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if ok:
+            with self._cond:
+                self._jpeg = jpeg.tobytes()
+                self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class Display:
+    """Frame-rate capped output for annotated frames, kept off the control path.
+
+    due() says whether the next frame should be rendered at all: never in
+    headless mode without a preview client, and at most `max_fps` times a
+    second otherwise. Callers only draw overlays when it returns True.
+    show() puts the frame in the OpenCV window (unless headless) and on the
+    MJPEG preview (when someone is watching) and returns the pressed key.
+    """
+
+    def __init__(self, window: str = "Follower View", max_fps: float = 15.0,
+                 headless: bool = False, preview_port: int = None):
+        self.window = window
+        self.headless = headless
+        self.interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.preview = MjpegServer(preview_port) if preview_port is not None else None
+        self.shown = 0
+        self.skipped = 0
+        self._last = 0.0
+        self._opened = False
+
+    def due(self) -> bool:
+        if self.headless and not (self.preview and self.preview.clients):
+            self.skipped += 1
+            return False
+        now = time.monotonic()
+        if now - self._last < self.interval:
+            self.skipped += 1
+            return False
+        self._last = now
+        return True
+
+    def show(self, img) -> int:
+        """Display `img`; returns the key pressed in the window, or -1."""
+        self.shown += 1
+        if self.preview and self.preview.clients:
+            self.preview.publish(img)
+        if self.headless:
+            return -1
+        cv2.imshow(self.window, img)
+        self._opened = True
+        return cv2.waitKey(1) & 0xFF
+
+    def close(self):
+        if self.preview:
+            self.preview.close()
+        if self._opened:
+            cv2.destroyAllWindows()
+
+    def report(self):
+        total = self.shown + self.skipped
+        share = 100.0 * self.shown / total if total else 0.0
+        mode = "headless" if self.headless else "window"
+        print(f"[Display] {mode} | rendered {self.shown} of {total} frames ({share:.0f}%)")
+
+
+def add_display_args(parser):
+    """Add --headless / --display-fps / --preview-port to a script's argument parser."""
+    group = parser.add_argument_group("display")
+    group.add_argument("--headless", action="store_true",
+                       help="no window and no drawing (overlays only for a connected preview "
+                            "client); quit with Ctrl+C")
+    group.add_argument("--display-fps", type=float, default=15.0, metavar="FPS",
+                       help="render at most FPS frames per second (0 = every frame)")
+    group.add_argument("--preview-port", type=int, metavar="PORT",
+                       help="serve an MJPEG preview on localhost:PORT, encoded only while watched")
+    return parser
+
+
+def open_display(args, window: str) -> Display:
+    """Create the Display selected by add_display_args() options."""
+    return Display(window, max_fps=args.display_fps, headless=args.headless,
+                   preview_port=args.preview_port)
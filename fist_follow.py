@@ -2,28 +2,43 @@
 #When a fist is detected it will send a stop command
 #When it doesnt detect a fist it will continue following again
 
+import argparse
 import cv2
-import socket
 import depthai as dai
 import mediapipe as mp
 from cvzone.PoseModule import PoseDetector
+from blackbox import add_blackbox_args, open_blackbox
+from command_link import add_link_args, open_link
+from display import add_display_args, open_display
+from follower_runtime import FollowerRuntime
+from frame_context import FrameContext
+from frame_source import add_source_args, max_frame_age, open_frame_source
+from metrics import add_metrics_args, open_metrics
+from pose_tracking import TrackedPoseDetector, add_tracking_args
+from scaled_detection import ScaledPoseDetector, add_scale_args, draw_pose
+from startup import Startup, warm_up
+from telemetry import add_telemetry_args, open_telemetry
 
 # TCP Connection Setup
 ROBOT_IP = "100.87.161.11"
 PORT = 9999
-client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-client_socket.connect((ROBOT_IP, PORT))
-print("[Follower] Connected to robot.")
 
-# Initialize pose detector
-pose_detector = PoseDetector()
-
-# MediaPipe hands setup
+# Pose detector and MediaPipe hands, created by configure()
+pose_detector = None
 mp_hands = mp.solutions.hands
-hands = mp_hands.Hands(static_image_mode=False,
-                       max_num_hands=2,
-                       min_detection_confidence=0.5,
-                       min_tracking_confidence=0.5)
+hands = None
+
+# Derived views (RGB, gray, downscaled) of the current frame, shared by the detectors
+context = FrameContext()
+
+# Frame and movement setup
+frame_width = 1280
+frame_center = frame_width // 2
+center_tolerance = frame_width // 10
+
+# Hands run on a copy downscaled by this factor (set with --inference-scale)
+inference_scale = 1.0
+
 
 # Helper: check if hand is a fist
 def is_fist(landmarks):
@@ -31,86 +46,149 @@ def is_fist(landmarks):
     pips = [6, 10, 14, 18]
     return all(landmarks[tip].y > landmarks[pip].y for tip, pip in zip(tips, pips))
 
-# Create pipeline and camera
-pipeline = dai.Pipeline()
-cam = pipeline.createColorCamera()
-cam.setPreviewSize(1280, 720)
-cam.setInterleaved(False)
-cam.setBoardSocket(dai.CameraBoardSocket.CAM_A)
-xout = pipeline.createXLinkOut()
-xout.setStreamName("video")
-cam.preview.link(xout.input)
-
-# Frame and movement setup
-frame_width = 1280
-frame_center = frame_width // 2
-center_tolerance = frame_width // 10
 
-with dai.Device(pipeline) as device:
-    video_queue = device.getOutputQueue(name="video", maxSize=4, blocking=False)
-
-    try:
-        while True:
-            in_frame = video_queue.get()
-            frame = in_frame.getCvFrame()
-
-            # Pose detection
-            img = pose_detector.findPose(frame)
-            lmList, bboxInfo = pose_detector.findPosition(img, bboxWithHands=True)
-
-            # Hand detection for fist
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = hands.process(rgb_frame)
-
-            fist_detected = False
-            if results.multi_hand_landmarks:
-                for hand_landmarks in results.multi_hand_landmarks:
-                    if is_fist(hand_landmarks.landmark):
-                        fist_detected = True
-                    # Draw hand bounding box for visualization
-                    h, w, _ = frame.shape
-                    x_vals = [int(lm.x * w) for lm in hand_landmarks.landmark]
-                    y_vals = [int(lm.y * h) for lm in hand_landmarks.landmark]
-                    x1, y1 = min(x_vals), min(y_vals)
-                    x2, y2 = max(x_vals), max(y_vals)
-                    cv2.rectangle(img, (x1, y1), (x2, y2), (255, 0, 255), 2)
-
-            if fist_detected:
-                command = 'x'  # STOP completely
-            elif bboxInfo is not None and 'bbox' in bboxInfo:
-                x, y, w, h = bboxInfo['bbox']
-                cx = x + w // 2
-                offset = cx - frame_center
-
-                # Draw bounding box and center dot
-                cv2.rectangle(img, (x, y), (x + w, y + h), (0, 255, 0), 3)
-                cv2.circle(img, (cx, y + h // 2), 5, (0, 0, 255), cv2.FILLED)
-
-                # Movement based on center offset
-                if abs(offset) < center_tolerance:
-                    command = 'w'  # forward
-                elif offset < 0:
-                    command = 'a'  # turn left
-                else:
-                    command = 'd'  # turn right
-            else:
-                command = 'x'  # no person detected, stop
-
-            try:
-                client_socket.sendall(command.encode())
-                print(f"[Follower] Sent command: {command}")
-            except Exception as e:
-                print(f"[Follower][TCP ERROR]: {e}")
-                break
-
-            # Show annotated frame
-            cv2.imshow("Follower View", img)
-
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                client_socket.sendall('x'.encode())
-                break
-
-    finally:
-        client_socket.close()
-        cv2.destroyAllWindows()
-        print("[Follower] Shutdown complete.")
\ No newline at end of file
+def create_pipeline():
+    # Create pipeline and camera
+    pipeline = dai.Pipeline()
+    cam = pipeline.createColorCamera()
+    cam.setPreviewSize(1280, 720)
+    cam.setInterleaved(False)
+    cam.setBoardSocket(dai.CameraBoardSocket.CAM_A)
+    xout = pipeline.createXLinkOut()
+    xout.setStreamName("video")
+    cam.preview.link(xout.input)
+    return pipeline
+
+
+def detect(packet):
+    frame = packet.frame
+    context.reset(frame)
+
+    # Pose detection
+    packet.img = pose_detector.findPose(frame)
+    packet.lmList, bboxInfo = pose_detector.findPosition(packet.img, bboxWithHands=True)
+    if bboxInfo is not None and 'bbox' in bboxInfo:
+        packet.bbox = bboxInfo['bbox']
+
+    # Hand detection for fist on the RGB view the pose detector already made
+    # (landmarks are normalized, so any input size works)
+    results = hands.process(context.rgb(inference_scale))
+
+    fist_detected = False
+    packet.hands = []
+    if results.multi_hand_landmarks:
+        h, w, _ = frame.shape
+        for hand_landmarks in results.multi_hand_landmarks:
+            if is_fist(hand_landmarks.landmark):
+                fist_detected = True
+            # Hand bounding box for visualization
+            x_vals = [int(lm.x * w) for lm in hand_landmarks.landmark]
+            y_vals = [int(lm.y * h) for lm in hand_landmarks.landmark]
+            x1, y1 = min(x_vals), min(y_vals)
+            x2, y2 = max(x_vals), max(y_vals)
+            packet.hands.append({'bbox': (x1, y1, x2 - x1, y2 - y1)})
+    packet.stopped = fist_detected
+
+
+def decide(packet):
+    if packet.stopped:
+        packet.command = 'x'  # STOP completely
+    elif packet.bbox is not None:
+        x, y, w, h = packet.bbox
+        cx = x + w // 2
+        offset = cx - frame_center
+
+        # Movement based on center offset
+        if abs(offset) < center_tolerance:
+            packet.command = 'w'  # forward
+        elif offset < 0:
+            packet.command = 'a'  # turn left
+        else:
+            packet.command = 'd'  # turn right
+    else:
+        packet.command = 'x'  # no person detected, stop
+
+
+def draw(packet):
+    # Landmarks found by detect(), drawn here so only the frames shown pay for it
+    draw_pose(packet.img, packet.lmList, packet.bbox)
+
+    # Draw hand bounding boxes
+    for hand in packet.hands:
+        xH, yH, wH, hH = hand['bbox']
+        cv2.rectangle(packet.img, (xH, yH), (xH + wH, yH + hH), (255, 0, 255), 2)
+
+    if packet.stopped or packet.bbox is None:
+        return
+    x, y, w, h = packet.bbox
+    cx = x + w // 2
+
+    # Draw bounding box and center dot
+    cv2.rectangle(packet.img, (x, y), (x + w, y + h), (0, 255, 0), 3)
+    cv2.circle(packet.img, (cx, y + h // 2), 5, (0, 0, 255), cv2.FILLED)
+
+
+def configure(args):
+    """Apply the detector options; returns extra objects to report on."""
+    global pose_detector, hands, inference_scale
+    reporters = []
+
+    # The MediaPipe models load here rather than at import, so they overlap the camera boot
+    pose_detector = PoseDetector()
+    hands = mp_hands.Hands(static_image_mode=False,
+                           max_num_hands=2,
+                           min_detection_confidence=0.5,
+                           min_tracking_confidence=0.5)
+
+    # Detectors share one RGB/gray conversion per frame through the context;
+    # below scale 1 they run on a downscaled view, results stay in full-frame pixels
+    # They never draw: draw() overlays the landmarks, only on the frames the display shows
+    pose_detector = ScaledPoseDetector(pose_detector, context, args.inference_scale, draw=False)
+    inference_scale = args.inference_scale
+    reporters.append(context)
+
+    # Optional detect-then-track: full pose detection only every N frames
+    if args.track_interval > 1:
+        pose_detector = TrackedPoseDetector(pose_detector, context, interval=args.track_interval, draw=False)
+        reporters.append(pose_detector)
+    return reporters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pose follower that pauses while a fist is shown")
+    add_source_args(parser)
+    add_tracking_args(parser)
+    add_scale_args(parser)
+    add_display_args(parser)
+    add_telemetry_args(parser)
+    add_metrics_args(parser)
+    add_link_args(parser)
+    add_blackbox_args(parser)
+    args = parser.parse_args()
+
+    # Boot the camera while the detectors load and warm up. Commands are sent from a
+    # background thread that connects (and reconnects) on its own
+    startup = Startup("Follower")
+    device = startup.background("device", open_frame_source, args, create_pipeline)
+    link = open_link(args, ROBOT_IP, PORT, log_commands=args.telemetry is None)
+    startup.watch("controller", link.wait_connected)
+    reporters = [link] + startup.step("detectors", configure, args)
+    startup.step("warm-up", warm_up, detect, (1280, 720))
+
+    with device.result() as source:
+        runtime = FollowerRuntime(lambda: source.get("video"),
+                                  detect, decide, link.send, draw,
+                                  display=open_display(args, "Follower View"), reporters=reporters,
+                                  telemetry=open_telemetry(args), metrics=open_metrics(args),
+                                  max_age=max_frame_age(args),
+                                  blackbox=open_blackbox(args, (1280, 720), link))
+        startup.report()
+        try:
+            runtime.run()
+        finally:
+            link.close('x')
+            print("[Follower] Shutdown complete.")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,85 +4,152 @@
 ##########################################
 
 
+import argparse
 import cv2
-import socket
 import depthai as dai
 from cvzone.PoseModule import PoseDetector
+from blackbox import add_blackbox_args, open_blackbox
+from command_link import add_link_args, open_link
+from display import add_display_args, open_display
+from follower_runtime import FollowerRuntime
+from frame_context import FrameContext
+from frame_source import add_source_args, max_frame_age, open_frame_source
+from metrics import add_metrics_args, open_metrics
+from pose_tracking import TrackedPoseDetector, add_tracking_args
+from scaled_detection import ScaledPoseDetector, add_scale_args, draw_pose
+from startup import Startup, warm_up
+from telemetry import add_telemetry_args, open_telemetry
 
 # TCP Settings
 CONTROLLER_IP = "100.87.161.11"
 CONTROLLER_PORT = 9999
 
-# Setup socket connection
-client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-client_socket.connect((CONTROLLER_IP, CONTROLLER_PORT))
-print(f"[Follower] Connected to controller at {CONTROLLER_IP}:{CONTROLLER_PORT}")
-
-# Setup DepthAI pipeline for color camera
-pipeline = dai.Pipeline()
-cam_rgb = pipeline.createColorCamera()
-cam_rgb.setPreviewSize(640, 480)
-cam_rgb.setInterleaved(False)
-cam_rgb.setBoardSocket(dai.CameraBoardSocket.RGB)
-
-xout = pipeline.createXLinkOut()
-xout.setStreamName("video")
-cam_rgb.preview.link(xout.input)
-
-# Create pose detector
-detector = PoseDetector()
-
-# Connect to DepthAI device and start streaming
-with dai.Device(pipeline) as device:
-    video_queue = device.getOutputQueue(name="video", maxSize=4, blocking=False)
-    
-    # Frame width for center calculations
-    frame_width = 640
-    frame_center = frame_width // 2
-    center_tolerance = frame_width // 10  # Tolerance around center
-
-    try:
-        while True:
-            in_frame = video_queue.get()
-            frame = in_frame.getCvFrame()
-
-            # Use pose detector on the frame
-            img = detector.findPose(frame)
-            lmList, bboxInfo = detector.findPosition(img, bboxWithHands=True)
-
-            if bboxInfo is not None and 'bbox' in bboxInfo:
-                x, y, w, h = bboxInfo['bbox']
-                cx = x + w // 2  # center x of bbox
-
-                # Draw bounding box and center point
-                cv2.rectangle(img, (x, y), (x + w, y + h), (0, 255, 0), 3)
-                cv2.circle(img, (cx, y + h // 2), 5, (0, 0, 255), cv2.FILLED)
-
-                # Decide command based on horizontal position of bbox center
-                offset = cx - frame_center
-                if abs(offset) < center_tolerance:
-                    command = 'w'  # Forward
-                elif offset < 0:
-                    command = 'a'  # Turn left
-                else:
-                    command = 'd'  # Turn right
-            else:
-                command = 'x'  # No person detected, stop
-
-            # Send the command as a single char over TCP
-            try:
-                client_socket.sendall(command.encode())
-                print(f"[Follower] Sent command: {command}")
-            except Exception as e:
-                print(f"[Follower][TCP ERROR]: {e}")
-
-            cv2.imshow("Follower View", img)
-
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                # Send stop command before exiting
-                client_socket.sendall('x'.encode())
-                break
-    finally:
-        client_socket.close()
-        cv2.destroyAllWindows()
-        print("[Follower] Shutdown complete.")
\ No newline at end of file
+# Frame width for center calculations
+frame_width = 640
+frame_center = frame_width // 2
+center_tolerance = frame_width // 10  # Tolerance around center
+
+# Pose detector, created by configure()
+detector = None
+
+# Derived views (RGB, gray, downscaled) of the current frame, shared by the detectors
+context = FrameContext()
+
+
+def create_pipeline():
+    # Setup DepthAI pipeline for color camera
+    pipeline = dai.Pipeline()
+    cam_rgb = pipeline.createColorCamera()
+    cam_rgb.setPreviewSize(640, 480)
+    cam_rgb.setInterleaved(False)
+    cam_rgb.setBoardSocket(dai.CameraBoardSocket.RGB)
+
+    xout = pipeline.createXLinkOut()
+    xout.setStreamName("video")
+    cam_rgb.preview.link(xout.input)
+    return pipeline
+
+
+def detect(packet):
+    context.reset(packet.frame)
+
+    # Use pose detector on the frame
+    packet.img = detector.findPose(packet.frame)
+    packet.lmList, bboxInfo = detector.findPosition(packet.img, bboxWithHands=True)
+    if bboxInfo is not None and 'bbox' in bboxInfo:
+        packet.bbox = bboxInfo['bbox']
+
+
+def decide(packet):
+    if packet.bbox is None:
+        packet.command = 'x'  # No person detected, stop
+        return
+
+    x, y, w, h = packet.bbox
+    cx = x + w // 2  # center x of bbox
+
+    # Decide command based on horizontal position of bbox center
+    offset = cx - frame_center
+    if abs(offset) < center_tolerance:
+        packet.command = 'w'  # Forward
+    elif offset < 0:
+        packet.command = 'a'  # Turn left
+    else:
+        packet.command = 'd'  # Turn right
+
+
+def draw(packet):
+    # Landmarks found by detect(), drawn here so only the frames shown pay for it
+    draw_pose(packet.img, packet.lmList, packet.bbox)
+
+    if packet.bbox is None:
+        return
+    x, y, w, h = packet.bbox
+    cx = x + w // 2
+
+    # Draw bounding box and center point
+    cv2.rectangle(packet.img, (x, y), (x + w, y + h), (0, 255, 0), 3)
+    cv2.circle(packet.img, (cx, y + h // 2), 5, (0, 0, 255), cv2.FILLED)
+
+
+def configure(args):
+    """Apply the detector options; returns extra objects to report on."""
+    global detector
+    reporters = []
+
+    # The MediaPipe models load here rather than at import, so they overlap the camera boot
+    detector = PoseDetector()
+
+    # Detectors share one RGB/gray conversion per frame through the context;
+    # below scale 1 they run on a downscaled view, results stay in full-frame pixels
+    # They never draw: draw() overlays the landmarks, only on the frames the display shows
+    detector = ScaledPoseDetector(detector, context, args.inference_scale, draw=False)
+    reporters.append(context)
+
+    # Optional detect-then-track: full pose detection only every N frames
+    if args.track_interval > 1:
+        detector = TrackedPoseDetector(detector, context, interval=args.track_interval, draw=False)
+        reporters.append(detector)
+    return reporters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pose follower (testing only, no stop functions)")
+    add_source_args(parser)
+    add_tracking_args(parser)
+    add_scale_args(parser)
+    add_display_args(parser)
+    add_telemetry_args(parser)
+    add_metrics_args(parser)
+    add_link_args(parser)
+    add_blackbox_args(parser)
+    args = parser.parse_args()
+
+    # Boot the camera while the detectors load and warm up. Commands are sent from a
+    # background thread that connects (and reconnects) on its own
+    startup = Startup("Follower")
+    device = startup.background("device", open_frame_source, args, create_pipeline)
+    link = open_link(args, CONTROLLER_IP, CONTROLLER_PORT, log_commands=args.telemetry is None)
+    startup.watch("controller", link.wait_connected)
+    reporters = [link] + startup.step("detectors", configure, args)
+    startup.step("warm-up", warm_up, detect, (640, 480))
+
+    # Connect to DepthAI device (or a recording) and start streaming
+    with device.result() as source:
+        runtime = FollowerRuntime(lambda: source.get("video"),
+                                  detect, decide, link.send, draw,
+                                  display=open_display(args, "Follower View"), reporters=reporters,
+                                  telemetry=open_telemetry(args), metrics=open_metrics(args),
+                                  max_age=max_frame_age(args),
+                                  blackbox=open_blackbox(args, (640, 480), link))
+        startup.report()
+        try:
+            runtime.run()
+        finally:
+            # Send stop command before exiting
+            link.close('x')
+            print("[Follower] Shutdown complete.")
+
+
+if __name__ == "__main__":
+    main()
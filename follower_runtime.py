@@ -0,0 +1,345 @@
+import threading
+import time
+from collections import deque
+
+from display import Display
+
+# Frames checked against max_age before a mostly-stale stream is reported
+STALE_WARN_FRAMES = 30
+
+
+class LatestQueue:
+    """Bounded queue where a new item pushes out the oldest unread one.
+
+    Stages never wait on a slow consumer: if the consumer falls behind, the
+    stale items are dropped so it always picks up the newest frame.
+    """
+
+    def __init__(self, maxsize: int = 1):
+        self._items = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout: float = None):
+        """Return the oldest queued item, or None on timeout / close."""
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class StageStats:
+    """Frame rate and busy time of one pipeline stage."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.frames = 0
+        self.busy = 0.0
+        self._window_start = time.perf_counter()
+        self._window_frames = 0
+        self._window_busy = 0.0
+
+    def add(self, elapsed: float):
+        self.frames += 1
+        self.busy += elapsed
+        self._window_frames += 1
+        self._window_busy += elapsed
+
+    def snapshot(self, reset: bool = True) -> dict:
+        """Return fps / mean latency over the window since the last snapshot."""
+        now = time.perf_counter()
+        span = max(now - self._window_start, 1e-9)
+        frames = self._window_frames
+        result = {
+            "fps": frames / span,
+            "ms": 1000.0 * self._window_busy / frames if frames else 0.0,
+            "frames": self.frames,
+        }
+        if reset:
+            self._window_start = now
+            self._window_frames = 0
+            self._window_busy = 0.0
+        return result
+
+
+class FramePacket:
+    """Everything the stages learn about one camera frame."""
+
+    def __init__(self, sequence: int, frame, timestamp: float = None):
+        self.sequence = sequence
+        self.frame = frame
+        self.timestamp = timestamp  # device capture time (time.monotonic() clock)
+        self.captured = time.monotonic()
+        self.img = frame        # annotated image shown in the I/O stage
+        self.lmList = []
+        self.bbox = None        # (x, y, w, h) of the tracked person
+        self.hands = []
+        self.stopped = False
+        self.command = 'x'
+        self.box_color = None
+        self.disparity = None   # aligned stereo disparity, when the follower asks for it
+        self.distance = None    # meters to the person, from the disparity
+        self.path_clear = None  # obstacle corridor free, from this frame's grid update (tight_spaces.py)
+        self.grid_score = None  # copy of the occupancy grid scores after that update, for drawing
+        self.stage_ms = {}      # time spent in each stage so far
+
+
+class FollowerRuntime:
+    """Runs capture, detection, decision and I/O as separate stages.
+
+    capture() returns the next frame_source.Frame (or a ready FramePacket,
+    e.g. with extra streams attached), detect(packet) and decide(packet)
+    fill in the packet, send(command) talks to the robot and draw(packet)
+    adds overlays before the frame is shown. Capture, detection and decision
+    run on worker threads connected by latest-frame-wins queues, and the
+    command is sent as soon as it is decided. The display stage stays on the
+    calling thread because OpenCV windows need it; it only draws and shows
+    the frames `display` asks for (none when headless), so rendering never
+    holds up the control path. Anything in `reporters` (e.g. a CommandLink)
+    has its report() printed next to the stage rates. With a `telemetry`
+    recorder, every decided frame is stored as one binary record; with
+    `metrics`, every stage (and the send) feeds a latency histogram and the
+    queue drops and reporters' stats() become gauges. A `blackbox` gets
+    every captured frame before detection draws on it, and a clip is
+    triggered when the follower fist-stops, starts backing off ('s') or 'b'
+    is pressed in the window.
+
+    Every command's glass-to-command latency (device capture timestamp to
+    the command being queued) is tracked. With `max_age`, frames that are
+    already older than that many seconds when detection would start are
+    skipped instead of being acted on; detection time itself is not charged
+    against it, so a slow host still decides on every fresh frame. If no
+    frame has been decided for `stale_timeout` seconds the robot is told to
+    stop ('x') until fresh frames arrive, and the first time more than half
+    the frames turn out stale a hint to raise --max-frame-age is printed.
+    """
+
+    def __init__(self, capture, detect, decide, send, draw=None,
+                 display: Display = None, queue_size: int = 1,
+                 report_interval: float = 5.0, name: str = "Follower", reporters=(), telemetry=None,
+                 metrics=None, max_age: float = None, stale_timeout: float = 0.5, blackbox=None):
+        self.capture = capture
+        self.detect = detect
+        self.decide = decide
+        self.send = send
+        self.draw = draw
+        self.display = display if display is not None else Display()
+        self.report_interval = report_interval
+        self.name = name
+        self.reporters = reporters
+        self.telemetry = telemetry
+        self.metrics = metrics
+        self.max_age = max_age
+        self.stale_timeout = stale_timeout
+        self.blackbox = blackbox
+        self.stale = 0
+        self._aged = 0  # frames whose age was checked; only the detect thread counts these and `stale`
+        self._warned_stale = False
+        self.latency = StageStats("latency")
+        self._last_fresh = time.monotonic()
+        self._holding = False
+        self._last_decision = (False, None)  # (stopped, command) of the last frame, for black box events
+
+        self.stats = {stage: StageStats(stage) for stage in ("capture", "detect", "decide", "display")}
+        self._detect_queue = LatestQueue(queue_size)
+        self._decide_queue = LatestQueue(queue_size)
+        self._display_queue = LatestQueue(queue_size)
+        self._stop = threading.Event()
+        self._error = None
+        self._threads = []
+
+        # Histograms looked up once, so timing a stage is a single observe()
+        self._timers = {}
+        if metrics is not None:
+            self._timers = {stage: metrics.timer(stage) for stage in (*self.stats, "send", "glass_to_command")}
+            metrics.gauge("frames_stale", lambda: self.stale, "Frames skipped for exceeding the age budget")
+            metrics.gauge("frames_dropped", lambda: self._detect_queue.dropped + self._decide_queue.dropped
+                          + self._display_queue.dropped, "Frames skipped by the latest-frame queues")
+            for reporter in reporters:
+                if hasattr(reporter, "stats"):
+                    metrics.collect("link", reporter.stats)
+
+    def _worker(self, stage, source, sink, fn):
+        stats = self.stats[stage]
+        timer = self._timers.get(stage)
+        try:
+            while not self._stop.is_set():
+                if source is None:
+                    start = time.perf_counter()
+                    frame = fn()
+                    if isinstance(frame, FramePacket):
+                        packet = frame
+                    else:
+                        packet = FramePacket(frame.sequence, frame.image, frame.timestamp)
+                    if self.blackbox is not None:
+                        self.blackbox.record(packet.frame, packet.timestamp)
+                else:
+                    packet = source.get(timeout=0.1)
+                    if packet is None or (stage == "detect" and self._stale(packet)):
+                        if stage == "decide":
+                            self._hold_if_stale()
+                        continue
+                    start = time.perf_counter()
+                    fn(packet)
+                elapsed = time.perf_counter() - start
+                stats.add(elapsed)
+                if timer is not None:
+                    timer.observe(elapsed)
+                packet.stage_ms[stage] = 1000.0 * elapsed
+                if stage == "decide" and self.telemetry is not None:
+                    # Decided and sent: one record with the timings of all three worker stages
+                    self.telemetry.record(packet)
+                sink.put(packet)
+        except EOFError:
+            # Frame source ran out (e.g. end of a recording)
+            self._stop.set()
+        except Exception as e:
+            self._error = e
+            self._stop.set()
+        finally:
+            sink.close()
+
+    def _stale(self, packet) -> bool:
+        """True (and counted) if the frame is older than max_age."""
+        if self.max_age is None or packet.timestamp is None:
+            return False
+        self._aged += 1
+        age = time.monotonic() - packet.timestamp
+        if age <= self.max_age:
+            return False
+        self.stale += 1
+        if not self._warned_stale and self._aged >= STALE_WARN_FRAMES and 2 * self.stale > self._aged:
+            self._warned_stale = True
+            print(f"[{self.name}] {self.stale} of {self._aged} frames were older than {1000.0 * self.max_age:.0f} ms "
+                  f"before detection (latest {1000.0 * age:.0f} ms) and were skipped; raise --max-frame-age, "
+                  f"or set it to 0 to disable the check")
+        return True
+
+    def _hold_if_stale(self):
+        """Stop the robot once no fresh frame has been decided for stale_timeout."""
+        if self.max_age is None or self._holding:
+            return
+        if time.monotonic() - self._last_fresh > self.stale_timeout:
+            self._holding = True
+            self.send('x')
+
+    def _decide_and_send(self, packet):
+        self.decide(packet)
+        if self.blackbox is not None:
+            stopped, command = self._last_decision
+            if packet.stopped and not stopped:
+                self.blackbox.trigger("fist-stop")
+            if packet.command == 's' and command != 's':
+                self.blackbox.trigger("backoff")
+            self._last_decision = (packet.stopped, packet.command)
+        start = time.perf_counter()
+        self.send(packet.command)
+        if self._timers:
+            self._timers["send"].observe(time.perf_counter() - start)
+        self._last_fresh = time.monotonic()
+        self._holding = False
+        if packet.timestamp is not None:
+            latency = self._last_fresh - packet.timestamp
+            self.latency.add(latency)
+            if self._timers:
+                self._timers["glass_to_command"].observe(latency)
+
+    def _start(self):
+        stages = (
+            ("capture", None, self._detect_queue, self.capture),
+            ("detect", self._detect_queue, self._decide_queue, self.detect),
+            ("decide", self._decide_queue, self._display_queue, self._decide_and_send),
+        )
+        for stage, source, sink, fn in stages:
+            thread = threading.Thread(target=self._worker, args=(stage, source, sink, fn),
+                                      name=f"{self.name}-{stage}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def report(self) -> dict:
+        """Print and return per-stage fps / latency since the last report."""
+        snapshot = {stage: stats.snapshot() for stage, stats in self.stats.items()}
+        parts = [f"{stage} {s['fps']:.1f} fps ({s['ms']:.1f} ms)" for stage, s in snapshot.items()]
+        dropped = self._detect_queue.dropped + self._decide_queue.dropped + self._display_queue.dropped
+        latency = self.latency.snapshot()
+        print(f"[{self.name}] " + " | ".join(parts) + f" | dropped {dropped} | stale {self.stale}"
+              + f" | glass-to-command {latency['ms']:.1f} ms")
+        self.display.report()
+        for reporter in self.reporters:
+            reporter.report()
+        if self.telemetry is not None:
+            self.telemetry.report()
+        if self.blackbox is not None:
+            self.blackbox.report()
+        return snapshot
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        """Run until 'q' is pressed (Ctrl+C when headless), the source ends or a stage fails."""
+        self._start()
+        stats = self.stats["display"]
+        timer = self._timers.get("display")
+        last_report = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                packet = self._display_queue.get(timeout=0.1)
+                now = time.perf_counter()
+                if self.report_interval and now - last_report >= self.report_interval:
+                    self.report()
+                    last_report = now
+
+                if packet is None:
+                    if not any(t.is_alive() for t in self._threads):
+                        break
+                    continue
+                if not self.display.due():
+                    continue
+
+                start = time.perf_counter()
+                if self.draw is not None:
+                    self.draw(packet)
+                key = self.display.show(packet.img)
+                elapsed = time.perf_counter() - start
+                stats.add(elapsed)
+                if timer is not None:
+                    timer.observe(elapsed)
+
+                if key == ord('q'):
+                    break
+                if key == ord('b') and self.blackbox is not None:
+                    self.blackbox.trigger("manual")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._stop.set()
+            for thread in self._threads:
+                thread.join(timeout=1.0)
+            self.display.close()
+            if self.telemetry is not None:
+                self.telemetry.close()
+            if self.blackbox is not None:
+                self.blackbox.close()
+            if self.metrics is not None:
+                self.metrics.close()
+        if self._error is not None:
+            raise self._error
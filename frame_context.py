@@ -0,0 +1,119 @@
+import hashlib
+
+import cv2
+import numpy as np
+
+
+def frame_digest(image: np.ndarray) -> bytes:
+    """16-byte hash of a frame's pixels, shape and dtype (SHA-256, hardware-accelerated on most CPUs)."""
+    h = hashlib.sha256(f"{image.shape}{image.dtype.str}".encode())
+    h.update(np.ascontiguousarray(image))
+    return h.digest()[:16]
+
+
+class FrameContext:
+    """Lazily computed, memoized views of the current frame.
+
+    Detectors ask the context for the views they need (RGB, grayscale,
+    downscaled copies) instead of converting the frame themselves, so every
+    view is computed at most once per frame no matter how many detectors
+    use it. Downscaled views are resized from the smallest cached view that
+    is still large enough, which turns repeated requests into a pyramid.
+    Results are written into buffers that are reused from frame to frame.
+
+    Call reset() with every new frame before anything draws on it. Returned
+    arrays are only valid until the next reset().
+    """
+
+    def __init__(self):
+        self.frame = None
+        self.computed = 0
+        self.reused = 0
+        self._views = {}    # (kind, (w, h)) -> view of the current frame
+        self._buffers = {}  # same keys -> arrays kept across frames
+
+    def reset(self, frame: np.ndarray) -> "FrameContext":
+        self.frame = frame
+        self._views.clear()
+        return self
+
+    def size(self, scale: float = 1.0):
+        """(width, height) of the frame downscaled by `scale`."""
+        h, w = self.frame.shape[:2]
+        if scale >= 1.0:
+            return w, h
+        return max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+
+    def _buffer(self, key, shape):
+        buf = self._buffers.get(key)
+        if buf is None or buf.shape != shape:
+            buf = np.empty(shape, self.frame.dtype)
+            self._buffers[key] = buf
+        return buf
+
+    def _memo(self, key, compute):
+        view = self._views.get(key)
+        if view is None:
+            view = compute()
+            self._views[key] = view
+            self.computed += 1
+        else:
+            self.reused += 1
+        return view
+
+    def _nearest_larger(self, size):
+        """Smallest cached BGR view at least `size`, else the full frame."""
+        w, h = size
+        best = self.frame
+        for (kind, (vw, vh)), view in self._views.items():
+            if kind == "bgr" and vw >= w and vh >= h and vw * vh < best.shape[0] * best.shape[1]:
+                best = view
+        return best
+
+    def resized(self, size) -> np.ndarray:
+        """BGR frame resized to `size` = (width, height)."""
+        size = tuple(size)
+        if size == self.size():
+            return self.frame
+        key = ("bgr", size)
+
+        def compute():
+            dst = self._buffer(key, (size[1], size[0], 3))
+            return cv2.resize(self._nearest_larger(size), size, dst=dst, interpolation=cv2.INTER_AREA)
+
+        return self._memo(key, compute)
+
+    def scaled(self, scale: float = 1.0) -> np.ndarray:
+        """BGR frame downscaled by `scale` (the frame itself at scale 1)."""
+        return self.resized(self.size(scale))
+
+    def rgb(self, scale: float = 1.0) -> np.ndarray:
+        """RGB copy of the frame downscaled by `scale`, as MediaPipe wants it."""
+        size = self.size(scale)
+        key = ("rgb", size)
+
+        def compute():
+            dst = self._buffer(key, (size[1], size[0], 3))
+            return cv2.cvtColor(self.resized(size), cv2.COLOR_BGR2RGB, dst=dst)
+
+        return self._memo(key, compute)
+
+    def gray(self, scale: float = 1.0) -> np.ndarray:
+        """Grayscale copy of the frame downscaled by `scale`."""
+        size = self.size(scale)
+        key = ("gray", size)
+
+        def compute():
+            dst = self._buffer(key, (size[1], size[0]))
+            return cv2.cvtColor(self.resized(size), cv2.COLOR_BGR2GRAY, dst=dst)
+
+        return self._memo(key, compute)
+
+    def digest(self) -> bytes:
+        """frame_digest() of the current frame, to look up cached detections; ask before drawing on it."""
+        return self._memo(("digest", self.size()), lambda: frame_digest(self.frame))
+
+    def report(self):
+        total = self.computed + self.reused
+        share = 100.0 * self.reused / total if total else 0.0
+        print(f"[Context] views computed {self.computed} | reused {self.reused} ({share:.0f}%)")
@@ -0,0 +1,253 @@
+import json
+import os
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+# Per-frame index record stored next to each stream's raw frames
+INDEX_DTYPE = np.dtype([("sequence", "<i8"), ("timestamp", "<f8")])
+
+
+class Frame(NamedTuple):
+    image: np.ndarray
+    timestamp: float    # device capture time, seconds on the host's time.monotonic() clock
+    sequence: int       # device sequence number
+
+
+class FrameSource:
+    """Something that hands out frames by stream name ("video", "depth", ...).
+
+    get() blocks until the next frame of that stream is available and raises
+    EOFError once a finite source (a recording) runs out.
+    """
+
+    def get(self, stream: str) -> Frame:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DepthAISource(FrameSource):
+    """Live frames from an OAK camera running `pipeline`."""
+
+    def __init__(self, pipeline, max_size: int = 4):
+        import depthai as dai
+        self.device = dai.Device(pipeline)
+        self.max_size = max_size
+        self._queues = {}
+
+    def get(self, stream: str) -> Frame:
+        queue = self._queues.get(stream)
+        if queue is None:
+            queue = self.device.getOutputQueue(name=stream, maxSize=self.max_size, blocking=False)
+            self._queues[stream] = queue
+        msg = queue.get()
+        # getTimestamp() is the capture time already synced to the host's steady clock
+        return Frame(msg.getCvFrame(), msg.getTimestamp().total_seconds(), msg.getSequenceNum())
+
+    def close(self):
+        self.device.close()
+
+
+class FrameRecorder:
+    """Writes frames to a session directory that ReplaySource can memory-map.
+
+    Each stream gets `<stream>.frames` (raw frames back to back, no headers)
+    and `<stream>.index` (sequence number + device timestamp per frame);
+    `session.json` holds the shape and dtype of every stream. It is written
+    as soon as a stream starts, and the frame count is taken from the files
+    on replay, so a session cut short by a crash or a kill still replays.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._files = {}
+        self._meta = {}
+
+    def write(self, stream: str, frame: Frame):
+        image = np.ascontiguousarray(frame.image)
+        meta = self._meta.get(stream)
+        if meta is None:
+            meta = {"shape": list(image.shape), "dtype": image.dtype.str, "count": 0}
+            self._meta[stream] = meta
+            self._files[stream] = (open(os.path.join(self.path, f"{stream}.frames"), "wb"),
+                                   open(os.path.join(self.path, f"{stream}.index"), "wb"))
+            self._write_meta()
+        elif list(image.shape) != meta["shape"] or image.dtype.str != meta["dtype"]:
+            raise ValueError(f"{stream}: frame {image.shape} {image.dtype} does not match "
+                             f"recorded {tuple(meta['shape'])} {meta['dtype']}")
+
+        frames_file, index_file = self._files[stream]
+        frames_file.write(memoryview(image).cast("B"))
+        index_file.write(np.array([(frame.sequence, frame.timestamp)], INDEX_DTYPE).tobytes())
+        meta["count"] += 1
+
+    def _write_meta(self):
+        # Replaced in one step, so a reader never sees half a file
+        path = os.path.join(self.path, "session.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump({"streams": self._meta}, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def close(self):
+        for frames_file, index_file in self._files.values():
+            frames_file.close()
+            index_file.close()
+        self._write_meta()
+        total = sum(meta["count"] for meta in self._meta.values())
+        print(f"[Recorder] Saved {total} frames to {self.path}")
+
+
+class RecordingSource(FrameSource):
+    """Passes frames through from another source while recording them."""
+
+    def __init__(self, source: FrameSource, path: str):
+        self.source = source
+        self.recorder = FrameRecorder(path)
+
+    def get(self, stream: str) -> Frame:
+        frame = self.source.get(stream)
+        self.recorder.write(stream, frame)
+        return frame
+
+    def close(self):
+        self.recorder.close()
+        self.source.close()
+
+
+class ReplaySource(FrameSource):
+    """Plays back a FrameRecorder session without a camera.
+
+    Frames are read through np.memmap, so opening a long session is instant.
+    With `realtime` the frames are paced by their recorded device timestamps
+    (scaled by `speed`); otherwise they are returned as fast as they are read.
+
+    Timestamps are emulated the way a live camera reports them: on the
+    time.monotonic() clock, as the moment the frame was "captured" in this
+    replay, arriving `latency` seconds later. In realtime mode a consumer
+    that falls behind gets what the camera's non-blocking output queue of
+    `queue_size` would hold - the older frames are skipped - so frame age
+    and stale-frame handling behave as they would live. At max speed every
+    frame counts as captured `latency` before it is read.
+    """
+
+    def __init__(self, path: str, realtime: bool = True, speed: float = 1.0, loop: bool = False,
+                 latency: float = 0.0, queue_size: int = 4):
+        with open(os.path.join(path, "session.json")) as f:
+            meta = json.load(f)["streams"]
+        self.path = path
+        self.realtime = realtime
+        self.speed = speed
+        self.loop = loop
+        self.latency = latency
+        self.queue_size = queue_size
+        self.skipped = 0
+        self.frames = {}
+        self.index = {}
+        for stream, info in meta.items():
+            # Count what actually reached the disk: a killed recorder may have left a partial frame
+            dtype = np.dtype(info["dtype"])
+            frames_path = os.path.join(path, f"{stream}.frames")
+            index = np.fromfile(os.path.join(path, f"{stream}.index"), dtype=INDEX_DTYPE)
+            count = min(len(index), os.path.getsize(frames_path) // (dtype.itemsize * int(np.prod(info["shape"]))))
+            self.index[stream] = index[:count]
+            self.frames[stream] = (np.memmap(frames_path, dtype=dtype, mode="r",
+                                             shape=(count,) + tuple(info["shape"]))
+                                   if count else np.empty((0,) + tuple(info["shape"]), dtype))
+        self._position = {stream: 0 for stream in meta}
+        self._laps = {stream: 0 for stream in meta}
+        self._t0 = None  # (first recorded timestamp, its emulated capture time)
+
+    @property
+    def streams(self):
+        return list(self.frames)
+
+    def __len__(self):
+        return max(len(index) for index in self.index.values())
+
+    def get(self, stream: str) -> Frame:
+        if stream not in self.frames:
+            raise KeyError(f"stream '{stream}' not in recording {self.path} (has {self.streams})")
+        frames, index = self.frames[stream], self.index[stream]
+        i = self._position[stream]
+        if i >= len(index):
+            if not self.loop or len(index) == 0:
+                raise EOFError(f"end of recording {self.path}")
+            self._laps[stream] += 1
+            i = 0
+        self._position[stream] = i + 1
+
+        # Keep time moving forward when looping (one lap = n frame intervals)
+        offset = 0.0
+        if self._laps[stream]:
+            span = float(index[-1]["timestamp"] - index[0]["timestamp"])
+            if len(index) > 1:
+                span *= len(index) / (len(index) - 1)
+            offset = self._laps[stream] * span
+        if not self.realtime:
+            captured = time.monotonic() - self.latency
+        else:
+            recorded = float(index[i]["timestamp"]) + offset
+            if self._t0 is None:
+                self._t0 = (recorded, time.monotonic() - self.latency)
+            # Recorded device time <-> replay capture time on the monotonic clock
+            start_recorded, start_captured = self._t0
+            newest = int(np.searchsorted(index["timestamp"], start_recorded - offset + self.speed
+                                         * (time.monotonic() - self.latency - start_captured), "right")) - 1
+            if newest - i >= self.queue_size:
+                # Fell behind: the camera queue only kept the newest frames
+                self.skipped += newest - self.queue_size + 1 - i
+                i = newest - self.queue_size + 1
+                self._position[stream] = i + 1
+                recorded = float(index[i]["timestamp"]) + offset
+            captured = start_captured + (recorded - start_recorded) / self.speed
+            delay = captured + self.latency - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        # Copy out of the read-only map: detectors draw on the frame in place
+        return Frame(np.array(frames[i]), captured, int(index[i]["sequence"]))
+
+
+def add_source_args(parser):
+    """Add --record / --replay / --max-frame-age options to a script's argument parser."""
+    group = parser.add_argument_group("frame source")
+    group.add_argument("--record", metavar="DIR", help="record camera frames to DIR while running")
+    group.add_argument("--replay", metavar="DIR", help="replay a recorded session instead of the camera")
+    group.add_argument("--max-speed", action="store_true", help="replay as fast as possible")
+    group.add_argument("--loop", action="store_true", help="loop the replay forever")
+    group.add_argument("--replay-latency", type=float, default=0.0, metavar="MS",
+                       help="emulated camera-to-host delay of replayed frames")
+    group.add_argument("--max-frame-age", type=float, default=250.0, metavar="MS",
+                       help="skip frames older than this (device capture to processing) instead of "
+                            "acting on stale data; 0 disables")
+    return parser
+
+
+def open_frame_source(args, create_pipeline) -> FrameSource:
+    """Open the source selected by add_source_args() options.
+
+    `create_pipeline` is only called when a camera is actually needed.
+    """
+    if args.replay:
+        print(f"[Source] Replaying {args.replay}" + (" at max speed" if args.max_speed else ""))
+        return ReplaySource(args.replay, realtime=not args.max_speed, loop=args.loop,
+                            latency=args.replay_latency / 1000.0)
+    source = DepthAISource(create_pipeline())
+    if args.record:
+        print(f"[Source] Recording to {args.record}")
+        return RecordingSource(source, args.record)
+    return source
+
+
+def max_frame_age(args):
+    """--max-frame-age in seconds, or None when disabled."""
+    return args.max_frame_age / 1000.0 if args.max_frame_age > 0 else None
@@ -2,32 +2,36 @@
 #When a fist is detected it comes to a full stop
 #This is a full stop, and can only be undone by rerunning the program.
 
+import argparse
 import cv2
-import socket
 import depthai as dai
 from cvzone.PoseModule import PoseDetector
 from cvzone.HandTrackingModule import HandDetector
+from blackbox import add_blackbox_args, open_blackbox
+from command_link import add_link_args, open_link
+from decision_policy import full_policy
+from display import add_display_args, open_display
+from follower_runtime import FollowerRuntime, FramePacket
+from frame_context import FrameContext
+from frame_source import add_source_args, max_frame_age, open_frame_source
+from hand_roi import WristHandDetector, add_hand_roi_args
+from metrics import add_metrics_args, open_metrics
+from pose_tracking import TrackedPoseDetector, add_tracking_args
+from scaled_detection import ScaledHandDetector, ScaledPoseDetector, add_scale_args, draw_hands, draw_pose
+from startup import Startup, warm_up
+from stereo_distance import StereoDistance, add_stereo_args, add_stereo_depth
+from telemetry import add_telemetry_args, open_telemetry
 
 # TCP Connection Setup
 ROBOT_IP = "100.87.161.11"
 PORT = 9999
-client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-client_socket.connect((ROBOT_IP, PORT))
-print("[Follower] Connected to robot.")
-
-# Initialize pose and hand detectors
-pose_detector = PoseDetector()
-hand_detector = HandDetector(detectionCon=0.8, maxHands=1)  # Adjust detectionCon if needed
-
-# Create pipeline and camera
-pipeline = dai.Pipeline()
-cam = pipeline.createColorCamera()
-cam.setPreviewSize(1280, 720)  # Higher resolution for better range
-cam.setInterleaved(False)
-cam.setBoardSocket(dai.CameraBoardSocket.CAM_A)
-xout = pipeline.createXLinkOut()
-xout.setStreamName("video")
-cam.preview.link(xout.input)
+
+# Pose and hand detectors, created by configure()
+pose_detector = None
+hand_detector = None
+
+# Derived views (RGB, gray, downscaled) of the current frame, shared by the detectors
+context = FrameContext()
 
 # Frame and movement setup
 frame_width = 1280
@@ -41,89 +45,181 @@ UPPER_HEIGHT = 900   # Between these: sweet zone (stop)
 TOO_CLOSE_WIDTH_RATIO = 0.9   # If person fills 90% of frame
 TOO_CLOSE_HEIGHT_RATIO = 0.9
 
+# Distance zones in meters, used instead of the heights with --stereo-distance
+NEAR_DISTANCE_M = 1.0   # Closer than this: move backward
+STOP_DISTANCE_M = 2.0   # Between near and this: sweet zone (stop)
+
 # Colors (BGR)
 COLOR_GREEN = (0, 255, 0)
 COLOR_PURPLE = (255, 0, 255)
 COLOR_RED = (0, 0, 255)
 
+# Bbox color per decision_policy zone: none, far, stop zone, too close
+BOX_COLORS = (None, COLOR_GREEN, COLOR_PURPLE, COLOR_RED)
+
 # State to track permanent stop after fist detection
 stopped = False
 
-# Run on device
-with dai.Device(pipeline) as device:
-    video_queue = device.getOutputQueue(name="video", maxSize=4, blocking=False)
-
-    try:
-        while True:
-            in_frame = video_queue.get()
-            frame = in_frame.getCvFrame()
-
-            # Pose detection
-            img = pose_detector.findPose(frame)
-            lmList, bboxInfo = pose_detector.findPosition(img, bboxWithHands=True)
-
-            # Hand detection and fist check (only if not stopped)
-            if not stopped:
-                hands, img = hand_detector.findHands(img, draw=True)  # draw=True shows landmarks and lines
-                if hands:
-                    hand = hands[0]
-                    fingers = hand_detector.fingersUp(hand)
-                    if sum(fingers) == 0:  # all fingers down = fist detected
-                        stopped = True
-                        print("[Follower] Fist detected - stopping permanently.")
-            else:
-                # Still draw hands landmarks and lines even if stopped
-                hands, img = hand_detector.findHands(img, draw=True)
-
-            if stopped:
-                command = 'x'  # Permanently stop
-                box_color = None
-            else:
-                if bboxInfo is not None and 'bbox' in bboxInfo:
-                    x, y, w, h = bboxInfo['bbox']
-                    cx = x + w // 2
-                    offset = cx - frame_center
-
-                    # Movement logic and bounding box color
-                    if w >= TOO_CLOSE_WIDTH_RATIO * frame_width or h >= TOO_CLOSE_HEIGHT_RATIO * frame_height:
-                        command = 's'  # Move backward
-                        box_color = COLOR_RED
-                    elif LOWER_HEIGHT <= h <= UPPER_HEIGHT:
-                        command = 'x'  # Stop
-                        box_color = COLOR_PURPLE
-                    elif h < LOWER_HEIGHT:
-                        if abs(offset) < center_tolerance:
-                            command = 'w'  # Move forward
-                        elif offset < 0:
-                            command = 'a'  # Turn left
-                        else:
-                            command = 'd'  # Turn right
-                        box_color = COLOR_GREEN
-                    else:
-                        command = 'x'
-                        box_color = COLOR_PURPLE
-
-                    # Draw full bounding box and center dot
-                    cv2.rectangle(img, (x, y), (x + w, y + h), box_color, thickness=3)
-                    cv2.circle(img, (cx, y + h // 2), 6, (0, 0, 255), cv2.FILLED)
-                else:
-                    command = 'x'  # Stop if no person
-                    box_color = None
-
-            # Send command
-            try:
-                client_socket.sendall(command.encode())
-                print(f"[Follower] Sent command: {command}")
-            except Exception as e:
-                print(f"[Follower][TCP ERROR]: {e}")
-
-            # Show frame
-            cv2.imshow("Follower View", img)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                client_socket.sendall('x'.encode())
-                break
-
-    finally:
-        client_socket.close()
-        cv2.destroyAllWindows()
-        print("[Follower] Shutdown complete.")
\ No newline at end of file
+# StereoDistance when --stereo-distance is on
+stereo = None
+
+
+def create_pipeline(stereo_depth: bool = False):
+    # Create pipeline and camera
+    pipeline = dai.Pipeline()
+    cam = pipeline.createColorCamera()
+    cam.setPreviewSize(1280, 720)  # Higher resolution for better range
+    cam.setInterleaved(False)
+    cam.setBoardSocket(dai.CameraBoardSocket.CAM_A)
+    xout = pipeline.createXLinkOut()
+    xout.setStreamName("video")
+    cam.preview.link(xout.input)
+    if stereo_depth:
+        add_stereo_depth(pipeline)
+    return pipeline
+
+
+def capture(source):
+    """Next color frame, with the latest disparity attached in stereo mode."""
+    frame = source.get("video")
+    packet = FramePacket(frame.sequence, frame.image, frame.timestamp)
+    if stereo is not None:
+        packet.disparity = source.get("disparity").image
+    return packet
+
+
+def detect(packet):
+    global stopped
+
+    context.reset(packet.frame)
+
+    # Pose detection
+    packet.img = pose_detector.findPose(packet.frame)
+    packet.lmList, bboxInfo = pose_detector.findPosition(packet.img, bboxWithHands=True)
+    if bboxInfo is not None and 'bbox' in bboxInfo:
+        packet.bbox = bboxInfo['bbox']
+
+    # Stereo distance from the disparity inside the person bbox only
+    if packet.disparity is not None and packet.bbox is not None:
+        h, w = packet.frame.shape[:2]
+        packet.distance = stereo.measure(packet.disparity, packet.bbox, (w, h))
+
+    # Hand detection and fist check (skipped entirely once stopped)
+    if not stopped:
+        packet.hands, _ = hand_detector.findHands(packet.frame, draw=False)
+        if packet.hands:
+            fingers = hand_detector.fingersUp(packet.hands[0])
+            if sum(fingers) == 0:  # all fingers down = fist detected
+                stopped = True
+                print("[Follower] Fist detected - stopping permanently.")
+    packet.stopped = stopped
+
+
+def decide(packet):
+    present = packet.bbox is not None and not packet.stopped  # Permanently stop, or stop if no person
+    x, _, w, h = packet.bbox if present else (0, 0, 0, 0)
+
+    # Distance zone: stereo distance when measured, bbox height otherwise (see decision_policy)
+    distance = packet.distance if packet.distance is not None else float("nan")
+    command, zone = full_policy(x, w, h, present, distance, LOWER_HEIGHT, UPPER_HEIGHT, TOO_CLOSE_WIDTH_RATIO,
+                                TOO_CLOSE_HEIGHT_RATIO, NEAR_DISTANCE_M, STOP_DISTANCE_M, center_tolerance,
+                                frame_width, frame_height)
+    packet.command = chr(command)
+    packet.box_color = BOX_COLORS[zone]
+
+
+def draw(packet):
+    # Landmarks found by detect(), drawn here so only the frames shown pay for it
+    draw_pose(packet.img, packet.lmList, packet.bbox)
+    draw_hands(packet.img, packet.hands)
+
+    if packet.box_color is None:
+        return
+    x, y, w, h = packet.bbox
+    cx = x + w // 2
+
+    # Draw full bounding box and center dot
+    cv2.rectangle(packet.img, (x, y), (x + w, y + h), packet.box_color, thickness=3)
+    cv2.circle(packet.img, (cx, y + h // 2), 6, (0, 0, 255), cv2.FILLED)
+    if packet.distance is not None:
+        cv2.putText(packet.img, f"{packet.distance:.2f} m", (x, y - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, packet.box_color, 2)
+
+
+def configure(args):
+    """Apply the detector options; returns extra objects to report on."""
+    global pose_detector, hand_detector, stereo
+    reporters = []
+
+    # The MediaPipe models load here rather than at import, so they overlap the camera boot
+    pose_detector = PoseDetector()
+    hand_detector = HandDetector(detectionCon=0.8, maxHands=1)  # Adjust detectionCon if needed
+
+    # Optional stereo distance inside the person bbox
+    if args.stereo_distance:
+        stereo = StereoDistance(args.stereo_focal, args.stereo_baseline)
+
+    # Detectors share one RGB/gray conversion per frame through the context;
+    # below scale 1 they run on a downscaled view, results stay in full-frame pixels
+    # They never draw: draw() overlays the landmarks, only on the frames the display shows
+    pose_detector = ScaledPoseDetector(pose_detector, context, args.inference_scale, draw=False)
+    reporters.append(context)
+
+    # Optional detect-then-track: full pose detection only every N frames
+    if args.track_interval > 1:
+        pose_detector = TrackedPoseDetector(pose_detector, context, interval=args.track_interval, draw=False)
+        reporters.append(pose_detector)
+
+    # Fist check on crops around the pose wrists, every few frames
+    if args.full_frame_hands:
+        hand_detector = ScaledHandDetector(hand_detector, context, args.inference_scale, draw=False)
+    else:
+        hand_detector = WristHandDetector(hand_detector, pose_detector, context,
+                                          interval=args.hand_interval, draw=False)
+        reporters.append(hand_detector)
+    return reporters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pose follower with distance zones, fist to stop")
+    add_source_args(parser)
+    add_tracking_args(parser)
+    add_scale_args(parser)
+    add_hand_roi_args(parser)
+    add_stereo_args(parser)
+    add_display_args(parser)
+    add_telemetry_args(parser)
+    add_metrics_args(parser)
+    add_link_args(parser)
+    add_blackbox_args(parser)
+    args = parser.parse_args()
+
+    # Boot the camera while the detectors load and warm up. Commands are sent from a
+    # background thread that connects (and reconnects) on its own
+    startup = Startup("Follower")
+    device = startup.background("device", open_frame_source, args, lambda: create_pipeline(args.stereo_distance))
+    link = open_link(args, ROBOT_IP, PORT, log_commands=args.telemetry is None)
+    startup.watch("controller", link.wait_connected)
+    reporters = [link] + startup.step("detectors", configure, args)
+    startup.step("warm-up", warm_up, detect, (1280, 720))
+
+    # Run on device (or a recording)
+    with device.result() as source:
+        if stereo is not None:
+            stereo.calibrate_from_source(source)
+        runtime = FollowerRuntime(lambda: capture(source),
+                                  detect, decide, link.send, draw,
+                                  display=open_display(args, "Follower View"), reporters=reporters,
+                                  telemetry=open_telemetry(args), metrics=open_metrics(args),
+                                  max_age=max_frame_age(args),
+                                  blackbox=open_blackbox(args, (1280, 720), link))
+        startup.report()
+        try:
+            runtime.run()
+        finally:
+            link.close('x')
+            print("[Follower] Shutdown complete.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import cv2
+import numpy as np
+
+from scaled_detection import hands_from_results
+
+# MediaPipe pose landmark ids (cvzone lmList order)
+LEFT_SHOULDER, RIGHT_SHOULDER = 11, 12
+LEFT_ELBOW, RIGHT_ELBOW = 13, 14
+LEFT_WRIST, RIGHT_WRIST = 15, 16
+
+
+class WristHandDetector:
+    """Hand detection on small crops around the pose wrists.
+
+    Instead of running cvzone's HandDetector over the whole 1280x720 frame,
+    a square crop of the shared RGB view (see FrameContext) is cut around
+    each wrist (pushed a little past the wrist,
+    away from the elbow, where the hand is) and sized from the shoulder
+    width. Both crops are resampled into one small side-by-side mosaic and
+    the detector runs once on it; hand landmarks, bboxes and centers are then
+    mapped back to full-frame pixels, so fingersUp() works unchanged.
+
+    The wrists come from `pose_detector.lmList` (set by findPosition()), so
+    findHands() keeps cvzone's signature. Detection only runs every
+    `interval` calls; in between the last hands are returned. Without pose
+    landmarks there are no wrists and nothing runs.
+    """
+
+    def __init__(self, detector, pose_detector, context, interval: int = 3, tile: int = 192,
+                 roi_scale: float = 0.5, min_half: int = 48, reach: float = 0.4, draw: bool = True):
+        self.detector = detector
+        self.pose_detector = pose_detector
+        self.context = context
+        self.interval = max(1, interval)
+        self.tile = tile
+        self.roi_scale = roi_scale
+        self.min_half = min_half
+        self.reach = reach
+        self.draw = draw
+
+        self.hands = []
+        self.calls = 0
+        self.runs = 0
+        self._mosaic = np.zeros((tile, 2 * tile, 3), np.uint8)
+        self._tiles = [np.zeros((tile, tile, 3), np.uint8) for _ in range(2)]
+
+    def _crop(self, lmList, wrist, elbow):
+        """(x0, y0, scale) of the square wrist crop in full-frame pixels."""
+        wx, wy = lmList[wrist][0], lmList[wrist][1]
+        ex, ey = lmList[elbow][0], lmList[elbow][1]
+        cx, cy = wx + self.reach * (wx - ex), wy + self.reach * (wy - ey)
+        shoulders = abs(lmList[LEFT_SHOULDER][0] - lmList[RIGHT_SHOULDER][0])
+        half = max(self.min_half, self.roi_scale * shoulders)
+        return cx - half, cy - half, self.tile / (2.0 * half)
+
+    def _detect(self, lmList, flipType):
+        rgb = self.context.rgb()
+        crops = [self._crop(lmList, LEFT_WRIST, LEFT_ELBOW),
+                 self._crop(lmList, RIGHT_WRIST, RIGHT_ELBOW)]
+        for i, (x0, y0, s) in enumerate(crops):
+            # Crops reaching past the frame edge are zero-padded by the warp
+            M = np.float32([[s, 0, -s * x0], [0, s, -s * y0]])
+            cv2.warpAffine(rgb, M, (self.tile, self.tile), dst=self._tiles[i],
+                           flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT)
+            self._mosaic[:, i * self.tile:(i + 1) * self.tile] = self._tiles[i]
+
+        self.detector.results = self.detector.hands.process(self._mosaic)
+        hands = hands_from_results(self.detector.results, 2 * self.tile, self.tile, flipType)
+        for hand in hands:
+            i = min(1, hand["center"][0] // self.tile)
+            x0, y0, s = crops[i]
+            ox = i * self.tile
+
+            def to_frame(mx, my):
+                return int(x0 + (mx - ox) / s), int(y0 + my / s)
+
+            hand["lmList"] = [[*to_frame(x, y), int(z / s)] for x, y, z in hand["lmList"]]
+            bx, by, bw, bh = hand["bbox"]
+            x, y = to_frame(bx, by)
+            hand["bbox"] = (x, y, int(bw / s), int(bh / s))
+            hand["center"] = to_frame(*hand["center"])
+        return hands
+
+    def findHands(self, img, draw=True, flipType=True):
+        """Hands near the pose wrists, in full-frame pixels (cvzone format)."""
+        if self.calls % self.interval == 0:
+            lmList = self.pose_detector.lmList
+            if len(lmList) > RIGHT_WRIST:
+                self.hands = self._detect(lmList, flipType)
+                self.runs += 1  # only frames the hand detector actually ran on
+            else:
+                self.hands = []
+        self.calls += 1
+
+        if draw and self.draw:
+            for hand in self.hands:
+                x, y, w, h = hand["bbox"]
+                for lx, ly, _ in hand["lmList"]:
+                    cv2.circle(img, (lx, ly), 4, (255, 0, 255), cv2.FILLED)
+                cv2.rectangle(img, (x - 20, y - 20), (x + w + 20, y + h + 20), (255, 0, 255), 2)
+        return self.hands, img
+
+    def fingersUp(self, myHand):
+        return self.detector.fingersUp(myHand)
+
+    def report(self):
+        share = 100.0 * self.runs / self.calls if self.calls else 0.0
+        print(f"[HandROI] hand detection on {self.runs} of {self.calls} frames ({share:.0f}%)")
+
+
+def add_hand_roi_args(parser):
+    """Add the wrist-ROI hand detection options to a follower's argument parser."""
+    parser.add_argument("--hand-interval", type=int, default=3, metavar="N",
+                        help="run the fist check every N frames on crops around the wrists")
+    parser.add_argument("--full-frame-hands", action="store_true",
+                        help="detect hands on the whole frame every frame (previous behavior)")
+    return parser
@@ -1,87 +1,141 @@
+import argparse
 import cv2
-import socket
 import depthai as dai
 from cvzone.PoseModule import PoseDetector
+from blackbox import add_blackbox_args, open_blackbox
+from command_link import add_link_args, open_link
+from decision_policy import height_policy
+from display import add_display_args, open_display
+from follower_runtime import FollowerRuntime
+from frame_context import FrameContext
+from frame_source import add_source_args, max_frame_age, open_frame_source
+from metrics import add_metrics_args, open_metrics
+from pose_tracking import TrackedPoseDetector, add_tracking_args
+from scaled_detection import ScaledPoseDetector, add_scale_args, draw_pose
+from startup import Startup, warm_up
+from telemetry import add_telemetry_args, open_telemetry
 
 # TCP Connection Setup
 ROBOT_IP = "100.87.161.11"
 PORT = 9999
-client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-client_socket.connect((ROBOT_IP, PORT))
-print("[Follower] Connected to robot.")
-
-# Initialize pose detector
-pose_detector = PoseDetector()
-
-# Create pipeline and camera
-pipeline = dai.Pipeline()
-cam = pipeline.createColorCamera()
-cam.setPreviewSize(1280, 720)  # Higher resolution for better range
-cam.setInterleaved(False)
-cam.setBoardSocket(dai.CameraBoardSocket.CAM_A)
-xout = pipeline.createXLinkOut()
-xout.setStreamName("video")
-cam.preview.link(xout.input)
+
+# Pose detector, created by configure()
+pose_detector = None
+
+# Derived views (RGB, gray, downscaled) of the current frame, shared by the detectors
+context = FrameContext()
 
 # Frame and movement setup
 frame_width = 1280
 frame_center = frame_width // 2
 center_tolerance = frame_width // 10  # acceptable range to go straight
-
-# Track permanent stop state
-stopped = False
-
-# Run on device
-with dai.Device(pipeline) as device:
-    video_queue = device.getOutputQueue(name="video", maxSize=4, blocking=False)
-
-    try:
-        while True:
-            in_frame = video_queue.get()
-            frame = in_frame.getCvFrame()
-
-            # Pose detection
-            img = pose_detector.findPose(frame)
-            lmList, bboxInfo = pose_detector.findPosition(img, bboxWithHands=True)
-
-            # Only use bounding box height to decide stop
-            if bboxInfo is not None and 'bbox' in bboxInfo:
-                x, y, w, h = bboxInfo['bbox']
-
-                # Stop if person is too close
-                if h > 900:  # Adjust threshold based on your testing
-                    command = 'x'
-                else:
-                    cx = x + w // 2
-                    offset = cx - frame_center
-
-                    # Draw bounding box and center dot
-                    cv2.rectangle(img, (x, y), (x + w, y + h), (0, 255, 0), 3)
-                    cv2.circle(img, (cx, y + h // 2), 5, (0, 0, 255), cv2.FILLED)
-
-                    if abs(offset) < center_tolerance:
-                        command = 'w'
-                    elif offset < 0:
-                        command = 'a'
-                    else:
-                        command = 'd'
-            else:
-                command = 'x'
-
-            try:
-                client_socket.sendall(command.encode())
-                print(f"[Follower] Sent command: {command}")
-            except Exception as e:
-                print(f"[Follower][TCP ERROR]: {e}")
-
-            # Show the full annotated frame
-            cv2.imshow("Follower View", img)
-
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                client_socket.sendall('x'.encode())
-                break
-
-    finally:
-        client_socket.close()
-        cv2.destroyAllWindows()
-        print("[Follower] Shutdown complete.")
\ No newline at end of file
+STOP_HEIGHT = 900  # Stop once the bbox is taller than this (adjust based on your testing)
+
+
+def create_pipeline():
+    # Create pipeline and camera
+    pipeline = dai.Pipeline()
+    cam = pipeline.createColorCamera()
+    cam.setPreviewSize(1280, 720)  # Higher resolution for better range
+    cam.setInterleaved(False)
+    cam.setBoardSocket(dai.CameraBoardSocket.CAM_A)
+    xout = pipeline.createXLinkOut()
+    xout.setStreamName("video")
+    cam.preview.link(xout.input)
+    return pipeline
+
+
+def detect(packet):
+    context.reset(packet.frame)
+
+    # Pose detection
+    packet.img = pose_detector.findPose(packet.frame)
+    packet.lmList, bboxInfo = pose_detector.findPosition(packet.img, bboxWithHands=True)
+    if bboxInfo is not None and 'bbox' in bboxInfo:
+        packet.bbox = bboxInfo['bbox']
+
+
+def decide(packet):
+    # Only use bounding box height to decide stop
+    present = packet.bbox is not None
+    x, _, w, h = packet.bbox if present else (0, 0, 0, 0)
+    command, _ = height_policy(x, w, h, present, STOP_HEIGHT, center_tolerance, frame_width)
+    packet.command = chr(command)
+
+
+def draw(packet):
+    # Landmarks found by detect(), drawn here so only the frames shown pay for it
+    draw_pose(packet.img, packet.lmList, packet.bbox)
+
+    if packet.bbox is None:
+        return
+    x, y, w, h = packet.bbox
+    if h > STOP_HEIGHT:
+        return
+
+    # Draw bounding box and center dot
+    cx = x + w // 2
+    cv2.rectangle(packet.img, (x, y), (x + w, y + h), (0, 255, 0), 3)
+    cv2.circle(packet.img, (cx, y + h // 2), 5, (0, 0, 255), cv2.FILLED)
+
+
+def configure(args):
+    """Apply the detector options; returns extra objects to report on."""
+    global pose_detector
+    reporters = []
+
+    # The MediaPipe models load here rather than at import, so they overlap the camera boot
+    pose_detector = PoseDetector()
+
+    # Detectors share one RGB/gray conversion per frame through the context;
+    # below scale 1 they run on a downscaled view, results stay in full-frame pixels
+    # They never draw: draw() overlays the landmarks, only on the frames the display shows
+    pose_detector = ScaledPoseDetector(pose_detector, context, args.inference_scale, draw=False)
+    reporters.append(context)
+
+    # Optional detect-then-track: full pose detection only every N frames
+    if args.track_interval > 1:
+        pose_detector = TrackedPoseDetector(pose_detector, context, interval=args.track_interval, draw=False)
+        reporters.append(pose_detector)
+    return reporters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pose follower that stops when the person is close")
+    add_source_args(parser)
+    add_tracking_args(parser)
+    add_scale_args(parser)
+    add_display_args(parser)
+    add_telemetry_args(parser)
+    add_metrics_args(parser)
+    add_link_args(parser)
+    add_blackbox_args(parser)
+    args = parser.parse_args()
+
+    # Boot the camera while the detectors load and warm up. Commands are sent from a
+    # background thread that connects (and reconnects) on its own
+    startup = Startup("Follower")
+    device = startup.background("device", open_frame_source, args, create_pipeline)
+    link = open_link(args, ROBOT_IP, PORT, log_commands=args.telemetry is None)
+    startup.watch("controller", link.wait_connected)
+    reporters = [link] + startup.step("detectors", configure, args)
+    startup.step("warm-up", warm_up, detect, (1280, 720))
+
+    # Run on device (or a recording)
+    with device.result() as source:
+        runtime = FollowerRuntime(lambda: source.get("video"),
+                                  detect, decide, link.send, draw,
+                                  display=open_display(args, "Follower View"), reporters=reporters,
+                                  telemetry=open_telemetry(args), metrics=open_metrics(args),
+                                  max_age=max_frame_age(args),
+                                  blackbox=open_blackbox(args, (1280, 720), link))
+        startup.report()
+        try:
+            runtime.run()
+        finally:
+            link.close('x')
+            print("[Follower] Shutdown complete.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import cv2
+import numpy as np
+
+
+class MaskPropagator:
+    """Runs the segmentation network only on keyframes and warps its mask in between.
+
+    A keyframe runs `segment(frame)` - at least every `interval` frames, and
+    whenever the scene changes more than optical flow can explain. On the
+    other frames, dense Farneback flow from the current to the previous
+    frame is computed on the FrameContext's grayscale view downscaled by
+    `scale`, and the previous mask is remapped along it (and re-thresholded,
+    so edges stay sharp). The scene-change score is the mean absolute
+    difference (0-255) between the current small frame and the previous one
+    warped by that same flow; above `change_threshold` the frame becomes a
+    keyframe instead.
+
+    The mask is returned at the network's resolution, as from segment(),
+    and is only valid until the next call.
+    """
+
+    def __init__(self, context, interval: int = 4, change_threshold: float = 12.0, scale: float = 0.25):
+        self.context = context
+        self.interval = max(1, interval)
+        self.change_threshold = change_threshold
+        self.scale = scale
+
+        self.frames = 0
+        self.keyframes = 0
+        self.scene_changes = 0
+        self.score = 0.0
+
+        self._mask = None
+        self._prev_gray = None
+        self._since_keyframe = 0
+        self._grids = {}
+
+    def _grid(self, shape):
+        """Pixel coordinate grids (x, y) of an image of `shape`, cached."""
+        grid = self._grids.get(shape)
+        if grid is None:
+            ys, xs = np.indices(shape, dtype=np.float32)
+            grid = self._grids[shape] = (xs, ys)
+        return grid
+
+    def _warp(self, image, flow, out=None):
+        """`image` sampled at grid + flow, with the flow resized to the image."""
+        h, w = image.shape[:2]
+        fh, fw = flow.shape[:2]
+        if (fh, fw) != (h, w):
+            flow = cv2.resize(flow, (w, h), interpolation=cv2.INTER_LINEAR)
+            flow[..., 0] *= w / fw
+            flow[..., 1] *= h / fh
+        xs, ys = self._grid((h, w))
+        return cv2.remap(image, xs + flow[..., 0], ys + flow[..., 1], cv2.INTER_LINEAR,
+                         dst=out, borderMode=cv2.BORDER_REPLICATE)
+
+    def __call__(self, frame: np.ndarray, segment) -> np.ndarray:
+        self.frames += 1
+        gray = self.context.reset(frame).gray(self.scale)
+
+        keyframe = self._mask is None or self._since_keyframe + 1 >= self.interval
+        if not keyframe:
+            # Flow from the current frame back to the previous one: where each pixel came from
+            flow = cv2.calcOpticalFlowFarneback(gray, self._prev_gray, None, 0.5, 2, 9, 2, 5, 1.1, 0)
+            predicted = self._warp(self._prev_gray, flow)
+            self.score = float(cv2.absdiff(gray, predicted).mean())
+            if self.score > self.change_threshold:
+                keyframe = True
+                self.scene_changes += 1
+            else:
+                warped = self._warp(self._mask, flow)
+                self._mask = np.greater(warped, 0.5).astype(np.float32)
+                self._since_keyframe += 1
+
+        if self._prev_gray is None or self._prev_gray.shape != gray.shape:
+            self._prev_gray = np.empty_like(gray)
+        # Copied before segment() resets the context and reuses its buffers
+        np.copyto(self._prev_gray, gray)
+
+        if keyframe:
+            self._mask = segment(frame)
+            self._since_keyframe = 0
+            self.keyframes += 1
+        return self._mask
+
+    def report(self):
+        share = 100.0 * self.keyframes / self.frames if self.frames else 0.0
+        print(f"[MaskReuse] network on {self.keyframes} of {self.frames} frames ({share:.0f}%) "
+              f"| scene changes {self.scene_changes} | last score {self.score:.1f}")
+
+
+def add_mask_reuse_args(parser):
+    """Add --mask-interval / --scene-change to the planner's argument parser."""
+    group = parser.add_argument_group("mask reuse")
+    group.add_argument("--mask-interval", type=int, default=1, metavar="K",
+                       help="run the network at least every K frames and propagate its mask with "
+                            "optical flow in between (1 = every frame)")
+    group.add_argument("--scene-change", type=float, default=12.0, metavar="T",
+                       help="run the network early when the flow-compensated frame difference "
+                            "(mean, 0-255) exceeds T")
+    return parser
@@ -0,0 +1,177 @@
+import bisect
+import http.server
+import os
+import resource
+import socketserver
+import threading
+import time
+
+# Histogram bucket upper bounds in seconds (a 30 fps frame is 0.033)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.033, 0.05, 0.1, 0.2, 0.5, 1.0)
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+class Histogram:
+    """Fixed-bucket latency histogram.
+
+    observe() is a bisect over the bucket bounds plus two additions, well
+    under a microsecond. There is no lock: each histogram is meant to be fed
+    by one thread (one stage), and a scrape reading it mid-update is off by
+    at most one sample.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+
+def _thread_cpu_seconds():
+    """CPU seconds (user + system) per live Python thread, from /proc on Linux."""
+    result = {}
+    for thread in threading.enumerate():
+        try:
+            with open(f"/proc/self/task/{thread.native_id}/stat") as f:
+                # Fields after the parenthesized command name; utime and stime are 14 and 15
+                fields = f.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        result[thread.name] = (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+    return result
+
+
+def _resident_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Metrics:
+    """Named latency timers, gauges and resource usage, served as Prometheus text.
+
+    observe(name, seconds) feeds the histogram of a stage; the caller does
+    its own perf_counter() timing, which the runtimes already do. gauge()
+    registers a callable read only when scraped, and collect() does the same
+    for a whole stats() dict (e.g. CommandLink's). CPU time per thread and
+    the process's resident memory (Linux has no per-thread RSS) are sampled
+    at scrape time too, so nothing but observe() runs on the control path.
+    With a `port`, GET http://127.0.0.1:<port>/metrics returns everything.
+    """
+
+    def __init__(self, prefix: str = "follower", port: int = None, host: str = "127.0.0.1"):
+        self.prefix = prefix
+        self.histograms = {}
+        self._gauges = {}
+        self._collectors = []
+        self._started = time.time()
+        self._httpd = None
+        if port is not None:
+            self._serve(host, port)
+
+    def timer(self, name: str) -> Histogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return histogram
+
+    def observe(self, name: str, seconds: float):
+        self.timer(name).observe(seconds)
+
+    def gauge(self, name: str, fn, description: str = ""):
+        self._gauges[name] = (fn, description)
+
+    def collect(self, name: str, stats):
+        """Export every numeric value of the dict returned by `stats()` as `<name>_<key>`."""
+        self._collectors.append((name, stats))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        p = self.prefix
+        lines = [f"# HELP {p}_stage_latency_seconds Time spent per frame in each stage",
+                 f"# TYPE {p}_stage_latency_seconds histogram"]
+        for stage, h in list(self.histograms.items()):
+            counts, total = list(h.counts), h.sum
+            cumulative = 0
+            for bound, count in zip(h.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f'{p}_stage_latency_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{p}_stage_latency_seconds_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{p}_stage_latency_seconds_count{{stage="{stage}"}} {cumulative}')
+
+        lines += [f"# HELP {p}_thread_cpu_seconds_total CPU time (user + system) per thread",
+                  f"# TYPE {p}_thread_cpu_seconds_total counter"]
+        for thread, seconds in _thread_cpu_seconds().items():
+            lines.append(f'{p}_thread_cpu_seconds_total{{thread="{thread}"}} {seconds:.2f}')
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        lines += [f"# TYPE {p}_process_cpu_seconds_total counter",
+                  f"{p}_process_cpu_seconds_total {usage.ru_utime + usage.ru_stime:.2f}",
+                  f"# TYPE {p}_process_resident_memory_bytes gauge",
+                  f"{p}_process_resident_memory_bytes {_resident_bytes()}",
+                  f"# TYPE {p}_uptime_seconds gauge",
+                  f"{p}_uptime_seconds {time.time() - self._started:.1f}"]
+
+        for name, (fn, description) in list(self._gauges.items()):
+            if description:
+                lines.append(f"# HELP {p}_{name} {description}")
+            lines += [f"# TYPE {p}_{name} gauge", f"{p}_{name} {float(fn())}"]
+        for name, stats in self._collectors:
+            for key, value in stats().items():
+                if isinstance(value, (bool, int, float)):
+                    lines += [f"# TYPE {p}_{name}_{key} gauge", f"{p}_{name}_{key} {float(value)}"]
+        return "\n".join(lines) + "\n"
+
+    def _serve(self, host: str, port: int):
+        metrics = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = socketserver.ThreadingTCPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        threading.Thread(target=self._httpd.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"[Metrics] Serving on http://{host}:{self.port}/metrics")
+
+    def close(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+
+def add_metrics_args(parser):
+    """Add --metrics-port to a script's argument parser."""
+    group = parser.add_argument_group("metrics")
+    group.add_argument("--metrics-port", type=int, metavar="PORT",
+                       help="serve stage latency histograms and CPU/memory as Prometheus text "
+                            "on localhost:PORT/metrics")
+    return parser
+
+
+def open_metrics(args, prefix: str = "follower"):
+    """Metrics with an HTTP endpoint for --metrics-port, or None."""
+    return Metrics(prefix, port=args.metrics_port) if args.metrics_port is not None else None
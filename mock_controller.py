@@ -0,0 +1,142 @@
+import argparse
+import socket
+import socketserver
+import threading
+import time
+
+from command_protocol import (COMMAND_FRAME, COMMAND_MAGIC, TWISTS, decode_command, encode_ack,
+                              read_exact)
+
+HOST = "127.0.0.1"
+PORT = 9999
+
+
+class MockController:
+    """Local stand-in for the Amiga's controller.py, for benchmarks and bench testing.
+
+    Accepts any number of clients and tells the protocols apart per message:
+    a COMMAND_MAGIC byte starts a framed command, which is acknowledged once
+    "applied" `apply_delay` seconds after it arrived; any other byte is a
+    legacy single-character command. The latest twist is kept in `twist`,
+    and every command is counted per client.
+    """
+
+    def __init__(self, host: str = HOST, port: int = PORT, apply_delay: float = 0.0, verbose: bool = False):
+        self.apply_delay = apply_delay
+        self.verbose = verbose
+        self.twist = (0.0, 0.0)
+        self.command = "x"
+        self.legacy = 0
+        self.framed = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+        controller = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def setup(self):
+                super().setup()
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def handle(self):
+                controller._serve(self.client_address, self.rfile, self.connection)
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.address = self._server.server_address
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-controller", daemon=True)
+        self._thread.start()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _apply(self, command: str, twist, framed: bool):
+        with self._lock:
+            if framed:
+                self.framed += 1
+            else:
+                self.legacy += 1
+            if self.verbose and command != self.command:
+                print(f"[Mock] {command} linear {twist[0]:+.2f} m/s angular {twist[1]:+.2f} rad/s")
+            self.command = command
+            self.twist = twist
+
+    def _serve(self, client, rfile, connection):
+        if self.verbose:
+            print(f"[Mock] Client {client[0]}:{client[1]} connected")
+        legacy = framed = 0
+        while True:
+            try:
+                first = read_exact(rfile, 1)
+            except OSError:  # e.g. reset by a client closing with acks still unread
+                break
+            if not first:
+                break
+            received = time.monotonic()
+            if first != COMMAND_MAGIC[:1]:
+                command = first.decode(errors="replace")
+                if command not in TWISTS:
+                    self.errors += 1
+                    continue
+                self._apply(command, TWISTS[command], framed=False)
+                legacy += 1
+                continue
+
+            try:
+                rest = read_exact(rfile, COMMAND_FRAME.size - 1)
+            except OSError:
+                break
+            if not rest:
+                break
+            try:
+                sequence, sent_at, command, twist = decode_command(first + rest)
+            except ValueError as e:
+                # A frame boundary was lost; the stream can't be resynchronized reliably
+                print(f"[Mock][ERROR] {client[0]}:{client[1]}: {e}")
+                self.errors += 1
+                break
+            if self.apply_delay:
+                time.sleep(self.apply_delay)
+            self._apply(command, twist, framed=True)
+            try:
+                connection.sendall(encode_ack(sequence, sent_at, time.monotonic() - received))
+            except OSError:
+                break
+            framed += 1
+        if self.verbose:
+            print(f"[Mock] Client {client[0]}:{client[1]} left after {legacy} legacy and {framed} framed commands")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in controller speaking the legacy and framed protocols")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--apply-delay", type=float, default=0.0, metavar="SECONDS",
+                        help="simulated time from receiving a framed command to acknowledging it")
+    parser.add_argument("--quiet", action="store_true", help="don't print command changes")
+    args = parser.parse_args()
+
+    with MockController(args.host, args.port, args.apply_delay, verbose=not args.quiet) as controller:
+        print(f"[Mock] Controller listening on {controller.address[0]}:{controller.address[1]}")
+        try:
+            while True:
+                time.sleep(1.0)
+        except KeyboardInterrupt:
+            pass
+    print(f"[Mock] {controller.legacy} legacy, {controller.framed} framed commands, {controller.errors} errors")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import os
+
+import numpy as np
+import torch
+
+from frame_source import ReplaySource
+from preprocess import PlannerPreprocessor
+
+BACKENDS = ("torch", "torchscript", "onnx", "int8-dynamic", "int8-static")
+ONNX_OPSET = 17
+CALIBRATION_FRAMES = 64
+
+
+def load_unet(weights: str, device: str = "cpu"):
+    """planner.py's UNet ResNet34 with its trained weights, in eval mode on `device`."""
+    # Imported here so a planner running another backend, or the server process, never loads it itself
+    import segmentation_models_pytorch as smp
+
+    model = smp.Unet(
+        encoder_name="resnet34",
+        encoder_weights=None,
+        in_channels=3,
+        classes=1,
+    )
+    if weights is not None:
+        model.load_state_dict(torch.load(weights, map_location=torch.device("cpu")))
+    model.to(torch.device(device))
+    model.eval()
+    return model
+
+
+class TorchBackend:
+    """An eager or TorchScript module: (1, 3, H, W) float32 input -> (H, W) 0/1 float32 mask."""
+
+    def __init__(self, model, device: str = "cpu"):
+        self.model = model
+        self.device = torch.device(device)
+
+    def __call__(self, tensor: np.ndarray) -> np.ndarray:
+        with torch.no_grad():
+            output = torch.sigmoid(self.model(torch.from_numpy(tensor).to(self.device)))
+            return (output > 0.5).float().squeeze().cpu().numpy()
+
+
+class OnnxBackend:
+    """An ONNX model on ONNX Runtime's CPU provider, with `threads` intra-op threads."""
+
+    def __init__(self, path: str, threads: int = None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, tensor: np.ndarray) -> np.ndarray:
+        logits = self.session.run(None, {self.input_name: tensor})[0]
+        # sigmoid(x) > 0.5 is x > 0
+        return (logits[0, 0] > 0).astype(np.float32)
+
+
+def recorded_inputs(session: str, size=(256, 256), limit: int = CALIBRATION_FRAMES) -> list:
+    """Up to `limit` preprocessed model inputs spread evenly over a recorded session."""
+    preprocessor = PlannerPreprocessor(size)
+    inputs = []
+    with ReplaySource(session, realtime=False) as source:
+        stride = max(1, len(source) // limit)
+        for i in range(len(source)):
+            try:
+                frame = source.get("video")
+            except EOFError:
+                break
+            if i % stride == 0 and len(inputs) < limit:
+                inputs.append(preprocessor(frame.image).copy())
+    if not inputs:
+        raise ValueError(f"no video frames in {session}")
+    return inputs
+
+
+def export_torchscript(model, path: str, size=(256, 256)):
+    """Trace and freeze `model` (eval mode) to a TorchScript file."""
+    w, h = size
+    with torch.no_grad():
+        traced = torch.jit.freeze(torch.jit.trace(model, torch.zeros(1, 3, h, w)))
+    traced.save(path)
+
+
+def export_onnx(model, path: str, size=(256, 256)):
+    """Export `model` (on the CPU) to ONNX with one input "input" and one output "logits"."""
+    w, h = size
+    with torch.no_grad():
+        torch.onnx.export(model, (torch.zeros(1, 3, h, w),), path, input_names=["input"],
+                          output_names=["logits"], opset_version=ONNX_OPSET, dynamo=False)
+
+
+def quantize_dynamic(source: str, path: str):
+    """Int8 weights, activations quantized on the fly per inference (ConvInteger)."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic as quantize
+
+    # ONNX Runtime's CPU ConvInteger only takes unsigned weights
+    quantize(source, path, weight_type=QuantType.QUInt8)
+
+
+def quantize_static(source: str, path: str, inputs):
+    """Int8 weights and activations, with activation ranges calibrated on `inputs` (QDQ format)."""
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                          quantize_static as quantize)
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self._inputs = iter(inputs)
+
+        def get_next(self):
+            tensor = next(self._inputs, None)
+            return None if tensor is None else {"input": tensor}
+
+    quantize(source, path, Reader(), quant_format=QuantFormat.QDQ, per_channel=True,
+             activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+
+
+def _artifact(weights: str, cache_dir: str, suffix: str) -> str:
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    return os.path.join(cache_dir, f"{stem}.{suffix}")
+
+
+def _needs_build(path: str, weights: str) -> bool:
+    return not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(weights)
+
+
+def load_backend(name: str = "torch", weights: str = "unet_resnet34Final.pth", device: str = "cpu",
+                 threads: int = None, size=(256, 256), cache_dir: str = "models", calibration: str = None):
+    """The planner model as backend `name`, a callable from model input to mask.
+
+    Exported models (TorchScript, ONNX, int8 ONNX) are cached in `cache_dir`
+    next to each other and rebuilt when the weights file is newer. int8-static
+    calibrates its activation ranges on frames of the recorded session
+    `calibration`, needed only when the model is (re)built. ONNX backends
+    always run on the CPU; `threads` sets torch's or ONNX Runtime's intra-op
+    thread count.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"unknown backend '{name}' (choose from {', '.join(BACKENDS)})")
+    if name in ("torch", "torchscript") and threads:
+        torch.set_num_threads(threads)
+    if name == "torch":
+        return TorchBackend(load_unet(weights, device), device)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    if name == "torchscript":
+        path = _artifact(weights, cache_dir, "ts")
+        if _needs_build(path, weights):
+            export_torchscript(load_unet(weights), path, size)
+            print(f"[Backend] Exported TorchScript model to {path}")
+        return TorchBackend(torch.jit.load(path, map_location=device), device)
+
+    onnx_path = _artifact(weights, cache_dir, "onnx")
+    if _needs_build(onnx_path, weights):
+        export_onnx(load_unet(weights), onnx_path, size)
+        print(f"[Backend] Exported ONNX model to {onnx_path}")
+    path = onnx_path
+    if name == "int8-dynamic":
+        path = _artifact(weights, cache_dir, "int8-dynamic.onnx")
+        if _needs_build(path, onnx_path):
+            quantize_dynamic(onnx_path, path)
+            print(f"[Backend] Quantized (dynamic int8) model to {path}")
+    elif name == "int8-static":
+        path = _artifact(weights, cache_dir, "int8-static.onnx")
+        if _needs_build(path, onnx_path):
+            if calibration is None:
+                raise ValueError("int8-static needs a recorded session to calibrate on (--calibration)")
+            quantize_static(onnx_path, path, recorded_inputs(calibration, size))
+            print(f"[Backend] Quantized (static int8, calibrated on {calibration}) model to {path}")
+    return OnnxBackend(path, threads)
+
+
+def add_backend_args(parser):
+    """Add --backend / --model-threads / --model-cache / --calibration to the planner's parser."""
+    group = parser.add_argument_group("model backend")
+    group.add_argument("--backend", choices=BACKENDS, default="torch",
+                       help="run the UNet as eager PyTorch, TorchScript, ONNX Runtime, or int8-quantized "
+                            "ONNX Runtime (dynamic, or static calibrated on --calibration); ONNX runs on the CPU")
+    group.add_argument("--model-threads", type=int, default=None, metavar="N",
+                       help="intra-op threads of the backend (default: the runtime's)")
+    group.add_argument("--model-cache", default="models", metavar="DIR",
+                       help="where exported and quantized models are kept")
+    group.add_argument("--calibration", metavar="SESSION",
+                       help="recorded session to calibrate int8-static on (when it is first built)")
+    return parser
@@ -0,0 +1,196 @@
+import cv2
+import numpy as np
+
+# OAK-D right mono camera at 720P, used when no device calibration is
+# available (e.g. replaying a recording)
+DEFAULT_FOCAL_PX = 882.0
+DEFAULT_BASELINE_M = 0.075
+
+
+class OccupancyGrid:
+    """Top-down obstacle grid in the robot frame, built from raw disparity.
+
+    The grid covers `width_m` left-right (centered on the camera) by
+    `depth_m` forward in `cell_m` cells; rows are forward distance, columns
+    lateral position. For every (subsampled) disparity pixel the ray through
+    it - already rotated by the camera pitch - is computed once and cached,
+    so each update is one vectorized pass: disparity -> depth via a lookup
+    table, depth * ray -> lateral / forward / height, keep points between
+    `min_height_m` and `max_height_m` above the ground, and bincount them
+    into cells. A cell counts as hit with at least `min_points` points.
+
+    Cells keep a score in [0, 1] that moves towards 1 when hit and decays
+    towards 0 otherwise (`decay` per update), so one noisy frame neither
+    creates nor clears an obstacle. Cells scoring above `threshold` are
+    occupied. Corridor queries run on a summed-area table of the occupied
+    cells, so each query is a handful of lookups.
+    """
+
+    def __init__(self, focal_px: float = DEFAULT_FOCAL_PX, baseline_m: float = DEFAULT_BASELINE_M,
+                 principal=None, camera_height_m: float = 0.6, pitch_deg: float = 0.0,
+                 width_m: float = 4.0, depth_m: float = 6.0, cell_m: float = 0.1,
+                 min_height_m: float = 0.15, max_height_m: float = 1.8, step: int = 2,
+                 min_points: int = 3, decay: float = 0.7, threshold: float = 0.5,
+                 max_disparity: int = 95, subpixel_bits: int = 3):
+        self.camera_height_m = camera_height_m
+        self.pitch = np.deg2rad(pitch_deg)
+        self.width_m = width_m
+        self.depth_m = depth_m
+        self.cell_m = cell_m
+        self.min_height_m = min_height_m
+        self.max_height_m = max_height_m
+        self.step = step
+        self.min_points = min_points
+        self.decay = decay
+        self.threshold = threshold
+
+        self.cols = int(round(width_m / cell_m))
+        self.rows = int(round(depth_m / cell_m))
+        self.score = np.zeros((self.rows, self.cols), np.float32)
+        self.occupied = np.zeros((self.rows, self.cols), bool)
+        self._integral = np.zeros((self.rows + 1, self.cols + 1), np.int32)
+        self._hit = np.empty((self.rows, self.cols), np.float32)
+        self.updates = 0
+
+        self.max_disparity = max_disparity
+        self.subpixel_bits = subpixel_bits
+        self.calibrate(focal_px, baseline_m, principal)
+
+    def calibrate(self, focal_px: float, baseline_m: float, principal=None):
+        """(Re)build the disparity -> depth table; rays are recomputed on the next update."""
+        self.focal_px = focal_px
+        self.baseline_m = baseline_m
+        self.principal = principal
+        # Subpixel disparity -> depth along the optical axis, one entry per raw value
+        raw = np.arange((self.max_disparity << self.subpixel_bits) + 1, dtype=np.float32)
+        with np.errstate(divide="ignore"):
+            self.depth_lut = (focal_px * baseline_m * (1 << self.subpixel_bits)) / raw
+        self.depth_lut[0] = 0.0
+        self._rays_shape = None
+
+    def calibrate_from_source(self, source):
+        """Use the camera's stored 720P right-mono calibration if `source` is a live camera."""
+        device = getattr(source, "device", None) or getattr(getattr(source, "source", None), "device", None)
+        if device is None:
+            print(f"[Grid] no camera calibration, using focal {self.focal_px:.1f} px, "
+                  f"baseline {100 * self.baseline_m:.1f} cm")
+            return
+        import depthai as dai
+        calib = device.readCalibration()
+        intrinsics = calib.getCameraIntrinsics(dai.CameraBoardSocket.CAM_C, 1280, 720)
+        baseline = calib.getBaselineDistance() / 100.0  # cm -> m
+        self.calibrate(intrinsics[0][0], baseline, (intrinsics[0][2], intrinsics[1][2]))
+        print(f"[Grid] focal {intrinsics[0][0]:.1f} px, baseline {100 * baseline:.1f} cm")
+
+    def _cache_rays(self, shape):
+        """Per-pixel ray coefficients for the subsampled disparity grid."""
+        h, w = shape
+        cx, cy = self.principal if self.principal is not None else ((w - 1) / 2, (h - 1) / 2)
+        v, u = np.mgrid[0:h:self.step, 0:w:self.step].astype(np.float32)
+        rx = (u - cx) / self.focal_px
+        ry = (v - cy) / self.focal_px
+        c, s = np.cos(self.pitch), np.sin(self.pitch)
+        # Camera pitched down by `pitch`: lateral, down and forward per meter of depth
+        self._kx = rx
+        self._ky = (ry * c + s).astype(np.float32)
+        self._kz = (c - ry * s).astype(np.float32)
+        self._v = v[:, 0].astype(int)
+        self._u = u[0].astype(int)
+        self._rays_shape = shape
+
+    def update(self, disparity: np.ndarray, ignore=None):
+        """Fold one raw disparity frame into the grid.
+
+        `ignore` is an optional (x, y, w, h) rectangle in disparity pixels
+        (e.g. the person being followed) whose points are left out.
+        """
+        if disparity.shape != self._rays_shape:
+            self._cache_rays(disparity.shape)
+        z = np.take(self.depth_lut, disparity[::self.step, ::self.step], mode="clip")
+        if ignore is not None:
+            x, y, w, h = ignore
+            rows = (self._v >= y) & (self._v < y + h)
+            cols = (self._u >= x) & (self._u < x + w)
+            z[np.ix_(rows, cols)] = 0.0
+
+        lateral = self._kx * z
+        forward = self._kz * z
+        height = self.camera_height_m - self._ky * z
+        keep = ((z > 0) & (height >= self.min_height_m) & (height <= self.max_height_m)
+                & (forward > 0) & (forward < self.depth_m)
+                & (np.abs(lateral) < 0.5 * self.width_m))
+
+        col = ((lateral[keep] + 0.5 * self.width_m) / self.cell_m).astype(np.intp)
+        row = (forward[keep] / self.cell_m).astype(np.intp)
+        np.clip(col, 0, self.cols - 1, out=col)
+        np.clip(row, 0, self.rows - 1, out=row)
+        counts = np.bincount(row * self.cols + col, minlength=self.rows * self.cols)
+
+        # score <- decay * score + (1 - decay) * hit
+        np.greater_equal(counts.reshape(self.rows, self.cols), self.min_points, out=self._hit, casting="unsafe")
+        self.score *= self.decay
+        self._hit *= 1.0 - self.decay
+        self.score += self._hit
+        np.greater(self.score, self.threshold, out=self.occupied)
+        cv2.integral(self.occupied.view(np.uint8), self._integral, cv2.CV_32S)
+        self.updates += 1
+
+    def _cells(self, offset_m: float, width_m: float, start_m: float, length_m: float):
+        c1 = int(np.floor((offset_m - 0.5 * width_m + 0.5 * self.width_m) / self.cell_m))
+        c2 = int(np.ceil((offset_m + 0.5 * width_m + 0.5 * self.width_m) / self.cell_m))
+        r1 = int(np.floor(start_m / self.cell_m))
+        r2 = int(np.ceil((start_m + length_m) / self.cell_m))
+        return (max(0, r1), min(self.rows, r2), max(0, c1), min(self.cols, c2))
+
+    def occupied_cells(self, offset_m: float, width_m: float, length_m: float, start_m: float = 0.0) -> int:
+        """Occupied cells in the corridor `width_m` wide, centered `offset_m` to the right."""
+        r1, r2, c1, c2 = self._cells(offset_m, width_m, start_m, length_m)
+        if r2 <= r1 or c2 <= c1:
+            return 0
+        t = self._integral
+        return int(t[r2, c2] - t[r1, c2] - t[r2, c1] + t[r1, c1])
+
+    def corridor_free(self, width_m: float, length_m: float, offset_m: float = 0.0) -> bool:
+        """True if nothing occupies the corridor ahead."""
+        return self.occupied_cells(offset_m, width_m, length_m) == 0
+
+    def free_distance(self, width_m: float, offset_m: float = 0.0) -> float:
+        """Distance ahead to the first occupied cell in the corridor (grid depth if clear)."""
+        r1, r2, c1, c2 = self._cells(offset_m, width_m, 0.0, self.depth_m)
+        if c2 <= c1:
+            return self.depth_m
+        # Occupied cells per row inside the corridor, from the cumulative table
+        t = self._integral
+        per_row = np.diff(t[:, c2] - t[:, c1])
+        hits = np.flatnonzero(per_row)
+        return float(hits[0] * self.cell_m) if hits.size else self.depth_m
+
+    def render(self, cell_px: int = 3, score: np.ndarray = None) -> np.ndarray:
+        """Small BGR top-down view (forward = up) for the display, of `score` (a copy of
+        the grid's scores) if given."""
+        score = self.score if score is None else score
+        view = (255 - 255 * np.clip(score, 0, 1)).astype(np.uint8)[::-1]
+        view = cv2.resize(view, (self.cols * cell_px, self.rows * cell_px), interpolation=cv2.INTER_NEAREST)
+        view = cv2.cvtColor(view, cv2.COLOR_GRAY2BGR)
+        cv2.circle(view, (view.shape[1] // 2, view.shape[0] - 1), 4, (0, 0, 255), cv2.FILLED)
+        return view
+
+    def report(self):
+        print(f"[Grid] updates {self.updates} | occupied cells {int(self.occupied.sum())} "
+              f"| free ahead {self.free_distance(0.7):.1f} m")
+
+
+def add_grid_args(parser):
+    """Add the --obstacles options to a follower's argument parser."""
+    group = parser.add_argument_group("obstacle grid")
+    group.add_argument("--obstacles", action="store_true",
+                       help="build an occupancy grid from 720P stereo and stop for obstacles ahead")
+    group.add_argument("--camera-height", type=float, default=0.6, metavar="M",
+                       help="camera height above the ground in meters")
+    group.add_argument("--camera-pitch", type=float, default=0.0, metavar="DEG",
+                       help="camera tilt below horizontal in degrees")
+    group.add_argument("--grid-focal", type=float, default=DEFAULT_FOCAL_PX, metavar="PX",
+                       help="720P mono focal length for replays (read from the camera when live)")
+    group.add_argument("--grid-baseline", type=float, default=DEFAULT_BASELINE_M, metavar="M",
+                       help="stereo baseline in meters for replays (read from the camera when live)")
+    return parser
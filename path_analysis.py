@@ -0,0 +1,123 @@
+import math
+from typing import NamedTuple
+
+import numpy as np
+
+
+class PathGeometry(NamedTuple):
+    """Shape of the drivable path in the lower part of a segmentation mask.
+
+    Pixel coordinates are in mask space with y relative to the top of the
+    analyzed region. Offsets are normalized to [-1, 1] (negative = left).
+    """
+    pixels: int                 # path pixels in the region
+    centroid: tuple             # (x, y) mean path pixel, or None
+    offset: float               # centroid x - image center, in pixels
+    centerline: np.ndarray      # mean path x per row (NaN where empty)
+    widths: np.ndarray          # path pixels per row
+    width: float                # median width over rows that see the path
+    heading: float              # degrees, positive = path bends right ahead
+    lookahead: dict             # horizon fraction -> normalized offset (NaN if unseen)
+
+
+class PathAnalyzer:
+    """Vectorized path geometry from a segmentation mask.
+
+    One thresholding pass into a reused buffer, then row sums and a single
+    matrix-vector product give every per-row statistic; no coordinate lists
+    are built. `roi_start` is the fraction of the mask height where the
+    analyzed region begins (0.5 = bottom half, as in the original planner),
+    `horizons` are lookahead distances as fractions of that region measured
+    up from the bottom edge.
+    """
+
+    def __init__(self, threshold: float = 0.5, roi_start: float = 0.5,
+                 horizons=(0.25, 0.5, 0.75), tolerance: float = 30):
+        self.threshold = threshold
+        self.roi_start = roi_start
+        self.horizons = tuple(horizons)
+        self.tolerance = tolerance  # pixels left/right of center is still "straight"
+        self._shape = None
+
+    def _allocate(self, shape):
+        h, w = shape
+        top = int(h * self.roi_start)
+        self._shape = shape
+        self._top = top
+        self._binary = np.empty((h - top, w), np.float32)
+        self._xs = np.arange(w, dtype=np.float32)
+        self._ys = np.arange(h - top, dtype=np.float64)
+        band = max(1, (h - top) // 32)
+        self._bands = {}
+        for horizon in self.horizons:
+            row = int(round((1.0 - horizon) * (h - top - 1)))
+            self._bands[horizon] = slice(max(0, row - band), row + band + 1)
+
+    def analyze(self, mask: np.ndarray) -> PathGeometry:
+        if mask.shape != self._shape:
+            self._allocate(mask.shape)
+        w = mask.shape[1]
+        center_x = w / 2
+
+        binary = self._binary
+        np.greater(mask[self._top:], self.threshold, out=binary, casting="unsafe")
+        widths = binary.sum(axis=1)
+        row_x = binary @ self._xs       # sum of path x per row
+
+        pixels = int(widths.sum(dtype=np.float64))
+        if pixels == 0:
+            nan = float("nan")
+            return PathGeometry(0, None, nan, np.full(len(widths), np.nan), widths, 0.0, nan,
+                                {horizon: nan for horizon in self.horizons})
+
+        cx = float(row_x.sum(dtype=np.float64)) / pixels
+        cy = float(widths @ self._ys) / pixels
+
+        seen = widths > 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            centerline = row_x / widths
+
+        # Weighted least-squares fit x = slope * y + b over rows that see the path
+        heading = 0.0
+        if np.count_nonzero(seen) > 1:
+            weights = widths[seen]
+            ys = self._ys[seen]
+            xs = centerline[seen]
+            y_mean = float(weights @ ys) / pixels
+            x_mean = float(weights @ xs) / pixels
+            var = float(weights @ (ys - y_mean) ** 2)
+            if var > 0:
+                slope = float(weights @ ((ys - y_mean) * (xs - x_mean))) / var
+                # y grows downward, so moving ahead is -y
+                heading = math.degrees(math.atan(-slope))
+
+        lookahead = {}
+        for horizon, band in self._bands.items():
+            count = widths[band].sum()
+            lookahead[horizon] = ((row_x[band].sum() / count - center_x) / center_x
+                                  if count else float("nan"))
+
+        return PathGeometry(pixels, (cx, cy), cx - center_x, centerline, widths,
+                            float(np.median(widths[seen])), heading, lookahead)
+
+    def command(self, geometry: PathGeometry) -> str:
+        """Returns 'w', 'a', 'd', or 'x' based on the path centroid."""
+        if geometry.pixels == 0:
+            return "x"  # No path visible → stop
+        if abs(geometry.offset) < self.tolerance:
+            return "w"
+        elif geometry.offset < 0:
+            return "a"
+        else:
+            return "d"
+
+    def twist(self, geometry: PathGeometry, linear: float = 0.5, max_angular: float = 0.5) -> tuple:
+        """(linear m/s, angular rad/s) steering toward the path centroid, for the framed protocol.
+
+        Angular velocity grows with the centroid offset (positive = left), and
+        the robot slows to half speed as the path runs off to the image edge.
+        """
+        if geometry.pixels == 0:
+            return 0.0, 0.0
+        offset = min(1.0, max(-1.0, geometry.offset / (self._shape[1] / 2)))
+        return linear * (1.0 - 0.5 * abs(offset)), -max_angular * offset
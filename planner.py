@@ -1,35 +1,46 @@
+import argparse
+import time
+from collections import deque
 import cv2
 import torch
 import numpy as np
-import socket
-from torchvision import transforms
 import depthai as dai
-import segmentation_models_pytorch as smp
-from PIL import Image
+from blackbox import add_blackbox_args, open_blackbox
+from command_link import add_link_args, open_link
+from display import add_display_args, open_display
+from frame_context import FrameContext
+from frame_source import add_source_args, max_frame_age, open_frame_source
+from mask_propagation import MaskPropagator, add_mask_reuse_args
+from metrics import add_metrics_args, open_metrics
+from model_backends import add_backend_args, load_backend
+from path_analysis import PathAnalyzer
+from preprocess import PlannerPreprocessor
+from segmentation_server import SegmentationServer, add_segmentation_server_args
+from startup import Startup
 
 # TCP Settings
 ROBOT_IP = "100.87.161.11"
 PORT = 9999
 
-# Load UNet ResNet34 model
-model = smp.Unet(
-    encoder_name="resnet34",
-    encoder_weights=None,
-    in_channels=3,
-    classes=1,
-)
-model.load_state_dict(torch.load("unet_resnet34Final.pth", map_location=torch.device("cpu")))
+# Seconds without a fresh (within --max-frame-age) frame before stopping the robot
+STALE_TIMEOUT = 0.5
+
+# UNet ResNet34 weights; the model is loaded by load_model() (as the --backend chosen),
+# or only in the segmentation process with --segment-process
+MODEL_PATH = "unet_resnet34Final.pth"
+MODEL_SIZE = (256, 256)  # (width, height) of the model input and mask
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-model.to(device)
-model.eval()
+backend = None
+
+# Fused resize + CLAHE + sharpen + ResNet34 normalization at model resolution,
+# into a numpy buffer reused every frame
+preprocessor = PlannerPreprocessor(size=MODEL_SIZE)
 
-# Image transform (standard normalization for ResNet34)
-transform = transforms.Compose([
-    transforms.Resize((256, 256)),
-    transforms.ToTensor(),
-    transforms.Normalize(mean=[0.485, 0.456, 0.406],
-                         std=[0.229, 0.224, 0.225]),
-])
+# Shared derived views of the current frame; the model-size copy comes from here
+context = FrameContext()
+
+# Path geometry over the bottom half of the mask; steering uses the centroid
+path_analyzer = PathAnalyzer(roi_start=0.5, horizons=(0.25, 0.5, 0.75), tolerance=30)
 
 # DepthAI pipeline setup
 pipeline = dai.Pipeline()
@@ -41,97 +52,177 @@ xout = pipeline.createXLinkOut()
 xout.setStreamName("video")
 cam_rgb.preview.link(xout.input)
 
-def enhance_input_image(frame: np.ndarray) -> np.ndarray:
-    """Apply CLAHE and sharpening to enhance contrast and edges."""
-    lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
-    l, a, b = cv2.split(lab)
-
-    # Apply CLAHE to L-channel
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-    cl = clahe.apply(l)
-    enhanced_lab = cv2.merge((cl, a, b))
-    enhanced_bgr = cv2.cvtColor(enhanced_lab, cv2.COLOR_LAB2BGR)
-
-    # Apply sharpening kernel
-    sharpen_kernel = np.array([[0, -1, 0],
-                                [-1, 5, -1],
-                                [0, -1, 0]])
-    sharpened = cv2.filter2D(enhanced_bgr, -1, sharpen_kernel)
-
-    return sharpened
-
-def determine_command_from_mask(mask: np.ndarray) -> str:
-    """Returns 'w', 'a', 'd', or 'x' based on path position in the mask."""
-    h, w = mask.shape
-    roi = mask[h//2:, :]
-    coords = np.column_stack(np.where(roi > 0.5))
-    
-    if coords.size == 0:
-        return "x"  # No path visible → stop
-
-    avg_x = np.mean(coords[:, 1])
-    center_x = w / 2
-    offset = avg_x - center_x
-
-    # Define pixel thresholds to avoid noise
-    tolerance = 30  # pixels left/right of center is still "straight"
-    if abs(offset) < tolerance:
-        return "w"
-    elif offset < 0:
-        return "a"
-    else:
-        return "d"
-
-def send_command(sock: socket.socket, cmd: str):
-    """Send w/a/s/d/x command as a single character."""
-    try:
-        sock.sendall(cmd.encode())
-        print(f"[COMMAND] Sent: {cmd}")
-    except Exception as e:
-        print(f"[TCP ERROR] {e}")
+def backend_options(args=None) -> dict:
+    """load_backend() keyword arguments for the planner's model and the --backend options."""
+    options = {"weights": MODEL_PATH, "size": MODEL_SIZE}
+    if args is not None:
+        options.update(name=args.backend, threads=args.model_threads, cache_dir=args.model_cache,
+                       calibration=args.calibration)
+    return options
+
+def load_model(args=None):
+    """Load the UNet into this process (eager PyTorch unless `args` choose another backend)."""
+    global backend
+    backend = load_backend(device=str(device), **backend_options(args))
+
+def prepare(frame: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """Preprocess a BGR frame into the model input (the preprocessor's buffer, or `out`)."""
+    return preprocessor(context.reset(frame).resized(MODEL_SIZE), out=out)
+
+def segment(frame: np.ndarray) -> np.ndarray:
+    """Run the UNet on a BGR frame and return the binary path mask (256x256)."""
+    return backend(prepare(frame))
+
+def render_overlay(frame: np.ndarray, mask_np: np.ndarray) -> np.ndarray:
+    """Blend the path mask over the camera frame for display."""
+    color_mask = (mask_np * 255).astype(np.uint8)
+    # Upscale the single-channel mask before expanding it to BGR (same result, a third of the work)
+    color_mask = cv2.resize(color_mask, (frame.shape[1], frame.shape[0]))
+    color_mask = cv2.cvtColor(color_mask, cv2.COLOR_GRAY2BGR)
+    return cv2.addWeighted(frame, 0.7, color_mask, 0.3, 0)
 
 def main():
-    with dai.Device(pipeline) as dai_device, \
-         socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-
-        print(f"[Planner] Connecting to controller at {ROBOT_IP}:{PORT} ...")
-        s.connect((ROBOT_IP, PORT))
-        print("[Planner] Connected!")
-
-        video_queue = dai_device.getOutputQueue(name="video", maxSize=4, blocking=False)
-
-        while True:
-            in_frame = video_queue.get()
-            frame = in_frame.getCvFrame()
-
-            # --- Preprocess input to improve segmentation ---
-            enhanced_frame = enhance_input_image(frame)
-
-            # Convert to PIL Image and prepare input tensor
-            input_pil = Image.fromarray(cv2.cvtColor(enhanced_frame, cv2.COLOR_BGR2RGB))
-            input_tensor = transform(input_pil).unsqueeze(0).to(device)
-
-            with torch.no_grad():
-                output = model(input_tensor)
-                output = torch.sigmoid(output)
-                mask = (output > 0.5).float()
-                mask_np = mask.squeeze().cpu().numpy()
-
-            # Decide on command
-            command = determine_command_from_mask(mask_np)
-            send_command(s, command)
-
-            # Show overlay
-            color_mask = (mask_np * 255).astype(np.uint8)
-            color_mask = cv2.cvtColor(color_mask, cv2.COLOR_GRAY2BGR)
-            color_mask = cv2.resize(color_mask, (frame.shape[1], frame.shape[0]))
-            overlay = cv2.addWeighted(frame, 0.7, color_mask, 0.3, 0)
-            cv2.imshow("Segmented View", overlay)
-
-            if cv2.waitKey(1) == ord('q'):
-                break
-
-        cv2.destroyAllWindows()
+    parser = argparse.ArgumentParser(description="UNet path-following planner")
+    add_source_args(parser)
+    add_display_args(parser)
+    add_metrics_args(parser)
+    add_link_args(parser)
+    add_blackbox_args(parser)
+    add_mask_reuse_args(parser)
+    add_backend_args(parser)
+    add_segmentation_server_args(parser)
+    args = parser.parse_args()
+    display = open_display(args, "Segmented View")
+    metrics = open_metrics(args, prefix="planner")
+    max_age = max_frame_age(args)
+    stale = 0
+    latencies = deque(maxlen=1000)  # glass-to-command seconds of the latest frames
+    # With --mask-interval > 1 the UNet only runs on keyframes; its mask is carried along by optical flow
+    propagator = (MaskPropagator(context, args.mask_interval, args.scene_change)
+                  if args.mask_interval > 1 else None)
+
+    # Boot the camera while the model loads and warms up. Commands go out from a background
+    # thread, so a stalled controller connection never blocks start-up or inference
+    startup = Startup("Planner")
+    device_boot = startup.background("device", open_frame_source, args, lambda: pipeline)
+    link = open_link(args, ROBOT_IP, PORT, name="Planner")
+    print(f"[Planner] Connecting to controller at {link.host}:{link.port} ...")
+    startup.watch("controller", link.wait_connected)
+    # Last seconds of camera frames, saved on controller TCP errors, 'b' or SIGUSR1
+    blackbox = open_blackbox(args, (640, 480), link)
+
+    server = None
+    # Whatever ends the run - 'q', the end of a recording or an error - stop the robot and release
+    # the segmentation process and the shared-memory blocks (they outlive this process otherwise)
+    try:
+        # With --segment-process the UNet runs in its own process: frames go in and masks come
+        # back through shared memory, and the next frame is enhanced while the current one is
+        # segmented. Mask reuse needs each mask before the next frame, so it gets no overlap.
+        segment_frame = segment
+        if args.segment_process:
+            server = startup.step("model", SegmentationServer, load_backend, kwargs=backend_options(args),
+                                  device=str(device), size=MODEL_SIZE)
+            segment_frame = lambda frame: server.segment(lambda tensor: prepare(frame, tensor))
+        else:
+            startup.step("model", load_model, args)
+        startup.step("warm-up", segment_frame, np.zeros((480, 640, 3), np.uint8))
+        pipelined = server is not None and propagator is None
+        in_flight = deque()  # frames submitted to the server, oldest first
+
+        with device_boot.result() as source:
+            startup.report()
+            if metrics is not None:
+                metrics.collect("link", link.stats)
+                metrics.gauge("frames_stale", lambda: stale, "Frames skipped for exceeding the age budget")
+                if propagator is not None:
+                    metrics.gauge("mask_keyframes", lambda: propagator.keyframes, "Frames segmented by the UNet")
+                    metrics.gauge("mask_frames", lambda: propagator.frames, "Frames given a mask")
+
+            last_fresh = time.monotonic()
+            try:
+                while True:
+                    t0 = time.perf_counter()
+                    try:
+                        captured = source.get("video")
+                    except EOFError:
+                        break  # End of a replayed recording
+                    if blackbox is not None:
+                        blackbox.record(captured.image, captured.timestamp)
+                    t1 = time.perf_counter()
+
+                    # Skip frames already too old to act on; stop if nothing fresh comes in
+                    if max_age is not None and time.monotonic() - captured.timestamp > max_age:
+                        stale += 1
+                        if time.monotonic() - last_fresh > STALE_TIMEOUT:
+                            link.send('x')
+                        continue
+                    frame = captured.image
+
+                    # --- Preprocess + segment the drivable path (or propagate the last mask) ---
+                    if pipelined:
+                        # Enhance this frame while the worker still runs the previous one, then act
+                        # on the oldest frame in flight
+                        server.submit(lambda tensor: prepare(frame, tensor))
+                        in_flight.append(captured)
+                        if len(in_flight) < server.slots:
+                            continue
+                        captured = in_flight.popleft()
+                        frame = captured.image
+                        mask_np = server.result()
+                    elif propagator is not None:
+                        mask_np = propagator(frame, segment_frame)
+                    else:
+                        mask_np = segment_frame(frame)
+                    t2 = time.perf_counter()
+
+                    # Decide on command
+                    geometry = path_analyzer.analyze(mask_np)
+                    command = path_analyzer.command(geometry)
+                    t3 = time.perf_counter()
+                    # The framed protocol also carries a continuous twist steering toward the path
+                    link.send(command, path_analyzer.twist(geometry))
+                    t4 = time.perf_counter()
+                    last_fresh = time.monotonic()
+                    latencies.append(last_fresh - captured.timestamp)
+                    if metrics is not None:
+                        for stage, start, end in (("capture", t0, t1), ("segment", t1, t2),
+                                                  ("decide", t2, t3), ("send", t3, t4)):
+                            metrics.observe(stage, end - start)
+                        metrics.observe("glass_to_command", latencies[-1])
+
+                    # Show overlay, only as often as the display wants it (never when headless)
+                    if display.due():
+                        key = display.show(render_overlay(frame, mask_np))
+                        if metrics is not None:
+                            metrics.observe("display", time.perf_counter() - t4)
+                        if key == ord('q'):
+                            break
+                        if key == ord('b') and blackbox is not None:
+                            blackbox.trigger("manual")
+            except KeyboardInterrupt:
+                pass
+
+            if latencies:
+                ms = 1000.0 * np.asarray(latencies)
+                print(f"[Planner] glass-to-command {ms.mean():.1f} ms avg, p95 {np.percentile(ms, 95):.1f} ms "
+                      f"(last {len(ms)} frames) | stale frames skipped {stale}")
+            if propagator is not None:
+                propagator.report()
+            if server is not None:
+                server.report()
+            link.report()
+            if blackbox is not None:
+                blackbox.report()
+            display.report()
+    finally:
+        if server is not None:
+            server.close()
+        link.close('x')
+        if blackbox is not None:
+            blackbox.close()
+        display.close()
+        if metrics is not None:
+            metrics.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
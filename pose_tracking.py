@@ -0,0 +1,140 @@
+import cv2
+import numpy as np
+
+
+class TrackedPoseDetector:
+    """Detect-then-track wrapper around cvzone's PoseDetector.
+
+    Full MediaPipe pose detection only runs every `interval` frames. In
+    between, corners inside the last person bbox are followed with pyramidal
+    Lucas-Kanade optical flow on the FrameContext's downscaled grayscale
+    view, and the bbox and landmarks are moved/scaled with them. A
+    forward-backward check gives a tracking confidence; when it drops below
+    `min_confidence` (or too few points survive) the frame falls back to
+    full detection.
+
+    findPose()/findPosition() keep cvzone's signatures, so the followers can
+    swap it in without touching their decision logic.
+    """
+
+    def __init__(self, detector, context, interval: int = 5, min_confidence: float = 0.6,
+                 scale: float = 0.5, max_points: int = 60, min_points: int = 8, draw: bool = True):
+        self.detector = detector
+        self.context = context
+        self.interval = max(1, interval)
+        self.min_confidence = min_confidence
+        self.scale = scale
+        self.max_points = max_points
+        self.min_points = min_points
+        self.draw = draw
+
+        self.lmList = []
+        self.bboxInfo = {}
+        self.confidence = 0.0
+        self.detections = 0
+        self.tracked = 0
+
+        self._gray = None
+        self._prev_gray = None
+        self._points = None     # tracked corners in downscaled coordinates
+        self._since_detection = 0
+        self._tracking = False
+        self._bbox = None       # float (x, y, w, h) of the tracked person
+        self._landmarks = None  # float (n, 3) landmarks
+
+    def _start_tracking(self, bboxInfo):
+        self._points = None
+        if not bboxInfo or 'bbox' not in bboxInfo:
+            return
+        x, y, w, h = (int(v * self.scale) for v in bboxInfo['bbox'])
+        gh, gw = self._gray.shape
+        x1, y1 = max(0, x), max(0, y)
+        x2, y2 = min(gw, x + w), min(gh, y + h)
+        if x2 <= x1 or y2 <= y1:
+            return
+        mask = np.zeros_like(self._gray)
+        mask[y1:y2, x1:x2] = 255
+        self._points = cv2.goodFeaturesToTrack(self._gray, self.max_points, 0.01, 5, mask=mask)
+
+    def _track(self) -> bool:
+        """Move the last bbox/landmarks with optical flow; False if tracking is lost."""
+        if self._points is None or len(self._points) < self.min_points or self._bbox is None:
+            return False
+        p0 = self._points
+        p1, st, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, self._gray, p0, None,
+                                             winSize=(15, 15), maxLevel=2)
+        p0r, st_back, _ = cv2.calcOpticalFlowPyrLK(self._gray, self._prev_gray, p1, None,
+                                                   winSize=(15, 15), maxLevel=2)
+        fb_error = np.abs(p0 - p0r).reshape(-1, 2).max(axis=1)
+        good = (st.ravel() == 1) & (st_back.ravel() == 1) & (fb_error < 1.0)
+        self.confidence = float(good.mean())
+        if self.confidence < self.min_confidence or good.sum() < self.min_points:
+            return False
+
+        old = p0.reshape(-1, 2)[good]
+        new = p1.reshape(-1, 2)[good]
+        c_old, c_new = old.mean(axis=0), new.mean(axis=0)
+        d_old = np.linalg.norm(old - c_old, axis=1)
+        d_new = np.linalg.norm(new - c_new, axis=1)
+        valid = d_old > 1e-3
+        s = float(np.median(d_new[valid] / d_old[valid])) if valid.any() else 1.0
+
+        # Similarity transform p' = c_new + s * (p - c_old), back in full-res pixels
+        c_old, c_new = c_old / self.scale, c_new / self.scale
+
+        def move(px, py):
+            return c_new[0] + s * (px - c_old[0]), c_new[1] + s * (py - c_old[1])
+
+        # Float state is kept between frames so rounding never accumulates
+        x, y, w, h = self._bbox
+        x, y = move(x, y)
+        self._bbox = (x, y, w * s, h * s)
+        self._landmarks[:, 0], self._landmarks[:, 1] = move(self._landmarks[:, 0], self._landmarks[:, 1])
+
+        bbox = tuple(int(round(v)) for v in self._bbox)
+        self.bboxInfo = {"bbox": bbox, "center": (bbox[0] + bbox[2] // 2, bbox[1] + bbox[3] // 2)}
+        self.lmList = [[int(round(lx)), int(round(ly)), int(lz)] for lx, ly, lz in self._landmarks]
+        self._points = new.reshape(-1, 1, 2)
+        return True
+
+    def findPose(self, img, draw=True):
+        # Copy: the context reuses its buffers on the next frame
+        self._prev_gray, self._gray = self._gray, self.context.gray(self.scale).copy()
+        self._since_detection += 1
+        if (self._prev_gray is not None and self._since_detection < self.interval
+                and self._track()):
+            self._tracking = True
+            self.tracked += 1
+            return img
+        self._tracking = False
+        return self.detector.findPose(img, draw and self.draw)
+
+    def findPosition(self, img, draw=True, bboxWithHands=False):
+        if self._tracking:
+            if draw and self.draw and self.bboxInfo:
+                cv2.rectangle(img, self.bboxInfo['bbox'], (255, 0, 255), 3)
+                cv2.circle(img, self.bboxInfo['center'], 5, (255, 0, 0), cv2.FILLED)
+            return self.lmList, self.bboxInfo
+
+        lmList, bboxInfo = self.detector.findPosition(img, draw and self.draw, bboxWithHands)
+        self.lmList, self.bboxInfo = list(lmList), dict(bboxInfo)
+        self._landmarks = np.array(lmList, np.float64).reshape(-1, 3)
+        self._bbox = tuple(float(v) for v in bboxInfo['bbox']) if 'bbox' in bboxInfo else None
+        self.detections += 1
+        self._since_detection = 0
+        self._start_tracking(bboxInfo)
+        return lmList, bboxInfo
+
+    def report(self):
+        total = self.detections + self.tracked
+        share = 100.0 * self.tracked / total if total else 0.0
+        print(f"[Tracker] detections {self.detections} | tracked {self.tracked} ({share:.0f}%) "
+              f"| confidence {self.confidence:.2f}")
+
+
+def add_tracking_args(parser):
+    """Add the --track-interval option to a follower's argument parser."""
+    parser.add_argument("--track-interval", type=int, default=0, metavar="N",
+                        help="run full pose detection every N frames and track the bbox "
+                             "with optical flow in between (0 = detect every frame)")
+    return parser
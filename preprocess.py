@@ -0,0 +1,86 @@
+import cv2
+import numpy as np
+
+# Standard normalization for ResNet34 (RGB order)
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+SHARPEN_KERNEL = np.array([[0, -1, 0],
+                           [-1, 5, -1],
+                           [0, -1, 0]], dtype=np.float32)
+
+
+def enhance_input_image(frame: np.ndarray) -> np.ndarray:
+    """Apply CLAHE and sharpening to enhance contrast and edges."""
+    lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
+    l, a, b = cv2.split(lab)
+
+    # Apply CLAHE to L-channel
+    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    cl = clahe.apply(l)
+    enhanced_lab = cv2.merge((cl, a, b))
+    enhanced_bgr = cv2.cvtColor(enhanced_lab, cv2.COLOR_LAB2BGR)
+
+    # Apply sharpening kernel
+    sharpened = cv2.filter2D(enhanced_bgr, -1, SHARPEN_KERNEL)
+
+    return sharpened
+
+
+class PlannerPreprocessor:
+    """Fused resize -> CLAHE -> sharpen -> normalize at model resolution.
+
+    Does the same work as enhance_input_image() followed by the torchvision
+    Resize/ToTensor/Normalize transform, but shrinks the frame first so the
+    enhancement runs on 256x256 instead of the full preview, keeps one CLAHE
+    object, and writes every intermediate into buffers allocated once. The
+    result is a (1, 3, H, W) float32 NCHW array that is overwritten on every
+    call; wrap it once with torch.from_numpy() to feed the model. Pass
+    `out` to write the result into another array of that shape instead
+    (e.g. a SegmentationServer slot).
+    """
+
+    def __init__(self, size=(256, 256), clip_limit: float = 2.0, tile_grid_size=(8, 8)):
+        self.width, self.height = size
+        self.clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=tile_grid_size)
+
+        h, w = self.height, self.width
+        self._small = np.empty((h, w, 3), np.uint8)
+        self._lab = np.empty((h, w, 3), np.uint8)
+        self._l = np.empty((h, w), np.uint8)
+        self._l_eq = np.empty((h, w), np.uint8)
+        self._bgr = np.empty((h, w, 3), np.uint8)
+        self._sharp = np.empty((h, w, 3), np.uint8)
+        self._channel = np.empty((h, w), np.uint8)
+        self.tensor = np.empty((1, 3, h, w), np.float32)
+
+        # x / 255 then (x - mean) / std folded into one multiply-add per channel
+        self._scale = (1.0 / (255.0 * IMAGENET_STD)).astype(np.float32)
+        self._bias = (-IMAGENET_MEAN / IMAGENET_STD).astype(np.float32)
+
+    def enhance(self, frame: np.ndarray) -> np.ndarray:
+        """Downsize then enhance; returns the reused BGR buffer.
+
+        A frame already at model resolution (e.g. FrameContext.resized()) is
+        used as is.
+        """
+        small = frame
+        if frame.shape[:2] != (self.height, self.width):
+            small = cv2.resize(frame, (self.width, self.height), dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(small, cv2.COLOR_BGR2LAB, dst=self._lab)
+        cv2.extractChannel(self._lab, 0, dst=self._l)
+        self.clahe.apply(self._l, dst=self._l_eq)
+        cv2.insertChannel(self._l_eq, self._lab, 0)
+        cv2.cvtColor(self._lab, cv2.COLOR_LAB2BGR, dst=self._bgr)
+        cv2.filter2D(self._bgr, -1, SHARPEN_KERNEL, dst=self._sharp)
+        return self._sharp
+
+    def __call__(self, frame: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        sharp = self.enhance(frame)
+        tensor = self.tensor if out is None else out
+        # BGR -> RGB by reading the channels in reverse order
+        for c in range(3):
+            cv2.extractChannel(sharp, 2 - c, dst=self._channel)
+            np.multiply(self._channel, self._scale[c], out=tensor[0, c])
+            tensor[0, c] += self._bias[c]
+        return tensor
@@ -0,0 +1,147 @@
+import cv2
+import mediapipe as mp
+
+# Landmark pairs MediaPipe draws as the skeleton, by cvzone lmList index
+POSE_CONNECTIONS = tuple(mp.solutions.pose.POSE_CONNECTIONS)
+HAND_CONNECTIONS = tuple(mp.solutions.hands.HAND_CONNECTIONS)
+
+
+def hands_from_results(results, width: int, height: int, flipType: bool = True):
+    """cvzone-style hand dicts from MediaPipe hand results.
+
+    Landmarks are normalized, so `width`/`height` can be those of the full
+    frame even when the detector saw a downscaled copy.
+    """
+    allHands = []
+    if not results.multi_hand_landmarks:
+        return allHands
+    for handType, handLms in zip(results.multi_handedness, results.multi_hand_landmarks):
+        lmList = [[int(lm.x * width), int(lm.y * height), int(lm.z * width)] for lm in handLms.landmark]
+        xList = [p[0] for p in lmList]
+        yList = [p[1] for p in lmList]
+        xmin, xmax = min(xList), max(xList)
+        ymin, ymax = min(yList), max(yList)
+        bbox = xmin, ymin, xmax - xmin, ymax - ymin
+
+        label = handType.classification[0].label
+        if flipType:
+            label = "Left" if label == "Right" else "Right"
+        allHands.append({"lmList": lmList, "bbox": bbox,
+                         "center": (bbox[0] + bbox[2] // 2, bbox[1] + bbox[3] // 2), "type": label})
+    return allHands
+
+
+def draw_landmarks(img, lmList, connections):
+    """MediaPipe's default landmark drawing, from full-frame cvzone landmarks."""
+    points = [(int(p[0]), int(p[1])) for p in lmList]
+    for a, b in connections:
+        if a < len(points) and b < len(points):
+            cv2.line(img, points[a], points[b], (224, 224, 224), 2)
+    for point in points:
+        cv2.circle(img, point, 2, (0, 0, 255), 2)
+
+
+def draw_pose(img, lmList, bbox=None):
+    """The pose overlay cvzone draws in findPose()/findPosition(), from the packet's results.
+
+    Followers build their detectors with draw=False and call this from
+    draw(), so it only runs for the frames the display shows.
+    """
+    draw_landmarks(img, lmList, POSE_CONNECTIONS)
+    if bbox is not None:
+        x, y, w, h = bbox
+        cv2.rectangle(img, (x, y), (x + w, y + h), (255, 0, 255), 3)
+        cv2.circle(img, (x + w // 2, y + h // 2), 5, (255, 0, 0), cv2.FILLED)
+
+
+def draw_hands(img, hands):
+    """The hand overlay cvzone draws in findHands(), from cvzone hand dicts."""
+    for hand in hands:
+        draw_landmarks(img, hand["lmList"], HAND_CONNECTIONS)
+        x, y, w, h = hand["bbox"]
+        cv2.rectangle(img, (x - 20, y - 20), (x + w + 20, y + h + 20), (255, 0, 255), 2)
+        cv2.putText(img, hand["type"], (x - 30, y - 30), cv2.FONT_HERSHEY_PLAIN, 2, (255, 0, 255), 2)
+
+
+class ScaledPoseDetector:
+    """Runs cvzone's PoseDetector on the shared RGB view of each frame.
+
+    The RGB conversion (downscaled by `scale`, if below 1) comes from the
+    FrameContext, so it is shared with any other detector on the same frame.
+    MediaPipe landmarks are normalized to [0, 1], so findPosition() on the
+    full-resolution frame turns them straight into full-resolution pixels:
+    bboxes and thresholds tuned at 1280x720 keep working unchanged. With
+    `draw` False nothing is drawn, whatever the callers ask for.
+
+    This drives cvzone 1.x internals (`pose`, `results`, `mpDraw`), which
+    is why requirements.txt pins cvzone.
+    """
+
+    def __init__(self, detector, context, scale: float = 1.0, draw: bool = True):
+        self.detector = detector
+        self.context = context
+        self.scale = scale
+        self.draw = draw
+
+    @property
+    def results(self):
+        return self.detector.results
+
+    @property
+    def lmList(self):
+        return self.detector.lmList
+
+    def findPose(self, img, draw=True):
+        self.detector.results = self.detector.pose.process(self.context.rgb(self.scale))
+        if draw and self.draw and self.detector.results.pose_landmarks:
+            self.detector.mpDraw.draw_landmarks(img, self.detector.results.pose_landmarks,
+                                                self.detector.mpPose.POSE_CONNECTIONS)
+        return img
+
+    def findPosition(self, img, draw=True, bboxWithHands=False):
+        return self.detector.findPosition(img, draw and self.draw, bboxWithHands)
+
+
+class ScaledHandDetector:
+    """Runs cvzone's HandDetector on the shared RGB view of each frame.
+
+    Hand landmarks, bboxes and centers come back in full-resolution pixels
+    and are drawn on the full frame the same way cvzone draws them (unless
+    `draw` is False).
+    """
+
+    def __init__(self, detector, context, scale: float = 1.0, draw: bool = True):
+        self.detector = detector
+        self.context = context
+        self.scale = scale
+        self.draw = draw
+
+    @property
+    def results(self):
+        return self.detector.results
+
+    def findHands(self, img, draw=True, flipType=True):
+        results = self.detector.hands.process(self.context.rgb(self.scale))
+        self.detector.results = results
+        h, w = img.shape[:2]
+        hands = hands_from_results(results, w, h, flipType)
+
+        if draw and self.draw and hands:
+            for hand, handLms in zip(hands, results.multi_hand_landmarks):
+                x, y, bw, bh = hand["bbox"]
+                self.detector.mpDraw.draw_landmarks(img, handLms, self.detector.mpHands.HAND_CONNECTIONS)
+                cv2.rectangle(img, (x - 20, y - 20), (x + bw + 20, y + bh + 20), (255, 0, 255), 2)
+                cv2.putText(img, hand["type"], (x - 30, y - 30), cv2.FONT_HERSHEY_PLAIN,
+                            2, (255, 0, 255), 2)
+        return hands, img
+
+    def fingersUp(self, myHand):
+        return self.detector.fingersUp(myHand)
+
+
+def add_scale_args(parser):
+    """Add the --inference-scale option to a follower's argument parser."""
+    parser.add_argument("--inference-scale", type=float, default=1.0, metavar="S",
+                        help="run detectors on a copy downscaled by S (e.g. 0.5); "
+                             "results are mapped back to full-frame pixels")
+    return parser
@@ -0,0 +1,182 @@
+import multiprocessing as mp
+import time
+import traceback
+from collections import deque
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from model_backends import load_backend
+
+READY = b"ready"
+ERROR = b"error:"
+
+
+def _slot_views(buf, slots: int, input_shape, mask_shape):
+    """Per-slot (input, mask) float32 arrays laid out back to back in `buf`."""
+    input_size = int(np.prod(input_shape)) * 4
+    mask_size = int(np.prod(mask_shape)) * 4
+    inputs, masks = [], []
+    for slot in range(slots):
+        offset = slot * (input_size + mask_size)
+        inputs.append(np.ndarray(input_shape, np.float32, buf, offset))
+        masks.append(np.ndarray(mask_shape, np.float32, buf, offset + input_size))
+    return inputs, masks
+
+
+def _serve(loader, loader_args, loader_kwargs, device, shm_name, slots, input_shape, mask_shape, conn):
+    """Worker process: run the model on each slot index received, reply with the same index."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    inputs, masks = _slot_views(shm.buf, slots, input_shape, mask_shape)
+    try:
+        backend = loader(*loader_args, device=device, **loader_kwargs)
+        conn.send_bytes(READY)
+        while True:
+            message = conn.recv_bytes()
+            if not message:
+                break
+            slot = message[0]
+            np.copyto(masks[slot], backend(inputs[slot]))
+            conn.send_bytes(message)
+    except (EOFError, KeyboardInterrupt):
+        pass
+    except Exception:
+        conn.send_bytes(ERROR + traceback.format_exc().encode())
+    finally:
+        del inputs, masks
+        shm.close()
+
+
+class SegmentationServer:
+    """Segmentation model in a worker process, fed through shared memory.
+
+    The model runs in its own process, so it does not compete with
+    enhancement, display and socket I/O for the planner's GIL. Frames go in
+    and masks come back through `slots` preallocated (input tensor, mask)
+    pairs in one shared-memory block; only the one-byte slot index crosses
+    the pipe, nothing is pickled. With two slots (a double buffer) the
+    caller fills the next input while the worker runs the previous one:
+
+        server.submit(lambda tensor: preprocessor(frame, out=tensor))
+        mask = server.result()   # oldest submitted frame
+
+    submit() hands `prepare` the slot's (1, 3, H, W) float32 input array to
+    fill. result() blocks until the oldest submission is done and returns
+    its (H, W) 0/1 float32 mask, valid until the next submit(). `loader`
+    builds the backend in the worker (`loader(*args, device=device,
+    **kwargs)`, a callable from input array to mask such as
+    model_backends.load_backend() returns), so it must be a module-level
+    function.
+    """
+
+    def __init__(self, loader=load_backend, args=(), kwargs=None, device: str = "cpu", size=(256, 256),
+                 slots: int = 2):
+        w, h = size
+        self.slots = slots
+        self.input_shape = (1, 3, h, w)
+        self.mask_shape = (h, w)
+        self.frames = 0
+        self.wait = 0.0  # seconds result() spent blocked on the worker
+
+        slot_size = 4 * (int(np.prod(self.input_shape)) + int(np.prod(self.mask_shape)))
+        self._shm = shared_memory.SharedMemory(create=True, size=slots * slot_size)
+        self.inputs, self.masks = _slot_views(self._shm.buf, slots, self.input_shape, self.mask_shape)
+        self._free = deque(range(slots))
+        self._busy = deque()
+
+        # spawn: a forked child could not use CUDA once the parent has touched it
+        context = mp.get_context("spawn")
+        self._conn, child = context.Pipe()
+        self._process = context.Process(
+            target=_serve, name="segmentation-server", daemon=True,
+            args=(loader, tuple(args), dict(kwargs or {}), str(device), self._shm.name, slots,
+                  self.input_shape, self.mask_shape, child))
+        self._process.start()
+        child.close()  # so a dead worker shows up as EOFError here
+        try:
+            self._receive()
+        except Exception:
+            self.close()
+            raise
+        print(f"[SegServer] Worker {self._process.pid} ready ({slots} slots, {device})")
+
+    def _receive(self) -> bytes:
+        try:
+            message = self._conn.recv_bytes()
+        except EOFError:
+            raise RuntimeError(f"segmentation worker exited (code {self._process.exitcode})") from None
+        if message.startswith(ERROR):
+            raise RuntimeError("segmentation worker failed:\n" + message[len(ERROR):].decode())
+        return message
+
+    def submit(self, prepare) -> int:
+        """Fill a free slot with `prepare(input_array)` and queue it; returns the slot."""
+        if not self._free:
+            raise RuntimeError("all segmentation slots are busy; collect a result() first")
+        slot = self._free.popleft()
+        prepare(self.inputs[slot])
+        self._conn.send_bytes(bytes((slot,)))
+        self._busy.append(slot)
+        return slot
+
+    def result(self) -> np.ndarray:
+        """Mask of the oldest submitted frame, waiting for the worker if needed."""
+        slot = self._busy.popleft()
+        start = time.perf_counter()
+        message = self._receive()
+        self.wait += time.perf_counter() - start
+        if message[0] != slot:
+            raise RuntimeError(f"segmentation worker answered slot {message[0]}, expected {slot}")
+        self._free.append(slot)
+        self.frames += 1
+        return self.masks[slot]
+
+    @property
+    def pending(self) -> int:
+        return len(self._busy)
+
+    def segment(self, prepare) -> np.ndarray:
+        """submit() then wait for that frame's result(); no overlap."""
+        while self._busy:
+            self.result()
+        self.submit(prepare)
+        return self.result()
+
+    def report(self):
+        wait_ms = 1000.0 * self.wait / self.frames if self.frames else 0.0
+        print(f"[SegServer] frames {self.frames} | waited {wait_ms:.1f} ms/frame for masks")
+
+    def close(self):
+        if self._process.is_alive():
+            try:
+                self._conn.send_bytes(b"")
+            except OSError:
+                pass
+            self._process.join(timeout=2.0)
+            if self._process.is_alive():
+                self._process.terminate()
+                self._process.join()
+        self._conn.close()
+        # The views must go before the block can be unmapped; a mask the caller still
+        # holds keeps it mapped until exit, which is harmless once it is unlinked
+        self.inputs = self.masks = None
+        try:
+            self._shm.close()
+        except BufferError:
+            pass
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def add_segmentation_server_args(parser):
+    """Add --segment-process to the planner's argument parser."""
+    group = parser.add_argument_group("segmentation process")
+    group.add_argument("--segment-process", action="store_true",
+                       help="run the model in a separate process fed through shared memory, "
+                            "overlapping enhancement of the next frame with inference")
+    return parser
@@ -0,0 +1,105 @@
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from follower_runtime import FramePacket
+
+
+def process_age() -> float:
+    """Seconds since this process started (interpreter start-up plus imports so far), or NaN."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 (starttime, in clock ticks after boot) follows the parenthesized command name
+            started = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return float("nan")
+    return uptime - started / os.sysconf("SC_CLK_TCK")
+
+
+class Task(threading.Thread):
+    """A startup step running on its own thread; result() joins it and re-raises its error."""
+
+    def __init__(self, name: str, fn, args, kwargs):
+        super().__init__(name=f"startup-{name}", daemon=True)
+        self._call = (fn, args, kwargs)
+        self._result = None
+        self._error = None
+
+    def run(self):
+        fn, args, kwargs = self._call
+        try:
+            self._result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._error = e
+
+    def result(self):
+        self.join()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class Startup:
+    """Runs independent start-up steps side by side and reports where the time went.
+
+    step() times a step on the calling thread; background() runs one on its
+    own thread and returns a Task to collect it from later; watch() times a
+    step nobody waits for (e.g. the controller connection, which CommandLink
+    keeps retrying anyway). Camera boot, model or detector loading and the
+    controller connection mostly wait on USB, disk and the network, so they
+    overlap well despite the GIL. report() prints each step's span on a
+    shared timeline, how long the imports before it took, and how long the
+    same steps would have taken one after another.
+    """
+
+    def __init__(self, name: str = "Startup"):
+        self.name = name
+        self.imports = process_age()
+        self.started = time.perf_counter()
+        self.steps = {}  # name -> (start, end) seconds after `started`, end None while running
+        self._lock = threading.Lock()
+
+    def step(self, name: str, fn, *args, **kwargs):
+        start = time.perf_counter() - self.started
+        with self._lock:
+            self.steps[name] = (start, None)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.steps[name] = (start, time.perf_counter() - self.started)
+
+    def background(self, name: str, fn, *args, **kwargs) -> Task:
+        task = Task(name, self.step, (name, fn) + args, kwargs)
+        task.start()
+        return task
+
+    def watch(self, name: str, fn, *args, **kwargs):
+        self.background(name, fn, *args, **kwargs)
+
+    def report(self):
+        ready = time.perf_counter() - self.started
+        with self._lock:
+            steps = sorted(self.steps.items(), key=lambda item: item[1][0])
+        parts, serial = [], 0.0
+        for name, (start, end) in steps:
+            if end is None:
+                parts.append(f"{name} pending")
+            else:
+                parts.append(f"{name} {end - start:.2f} s (at {start:.2f})")
+                serial += end - start
+        imports = "" if math.isnan(self.imports) else f" after {self.imports:.2f} s of imports"
+        print(f"[{self.name}] Ready in {ready:.2f} s{imports} | " + " | ".join(parts)
+              + f" | {serial:.2f} s one after another")
+
+
+def warm_up(detect, size):
+    """Run `detect` once on a blank frame of `size` = (width, height), so the first real
+    frame does not pay for the detectors' lazy initialization."""
+    w, h = size
+    detect(FramePacket(-1, np.zeros((h, w, 3), np.uint8)))
@@ -0,0 +1,124 @@
+import numpy as np
+
+# OAK-D defaults for the 400P mono pair, used when no device calibration is
+# available (e.g. replaying a recording)
+DEFAULT_FOCAL_PX = 441.0
+DEFAULT_BASELINE_M = 0.075
+
+
+def add_stereo_depth(pipeline, stream: str = "disparity", output_size=(640, 360), mono_720p: bool = False):
+    """Add mono cameras + StereoDepth to `pipeline`, streaming disparity as `stream`.
+
+    Subpixel disparity (3 fractional bits) is aligned with the color preview
+    and scaled to `output_size`, so a pose bbox maps onto it by plain
+    rescaling. With `output_size` None it stays in the rectified right
+    camera's frame at mono resolution (400P, or 720P with `mono_720p`), which
+    is what a point-cloud reprojection wants.
+    """
+    import depthai as dai
+
+    resolution = (dai.MonoCameraProperties.SensorResolution.THE_720_P if mono_720p
+                  else dai.MonoCameraProperties.SensorResolution.THE_400_P)
+    monoLeft = pipeline.createMonoCamera()
+    monoLeft.setResolution(resolution)
+    monoLeft.setBoardSocket(dai.CameraBoardSocket.CAM_B)
+    monoRight = pipeline.createMonoCamera()
+    monoRight.setResolution(resolution)
+    monoRight.setBoardSocket(dai.CameraBoardSocket.CAM_C)
+
+    stereo = pipeline.createStereoDepth()
+    stereo.setLeftRightCheck(True)
+    stereo.setSubpixel(True)
+    stereo.initialConfig.setMedianFilter(dai.StereoDepthProperties.MedianFilter.KERNEL_7x7)
+    if output_size is not None:
+        stereo.setDepthAlign(dai.CameraBoardSocket.CAM_A)
+        stereo.setOutputSize(*output_size)
+    monoLeft.out.link(stereo.left)
+    monoRight.out.link(stereo.right)
+
+    xout = pipeline.createXLinkOut()
+    xout.setStreamName(stream)
+    stereo.disparity.link(xout.input)
+    return stereo
+
+
+class StereoDistance:
+    """Distance to a person from raw subpixel disparity inside the pose bbox.
+
+    Only the central part of the bbox (the torso, away from background at
+    the edges) is read, every `step`-th pixel in each direction. Invalid
+    pixels (0) are ignored, the lowest `trim` fraction of the disparities -
+    background seen past the person - is dropped, and the median of the rest
+    goes through a lookup table of depth = focal * baseline / disparity
+    built once for every raw disparity value. No full-frame conversion.
+    """
+
+    def __init__(self, focal_px: float = DEFAULT_FOCAL_PX, baseline_m: float = DEFAULT_BASELINE_M,
+                 max_disparity: int = 95, subpixel_bits: int = 3, step: int = 4,
+                 inner: float = 0.5, trim: float = 0.2, min_samples: int = 20):
+        self.subpixel_bits = subpixel_bits
+        self.max_disparity = max_disparity
+        self.step = step
+        self.inner = inner
+        self.trim = trim
+        self.min_samples = min_samples
+        self.calibrate(focal_px, baseline_m)
+
+    def calibrate(self, focal_px: float, baseline_m: float):
+        """(Re)build the disparity -> meters table."""
+        self.focal_px = focal_px
+        self.baseline_m = baseline_m
+        raw = np.arange((self.max_disparity << self.subpixel_bits) + 1, dtype=np.float32)
+        with np.errstate(divide="ignore"):
+            self.lut = (focal_px * baseline_m * (1 << self.subpixel_bits)) / raw
+        self.lut[0] = np.nan
+
+    def calibrate_from_source(self, source):
+        """Use the camera's stored calibration if `source` is (or records) a live camera."""
+        device = getattr(source, "device", None) or getattr(getattr(source, "source", None), "device", None)
+        if device is None:
+            print(f"[Stereo] no camera calibration, using focal {self.focal_px:.1f} px, "
+                  f"baseline {100 * self.baseline_m:.1f} cm")
+            return
+        import depthai as dai
+        calib = device.readCalibration()
+        focal = calib.getCameraIntrinsics(dai.CameraBoardSocket.CAM_C, 640, 400)[0][0]
+        baseline = calib.getBaselineDistance() / 100.0  # cm -> m
+        self.calibrate(focal, baseline)
+        print(f"[Stereo] focal {focal:.1f} px, baseline {100 * baseline:.1f} cm")
+
+    def measure(self, disparity: np.ndarray, bbox, frame_size):
+        """Distance in meters to the person in `bbox` (frame pixels), or None."""
+        fw, fh = frame_size
+        dh, dw = disparity.shape[:2]
+        x, y, w, h = bbox
+        mx, my = 0.5 * (1 - self.inner) * w, 0.5 * (1 - self.inner) * h
+        x1 = max(0, int((x + mx) * dw / fw))
+        x2 = min(dw, int((x + w - mx) * dw / fw))
+        y1 = max(0, int((y + my) * dh / fh))
+        y2 = min(dh, int((y + h - my) * dh / fh))
+        if x2 <= x1 or y2 <= y1:
+            return None
+
+        roi = disparity[y1:y2:self.step, x1:x2:self.step]
+        values = roi[roi > 0]
+        if values.size < self.min_samples:
+            return None
+        # Median of what is left after dropping the lowest k: one selection
+        k = int(self.trim * values.size)
+        i = k + (values.size - k) // 2
+        d = int(np.partition(values, i)[i])
+        return float(self.lut[min(d, len(self.lut) - 1)])
+
+
+def add_stereo_args(parser):
+    """Add the --stereo-distance options to a follower's argument parser."""
+    group = parser.add_argument_group("stereo distance")
+    group.add_argument("--stereo-distance", action="store_true",
+                       help="judge distance from stereo disparity inside the person bbox "
+                            "instead of the bbox height")
+    group.add_argument("--stereo-focal", type=float, default=DEFAULT_FOCAL_PX, metavar="PX",
+                       help="mono focal length in pixels for replays (read from the camera when live)")
+    group.add_argument("--stereo-baseline", type=float, default=DEFAULT_BASELINE_M, metavar="M",
+                       help="stereo baseline in meters for replays (read from the camera when live)")
+    return parser
@@ -0,0 +1,174 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+# One fixed-size record per decided frame
+RECORD_DTYPE = np.dtype([
+    ("time", "f8"),          # time.monotonic() when the command was sent
+    ("timestamp", "f8"),     # device capture time (NaN if unknown)
+    ("sequence", "i8"),      # device frame sequence number
+    ("bbox", "i4", (4,)),    # x, y, w, h of the person, -1s when none
+    ("command", "S1"),
+    ("stopped", "?"),        # fist stop latched
+    ("distance", "f4"),      # stereo distance in meters, NaN when not measured
+    ("capture_ms", "f4"),
+    ("detect_ms", "f4"),
+    ("decide_ms", "f4"),     # decide() plus queueing the command
+    ("age_ms", "f4"),        # host receive -> command sent
+    ("latency_ms", "f4"),    # device capture -> command sent (glass to command)
+])
+
+MAGIC = b"FTLM0001"
+HEADER_SIZE = 4096  # magic, record count (uint64), JSON dtype description, zero padding
+NO_BBOX = (-1, -1, -1, -1)
+
+
+class TelemetryRecorder:
+    """Per-frame records in a preallocated ring buffer, flushed to disk in the background.
+
+    record() only fills the next slot of a `capacity`-record structured
+    array: no allocation, no I/O, no console output. A background thread
+    copies new records every `flush_interval` seconds onto the end of a
+    memory-mapped file that grows in `grow` record steps, then updates the
+    record count in the file header, so a crashed run still leaves every
+    flushed record readable. If the flusher falls more than `capacity`
+    records behind, the oldest unflushed records are overwritten and
+    counted as dropped. Read a file back with load_telemetry().
+    """
+
+    def __init__(self, path: str, capacity: int = 4096, flush_interval: float = 1.0,
+                 grow: int = 65536):
+        self.path = path
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.grow = grow
+        self._ring = np.zeros(capacity, RECORD_DTYPE)
+        self._head = 0       # records written to the ring, ever
+        self._flushed = 0    # records copied to the file
+        self.dropped = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        header = json.dumps({"descr": RECORD_DTYPE.descr}).encode()
+        if len(MAGIC) + 8 + len(header) > HEADER_SIZE:
+            raise ValueError("telemetry record description does not fit the header")
+        self._file = open(path, "w+b")
+        self._file.write(MAGIC + np.uint64(0).tobytes() + header.ljust(HEADER_SIZE - len(MAGIC) - 8, b"\0"))
+        self._file.flush()
+        self._map = None
+        self._map_size = 0
+
+        self._closing = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="telemetry-flush", daemon=True)
+        self._thread.start()
+
+    def record(self, packet):
+        """Store one decided FramePacket."""
+        stage_ms = packet.stage_ms
+        now = time.monotonic()
+        self._ring[self._head % self.capacity] = (
+            now,
+            packet.timestamp if packet.timestamp is not None else np.nan,
+            packet.sequence,
+            packet.bbox if packet.bbox is not None else NO_BBOX,
+            packet.command,
+            packet.stopped,
+            packet.distance if packet.distance is not None else np.nan,
+            stage_ms.get("capture", np.nan),
+            stage_ms.get("detect", np.nan),
+            stage_ms.get("decide", np.nan),
+            1000.0 * (now - packet.captured),
+            1000.0 * (now - packet.timestamp) if packet.timestamp is not None else np.nan,
+        )
+        self._head += 1
+
+    def _ensure_size(self, records: int):
+        if records <= self._map_size:
+            return
+        size = -(-records // self.grow) * self.grow
+        self._file.truncate(HEADER_SIZE + size * RECORD_DTYPE.itemsize)
+        if self._map is not None:
+            self._map.flush()
+        self._map = np.memmap(self._file, RECORD_DTYPE, "r+", offset=HEADER_SIZE, shape=(size,))
+        self._map_size = size
+
+    def flush(self):
+        """Append the records written since the last flush to the file."""
+        with self._lock:
+            head = self._head
+            count = self._flushed - self.dropped  # records already in the file
+            start = max(self._flushed, head - self.capacity)
+            self.dropped += start - self._flushed
+            self._flushed = head
+            if head == start:
+                return
+            first, last = start % self.capacity, head % self.capacity
+            if first < last:
+                chunk = self._ring[first:last].copy()
+            else:
+                chunk = np.concatenate((self._ring[first:], self._ring[:last]))
+            # Slots the producer lapped while we were copying may be torn
+            lapped = max(0, self._head - self.capacity - start)
+            if lapped:
+                chunk = chunk[lapped:]
+                self.dropped += lapped
+
+            self._ensure_size(count + len(chunk))
+            self._map[count:count + len(chunk)] = chunk
+            self._map.flush()
+            self._file.seek(len(MAGIC))
+            self._file.write(np.uint64(count + len(chunk)).tobytes())
+            self._file.flush()
+
+    def _run(self):
+        while not self._closing.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """Flush what is left and trim the file to the records written."""
+        self._closing.set()
+        self._thread.join(timeout=2.0)
+        self.flush()
+        with self._lock:
+            count = self._flushed - self.dropped
+            self._map = None
+            self._file.truncate(HEADER_SIZE + count * RECORD_DTYPE.itemsize)
+            self._file.close()
+        print(f"[Telemetry] Saved {count} records to {self.path}"
+              + (f" ({self.dropped} dropped)" if self.dropped else ""))
+
+    def report(self):
+        print(f"[Telemetry] records {self._head} | flushed {self._flushed - self.dropped} "
+              f"| dropped {self.dropped} | {self.path}")
+
+
+def load_telemetry(path: str) -> np.ndarray:
+    """Records of a telemetry file as a read-only structured array (memory-mapped)."""
+    with open(path, "rb") as f:
+        head = f.read(HEADER_SIZE)
+    if head[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a telemetry file")
+    count = int(np.frombuffer(head, np.uint64, 1, len(MAGIC))[0])
+    descr = json.loads(head[len(MAGIC) + 8:].rstrip(b"\0"))["descr"]
+    dtype = np.dtype([tuple(field) if len(field) == 2 else (field[0], field[1], tuple(field[2]))
+                      for field in descr])
+    if count == 0:
+        return np.zeros(0, dtype)
+    return np.memmap(path, dtype, "r", offset=HEADER_SIZE, shape=(count,))
+
+
+def add_telemetry_args(parser):
+    """Add --telemetry to a follower's argument parser."""
+    group = parser.add_argument_group("telemetry")
+    group.add_argument("--telemetry", metavar="FILE",
+                       help="write one binary record per frame to FILE (read with telemetry.load_telemetry) "
+                            "instead of printing each command change")
+    return parser
+
+
+def open_telemetry(args):
+    """TelemetryRecorder for --telemetry, or None."""
+    return TelemetryRecorder(args.telemetry) if args.telemetry else None
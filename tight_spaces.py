@@ -1,27 +1,30 @@
+import argparse
 import cv2
-import socket
 import depthai as dai
 from cvzone.PoseModule import PoseDetector
+from blackbox import add_blackbox_args, open_blackbox
+from command_link import add_link_args, open_link
+from display import add_display_args, open_display
+from follower_runtime import FollowerRuntime, FramePacket
+from frame_context import FrameContext
+from frame_source import add_source_args, max_frame_age, open_frame_source
+from metrics import add_metrics_args, open_metrics
+from occupancy_grid import OccupancyGrid, add_grid_args
+from pose_tracking import TrackedPoseDetector, add_tracking_args
+from scaled_detection import ScaledPoseDetector, add_scale_args, draw_pose
+from startup import Startup, warm_up
+from stereo_distance import add_stereo_depth
+from telemetry import add_telemetry_args, open_telemetry
 
 # TCP Connection Setup
 ROBOT_IP = "100.87.161.11"
 PORT = 9999
-client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-client_socket.connect((ROBOT_IP, PORT))
-print("[Follower] Connected to robot.")
-
-# Initialize pose detector
-pose_detector = PoseDetector()
-
-# Create pipeline and camera
-pipeline = dai.Pipeline()
-cam = pipeline.createColorCamera()
-cam.setPreviewSize(1280, 720)  # Higher resolution for better range
-cam.setInterleaved(False)
-cam.setBoardSocket(dai.CameraBoardSocket.CAM_A)
-xout = pipeline.createXLinkOut()
-xout.setStreamName("video")
-cam.preview.link(xout.input)
+
+# Pose detector, created by configure()
+pose_detector = None
+
+# Derived views (RGB, gray, downscaled) of the current frame, shared by the detectors
+context = FrameContext()
 
 # Frame and movement setup
 frame_width = 1280
@@ -35,73 +38,202 @@ UPPER_HEIGHT = 850   # between LOWER and UPPER -> stop (purple)
 TOO_CLOSE_WIDTH_RATIO = 0.9   # width or height > 90% of frame -> move backward (red)
 TOO_CLOSE_HEIGHT_RATIO = 0.9
 
+# Obstacle check with --obstacles: the corridor the robot drives through next
+ROBOT_WIDTH_M = 0.7      # corridor width, robot plus margin
+CLEARANCE_M = 0.6        # free length needed ahead before moving forward
+PERSON_MARGIN = 0.15     # bbox grown by this fraction before leaving it out of the grid
+
 # Colors (BGR)
 COLOR_GREEN = (0, 255, 0)
 COLOR_PURPLE = (255, 0, 255)  # violet/purple
 COLOR_RED = (0, 0, 255)
-
-# Run on device
-with dai.Device(pipeline) as device:
-    video_queue = device.getOutputQueue(name="video", maxSize=4, blocking=False)
-
-    try:
-        while True:
-            in_frame = video_queue.get()
-            frame = in_frame.getCvFrame()
-
-            # Pose detection
-            img = pose_detector.findPose(frame)
-            lmList, bboxInfo = pose_detector.findPosition(img, bboxWithHands=True)
-
-            if bboxInfo is not None and 'bbox' in bboxInfo:
-                x, y, w, h = bboxInfo['bbox']
-
-                cx = x + w // 2
-                offset = cx - frame_center
-
-                # Decide movement command and bbox color
-                if w >= TOO_CLOSE_WIDTH_RATIO * frame_width or h >= TOO_CLOSE_HEIGHT_RATIO * frame_height:
-                    command = 's'  # move backward
-                    box_color = COLOR_RED
-                elif LOWER_HEIGHT <= h <= UPPER_HEIGHT:
-                    command = 'x'  # stop
-                    box_color = COLOR_PURPLE
-                elif h < LOWER_HEIGHT:
-                    # move forward or turn
-                    if abs(offset) < center_tolerance:
-                        command = 'w'
-                    elif offset < 0:
-                        command = 'a'
-                    else:
-                        command = 'd'
-                    box_color = COLOR_GREEN
-                else:
-                    # fallback, stop
-                    command = 'x'
-                    box_color = COLOR_PURPLE
-
-                # Draw bounding box and center dot with dynamic color
-                cv2.rectangle(img, (x, y), (x + w, y + h), box_color, thickness=3)
-                cv2.circle(img, (cx, y + h // 2), 5, (0, 0, 255), cv2.FILLED)
-
-            else:
-                command = 'x'  # stop if no person detected
-                # No bounding box drawn if no person detected
-
-            try:
-                client_socket.sendall(command.encode())
-                print(f"[Follower] Sent command: {command}")
-            except Exception as e:
-                print(f"[Follower][TCP ERROR]: {e}")
-
-            # Show the full annotated frame
-            cv2.imshow("Follower View", img)
-
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                client_socket.sendall('x'.encode())
-                break
-
-    finally:
-        client_socket.close()
-        cv2.destroyAllWindows()
-        print("[Follower] Shutdown complete.")
\ No newline at end of file
+COLOR_ORANGE = (0, 165, 255)
+
+# OccupancyGrid when --obstacles is on
+grid = None
+
+
+def create_pipeline(obstacles: bool = False):
+    # Create pipeline and camera
+    pipeline = dai.Pipeline()
+    cam = pipeline.createColorCamera()
+    cam.setPreviewSize(1280, 720)  # Higher resolution for better range
+    cam.setInterleaved(False)
+    cam.setBoardSocket(dai.CameraBoardSocket.CAM_A)
+    xout = pipeline.createXLinkOut()
+    xout.setStreamName("video")
+    cam.preview.link(xout.input)
+    if obstacles:
+        # Unaligned 720P disparity: the right mono camera's own rays for the grid
+        add_stereo_depth(pipeline, output_size=None, mono_720p=True)
+    return pipeline
+
+
+def capture(source):
+    """Next color frame, with the latest disparity attached in obstacle mode."""
+    frame = source.get("video")
+    packet = FramePacket(frame.sequence, frame.image, frame.timestamp)
+    if grid is not None:
+        packet.disparity = source.get("disparity").image
+    return packet
+
+
+def person_rect(bbox, frame_size, disparity_shape):
+    """Person bbox rescaled to disparity pixels and grown by PERSON_MARGIN.
+
+    The mono camera sees a slightly different view than the color one, the
+    margin covers the offset.
+    """
+    fw, fh = frame_size
+    dh, dw = disparity_shape[:2]
+    x, y, w, h = bbox
+    mx, my = PERSON_MARGIN * w, PERSON_MARGIN * h
+    return (int((x - mx) * dw / fw), int((y - my) * dh / fh),
+            int((w + 2 * mx) * dw / fw), int((h + 2 * my) * dh / fh))
+
+
+def detect(packet):
+    context.reset(packet.frame)
+
+    # Pose detection
+    packet.img = pose_detector.findPose(packet.frame)
+    packet.lmList, bboxInfo = pose_detector.findPosition(packet.img, bboxWithHands=True)
+    if bboxInfo is not None and 'bbox' in bboxInfo:
+        packet.bbox = bboxInfo['bbox']
+
+    # Obstacle grid from the disparity, without the person being followed. The grid is only
+    # touched on this thread: decide() and draw() get this frame's verdict and scores with the
+    # packet, as they run on other threads while the next frame is being folded in
+    if packet.disparity is not None:
+        ignore = None
+        if packet.bbox is not None:
+            h, w = packet.frame.shape[:2]
+            ignore = person_rect(packet.bbox, (w, h), packet.disparity.shape)
+        grid.update(packet.disparity, ignore)
+        packet.path_clear = grid.corridor_free(ROBOT_WIDTH_M, CLEARANCE_M)
+        packet.grid_score = grid.score.copy()
+
+
+def decide(packet):
+    if packet.bbox is None:
+        packet.command = 'x'  # stop if no person detected
+        packet.box_color = None  # No bounding box drawn if no person detected
+        return
+
+    x, y, w, h = packet.bbox
+    cx = x + w // 2
+    offset = cx - frame_center
+
+    # Decide movement command and bbox color
+    if w >= TOO_CLOSE_WIDTH_RATIO * frame_width or h >= TOO_CLOSE_HEIGHT_RATIO * frame_height:
+        packet.command = 's'  # move backward
+        packet.box_color = COLOR_RED
+    elif LOWER_HEIGHT <= h <= UPPER_HEIGHT:
+        packet.command = 'x'  # stop
+        packet.box_color = COLOR_PURPLE
+    elif h < LOWER_HEIGHT:
+        # move forward or turn
+        if abs(offset) < center_tolerance:
+            packet.command = 'w'
+        elif offset < 0:
+            packet.command = 'a'
+        else:
+            packet.command = 'd'
+        packet.box_color = COLOR_GREEN
+        # Hold position while something blocks the corridor straight ahead
+        if packet.command == 'w' and packet.path_clear is False:
+            packet.command = 'x'
+            packet.box_color = COLOR_ORANGE
+    else:
+        # fallback, stop
+        packet.command = 'x'
+        packet.box_color = COLOR_PURPLE
+
+
+def draw(packet):
+    # Landmarks found by detect(), drawn here so only the frames shown pay for it
+    draw_pose(packet.img, packet.lmList, packet.bbox)
+
+    if packet.grid_score is not None:
+        # Top-down obstacle map in the top-left corner
+        minimap = grid.render(score=packet.grid_score)
+        packet.img[:minimap.shape[0], :minimap.shape[1]] = minimap
+    if packet.box_color is None:
+        return
+    x, y, w, h = packet.bbox
+    cx = x + w // 2
+
+    # Draw bounding box and center dot with dynamic color
+    cv2.rectangle(packet.img, (x, y), (x + w, y + h), packet.box_color, thickness=3)
+    cv2.circle(packet.img, (cx, y + h // 2), 5, (0, 0, 255), cv2.FILLED)
+
+
+def configure(args):
+    """Apply the detector options; returns extra objects to report on."""
+    global pose_detector, grid
+    reporters = []
+
+    # The MediaPipe models load here rather than at import, so they overlap the camera boot
+    pose_detector = PoseDetector()
+
+    # Optional obstacle grid from 720P stereo
+    if args.obstacles:
+        grid = OccupancyGrid(args.grid_focal, args.grid_baseline, camera_height_m=args.camera_height,
+                             pitch_deg=args.camera_pitch)
+        reporters.append(grid)
+
+    # Detectors share one RGB/gray conversion per frame through the context;
+    # below scale 1 they run on a downscaled view, results stay in full-frame pixels
+    # They never draw: draw() overlays the landmarks, only on the frames the display shows
+    pose_detector = ScaledPoseDetector(pose_detector, context, args.inference_scale, draw=False)
+    reporters.append(context)
+
+    # Optional detect-then-track: full pose detection only every N frames
+    if args.track_interval > 1:
+        pose_detector = TrackedPoseDetector(pose_detector, context, interval=args.track_interval, draw=False)
+        reporters.append(pose_detector)
+    return reporters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pose follower tuned for tight spaces")
+    add_source_args(parser)
+    add_tracking_args(parser)
+    add_scale_args(parser)
+    add_grid_args(parser)
+    add_display_args(parser)
+    add_telemetry_args(parser)
+    add_metrics_args(parser)
+    add_link_args(parser)
+    add_blackbox_args(parser)
+    args = parser.parse_args()
+
+    # Boot the camera while the detectors load and warm up. Commands are sent from a
+    # background thread that connects (and reconnects) on its own
+    startup = Startup("Follower")
+    device = startup.background("device", open_frame_source, args, lambda: create_pipeline(args.obstacles))
+    link = open_link(args, ROBOT_IP, PORT, log_commands=args.telemetry is None)
+    startup.watch("controller", link.wait_connected)
+    reporters = [link] + startup.step("detectors", configure, args)
+    startup.step("warm-up", warm_up, detect, (1280, 720))
+
+    # Run on device (or a recording)
+    with device.result() as source:
+        if grid is not None:
+            grid.calibrate_from_source(source)
+        runtime = FollowerRuntime(lambda: capture(source),
+                                  detect, decide, link.send, draw,
+                                  display=open_display(args, "Follower View"), reporters=reporters,
+                                  telemetry=open_telemetry(args), metrics=open_metrics(args),
+                                  max_age=max_frame_age(args),
+                                  blackbox=open_blackbox(args, (1280, 720), link))
+        startup.report()
+        try:
+            runtime.run()
+        finally:
+            link.close('x')
+            print("[Follower] Shutdown complete.")
+
+
+if __name__ == "__main__":
+    main()